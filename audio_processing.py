@@ -1,16 +1,91 @@
 import numpy as np
-from functions import parse_time, change_name
+import re
+import csv
+import time
+import json
+import queue
+import shutil
+import sqlite3
+import hashlib
+import tempfile
+import threading
+import subprocess
+from functools import partial, lru_cache
+from contextlib import nullcontext, closing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functions import parse_time, format_time, change_name, change_folder_name, read_cue_list, write_atomic, unique_temp_path, AUDIO_EXTENSIONS
+from functions import instrumented, phase, count, gauge, propagate_instrumentation
 import os
 
-import noisereduce as nr
-import soundfile as sf
-import torchaudio
-from pydub import AudioSegment
-import ffmpeg
+import importlib
 
-from pedalboard import Gain, Pedalboard, Limiter
-from pedalboard import HighpassFilter, LowpassFilter
-from pedalboard.io import AudioFile
+
+class _LazyImport:
+    """
+    Отложенный импорт тяжёлой зависимости: модуль (или объект из модуля) загружается при первом обращении.
+    Импорт audio_processing не тянет torch, noisereduce, pydub, ffmpeg и pedalboard — каждая функция 
+    платит только за то, чем пользуется.
+    """
+    def __init__(self, module, name=None):
+        self._module = module
+        self._name = name
+        self._target = None
+
+    def _resolve(self):
+        if self._target is None:
+            target = importlib.import_module(self._module)
+            self._target = getattr(target, self._name) if self._name else target
+        return self._target
+
+    def __getattr__(self, attribute):
+        if attribute in ("_module", "_name", "_target"):
+            raise AttributeError(attribute)
+        return getattr(self._resolve(), attribute)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+
+nr = _LazyImport("noisereduce")
+SpectralGateStationary = _LazyImport("noisereduce.spectralgate.stationary", "SpectralGateStationary")
+_amp_to_db = _LazyImport("noisereduce.spectralgate.utils", "_amp_to_db")
+stft = _LazyImport("scipy.signal", "stft")
+sosfilt = _LazyImport("scipy.signal", "sosfilt")
+sf = _LazyImport("soundfile")
+torch = _LazyImport("torch")
+torchaudio = _LazyImport("torchaudio")
+ffmpeg = _LazyImport("ffmpeg")
+
+Gain = _LazyImport("pedalboard", "Gain")
+Pedalboard = _LazyImport("pedalboard", "Pedalboard")
+Limiter = _LazyImport("pedalboard", "Limiter")
+HighpassFilter = _LazyImport("pedalboard", "HighpassFilter")
+LowpassFilter = _LazyImport("pedalboard", "LowpassFilter")
+AudioFile = _LazyImport("pedalboard.io", "AudioFile")
+StreamResampler = _LazyImport("pedalboard.io", "StreamResampler")
+
+
+def _write_audio(output_file, audio_data, samplerate, format=None):
+    """
+    Записывает массив (каналы, отсчёты) в аудиофайл. Формат берётся из format, иначе — из расширения output_file.
+    """
+    if format is None:
+        with AudioFile(output_file, 'w', samplerate, audio_data.shape[0]) as o:
+            o.write(audio_data)
+    else:
+        with open(output_file, 'wb') as file, AudioFile(file, 'w', samplerate, audio_data.shape[0], format=format) as o:
+            o.write(audio_data)
+
+
+def _read_range(audio, start_ms, end_ms):
+    """
+    Читает отрезок [start_ms, end_ms) из открытого AudioFile: перематывает к началу и декодирует только нужный отрезок.
+    """
+    start = min(int(start_ms * audio.samplerate / 1000), audio.frames)
+    end = min(int(end_ms * audio.samplerate / 1000), audio.frames)
+
+    audio.seek(start)
+    return audio.read(max(end - start, 0))
 
 
 # Функция для обрезки аудио по заданному времени
@@ -19,107 +94,1491 @@ def make_sample(audio_file,
                 start="0m0s", 
                 end="1m0s",
                 format="mp3",
-                verbose=False
+                verbose=False,
+                decoded_cache=None,
                 ):
     """
     Обрезает аудиофайл по заданным временным точкам и сохраняет отрезок в новый файл.
+    Файл не декодируется целиком: чтение начинается сразу с start и заканчивается на end.
+
+    Args:
+    - audio_file (строка): Путь к исходному аудиофайлу.
+    - start (строка): Начальное время для обрезки аудио. Например, "0m30s" обозначает 30 секунд.
+    - end (строка): Конечное время для обрезки аудио. Например, "1m0s" обозначает 1 минуту.        
+    - format (строка): Формат для сохранения результата. Поддерживаемые форматы — "mp3", "wav".            
+    - verbose (булево): Если True, выводит информацию о сохранении отрезка в файл.
+    - decoded_cache (DecodedAudioCache, опционально): Кэш декодированного аудио (см. make_samples).
+
+    Examples:
+    >>> make_sample("input_audio.mp3", start="0m30s", end="1m10s", format="wav", verbose=True)
+    # Отрезок сохранится в файл input_audio_0m30s_1m10s.wav
+    
+    >>> make_sample("music.wav", end="2m0s")
+    # Создастся файл "music_0m0s_2m0s.mp3" с началом аудио с 0 секунд и концом на 2 минуты.
+
+    Returns:
+        None
+
+    """
+    # Если имя выходного файла не указано, добавляем суффикс к названию исходного
+    if output_file == None:
+        output_file = change_name(audio_file, suffix=f'_{start}_{end}', extension=f'.{format}')
+
+    make_samples(audio_file, [(start, end)], output_files=[output_file], format=format, verbose=verbose, 
+                 decoded_cache=decoded_cache)
+
+
+@instrumented
+def make_samples(audio_file,
+                 ranges,
+                 output_folder = None,
+                 output_files = None,
+                 format="mp3",
+                 verbose=False,
+                 decoded_cache=None,
+                 ):
+    """
+    Вырезает из аудиофайла несколько отрезков за один проход по исходнику.
+    Исходный файл открывается один раз, отрезки читаются по порядку с перемоткой к началу каждого.
+
+    Args:
+    - audio_file (строка): Путь к исходному аудиофайлу.
+    - ranges (list или строка): Список пар (start, end) в формате parse_time (например, ("0m30s", "1m0s")) 
+      или путь к CSV/SRT файлу со списком отрезков (см. functions.read_cue_list).
+    - output_folder (строка, опционально): Папка для сохранения отрезков. По умолчанию — папка исходного файла.
+    - output_files (list, опционально): Явные имена выходных файлов (по одному на отрезок).
+    - format (строка): Формат для сохранения результата. Поддерживаемые форматы — "mp3", "wav".
+    - verbose (булево): Если True, выводит информацию о сохранении каждого отрезка.
+    - decoded_cache (DecodedAudioCache, опционально): Кэш декодированного аудио. Удобен, когда из одной лекции 
+      многократно вырезаются отрезки: файл декодируется один раз, отрезки берутся из memory-mapped кэша.
+
+    Examples:
+    >>> make_samples("lecture.mp3", [("0m0s", "1m0s"), ("9m20s", "10m20s")], output_folder="samples")
+    # Создаст файлы samples/lecture_0m0s_1m0s.mp3 и samples/lecture_9m20s_10m20s.mp3
+
+    >>> make_samples("lecture.mp3", "cues.srt", format="wav")
+
+    Returns:
+    - list: Пути к сохранённым отрезкам (в порядке ranges).
+    """
+    if isinstance(ranges, str):
+        ranges = read_cue_list(ranges)
+
+    # Имена выходных файлов: суффикс с временем отрезка (таймкоды вида "00:01:02" приводим к "1m2s")
+    if output_files is None:
+        label = lambda time_str: format_time(parse_time(time_str)) if ':' in time_str else time_str
+        output_files = [change_name(audio_file, suffix=f'_{label(start)}_{label(end)}', extension=f'.{format}') 
+                        for start, end in ranges]
+        if output_folder is not None:
+            os.makedirs(output_folder, exist_ok=True)
+            output_files = [change_folder_name(file, output_folder) for file in output_files]
+
+    if len(output_files) != len(ranges):
+        raise ValueError("Количество output_files не совпадает с количеством отрезков.")
+
+    # Читаем отрезки в порядке возрастания начала, чтобы перемотка шла вперёд по файлу
+    order = sorted(range(len(ranges)), key=lambda i: parse_time(ranges[i][0]))
+
+    with decoded_cache.open(audio_file) if decoded_cache is not None else AudioFile(audio_file) as audio:
+        for i in order:
+            start, end = ranges[i]
+            with phase("decode"):
+                audio_segment = _read_range(audio, parse_time(start), parse_time(end))
+            
+            # Сохранение результата (по умолчанию format="mp3")
+            with phase("encode"):
+                _write_audio(output_files[i], audio_segment, audio.samplerate, format=format)
+            count("segments")
+            count("frames", audio_segment.shape[-1])
+
+            if verbose: # Выводим сообщение, если запрошен verbose
+                print(f"Отрезок сохранен в файл: {output_files[i]}")
+
+        gauge(audio_s=sum(parse_time(end) - parse_time(start) for start, end in ranges) / 1000)
+
+    return output_files
+
+
+def _crossfade(tail, head):
+    """
+    Линейно сводит два перекрывающихся обработанных фрагмента: tail затухает, head нарастает.
+    """
+    fade_in = np.linspace(0., 1., tail.shape[-1], endpoint=False, dtype=np.float32)
+    return tail * (1. - fade_in) + head * fade_in
+
+
+def _resolve_device(device):
+    """
+    Возвращает "cpu" вместо "cuda", если CUDA недоступна — в том числе когда torch не установлен.
+    """
+    if device != "cuda":
+        return device
+    try:
+        available = torch.cuda.is_available()
+    except ImportError:
+        available = False
+    if not available:
+        print("CUDA не обнаружен. Используется CPU.")
+        return "cpu"
+    return device
+
+
+def _reduce_noise(audio_data, sample_rate, prop_decrease=0.5, device="cuda"):
+    """
+    Денойзинг массива (каналы, отсчёты) или (отсчёты,) с помощью noisereduce.
+    На device="cpu" используется реализация noisereduce на numpy (без torch).
+    """
+    use_torch = device != "cpu"
+    return nr.reduce_noise(y=audio_data, sr=sample_rate, prop_decrease=prop_decrease, use_torch=use_torch, device=device)
+
+
+def _denoise_parallel(audio_data, sample_rate, denoise_block, executor, chunk_s=30., overlap_s=1.):
+    """
+    Параллельный денойзинг: делит сигнал на перекрывающиеся фрагменты по chunk_s секунд, 
+    обрабатывает их в пуле executor и склеивает по порядку, сводя перекрытия кроссфейдом 
+    (так же, как в потоковом режиме).
+
+    denoise_block (callable): Функция (audio_data, sample_rate) -> обработанный массив той же формы. Должна сериализоваться pickle.
+    executor (Executor): Пул, в котором обрабатываются фрагменты.
+    """
+    shape = audio_data.shape
+    audio_data = audio_data.reshape(-1, shape[-1])
+    frames = shape[-1]
+
+    chunk = int(chunk_s * sample_rate)
+    overlap = int(overlap_s * sample_rate)
+    if overlap >= chunk:
+        raise ValueError("overlap_s должен быть меньше chunk_s.")
+
+    # Границы фрагментов: каждый, кроме первого, захватывает overlap отсчётов предыдущего
+    bounds = [(max(start - overlap, 0), min(start + chunk, frames)) for start in range(0, frames, chunk)]
+    pieces = executor.map(denoise_block, [audio_data[:, a:b] for a, b in bounds], [sample_rate] * len(bounds))
+
+    output = np.empty(audio_data.shape, dtype=np.result_type(audio_data.dtype, np.float32))
+    for i, ((a, b), piece) in enumerate(zip(bounds, pieces)):
+        piece = piece.reshape(-1, b - a)
+        shared = i * chunk - a # Длина перекрытия с предыдущим фрагментом
+        output[:, a:a + shared] = _crossfade(output[:, a:a + shared], piece[:, :shared])
+        output[:, a + shared:b] = piece[:, shared:]
+
+    return output.reshape(shape)
+
+
+def compare_denoise_backends(input_file, 
+                             n_jobs=None,
+                             prop_decrease=0.5,
+                             chunk_s=30.,
+                             overlap_s=1.,
+                             verbose=True,
+                             ):
+    """
+    Сравнивает последовательный и параллельный CPU-денойзинг на одном файле: время работы, ускорение 
+    и расхождение результатов.
+
+    Аргументы:
+    input_file (str): Путь к аудиофайлу.
+    n_jobs (int, optional): Количество процессов для параллельного режима. По умолчанию — число ядер.
+    prop_decrease (float): Пропорция уменьшения шума.
+    chunk_s (float): Длина фрагмента в секундах для параллельного режима.
+    overlap_s (float): Перекрытие фрагментов в секундах.
+    verbose (bool): Выводить ли результат сравнения.
+
+    Возвращает:
+    dict: "serial_s" и "parallel_s" — время в секундах, "speedup" — ускорение, "max_abs_diff" и "rms_diff" — расхождение результатов.
+    """
+    n_jobs = n_jobs or os.cpu_count()
+    
+    with AudioFile(input_file) as audio:
+        audio_data = audio.read(audio.frames)
+        sample_rate = audio.samplerate
+
+    denoise_block = partial(_reduce_noise, prop_decrease=prop_decrease, device="cpu")
+
+    started = time.perf_counter()
+    serial = denoise_block(audio_data, sample_rate)
+    serial_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        parallel = _denoise_parallel(audio_data, sample_rate, denoise_block, executor, chunk_s=chunk_s, overlap_s=overlap_s)
+    parallel_s = time.perf_counter() - started
+
+    difference = parallel.reshape(serial.shape) - serial
+    report = {
+        "serial_s": serial_s,
+        "parallel_s": parallel_s,
+        "speedup": serial_s / parallel_s,
+        "max_abs_diff": float(np.max(np.abs(difference))),
+        "rms_diff": float(np.sqrt(np.mean(difference ** 2))),
+    }
+
+    if verbose:
+        print(f"Последовательно: {serial_s:.2f} с, параллельно ({n_jobs} процессов): {parallel_s:.2f} с, "
+              f"ускорение: {report['speedup']:.2f}x, расхождение (RMS): {report['rms_diff']:.2e}")
+
+    return report
+
+
+class _DenoiseStage:
+    """
+    Потоковая стадия денойзинга с перекрытием блоков (overlap-add): копит входной сигнал до block_s секунд, 
+    обрабатывает каждый блок вместе с overlap_s секундами предыдущего и сводит перекрытия кроссфейдом, 
+    чтобы на границах блоков не было швов. В памяти одновременно находится не больше одного блока.
+
+    denoise_block (callable): Функция (audio_data, sample_rate) -> обработанный массив той же формы.
+    """
+    def __init__(self, denoise_block, block_s=60., overlap_s=1.):
+        if overlap_s >= block_s:
+            raise ValueError("overlap_s должен быть меньше block_s.")
+        
+        self.denoise_block = denoise_block
+        self.block_s = block_s
+        self.overlap_s = overlap_s
+        self.sample_rate = None
+
+    def _start(self, sample_rate, num_channels):
+        self.sample_rate = sample_rate
+        self.block = int(self.block_s * sample_rate)
+        self.overlap = int(self.overlap_s * sample_rate)
+        self.pending = np.zeros((num_channels, 0), dtype=np.float32) # Ещё не обработанный вход
+        self.context = np.zeros((num_channels, 0), dtype=np.float32) # Конец предыдущего входного блока
+        self.tail = None # Обработанный конец предыдущего блока, ещё не отданный дальше
+
+    def _process_chunk(self, new_data, last):
+        # Обрабатываем блок вместе с перекрытием из предыдущего
+        chunk = np.concatenate([self.context, new_data], axis=-1)
+        processed = self.denoise_block(chunk, self.sample_rate).reshape(chunk.shape)
+
+        # Сводим перекрытие с концом предыдущего блока
+        if self.tail is not None:
+            processed[:, :self.tail.shape[-1]] = _crossfade(self.tail, processed[:, :self.tail.shape[-1]])
+
+        # Конец блока придерживаем до следующего блока, остальное сразу отдаём
+        keep = 0 if last else min(self.overlap, processed.shape[-1] - 1)
+        self.tail = processed[:, processed.shape[-1] - keep:] if keep else None
+        self.context = chunk[:, chunk.shape[-1] - keep:]
+        
+        return processed[:, :processed.shape[-1] - keep]
+
+    def process(self, audio_data, sample_rate):
+        if self.sample_rate is None:
+            self._start(sample_rate, audio_data.shape[0])
+
+        self.pending = np.concatenate([self.pending, audio_data], axis=-1) if self.pending.shape[-1] else audio_data
+
+        outputs = [np.zeros((audio_data.shape[0], 0), dtype=np.float32)]
+        while self.pending.shape[-1] >= self.block:
+            outputs.append(self._process_chunk(self.pending[:, :self.block], last=False))
+            self.pending = self.pending[:, self.block:]
+
+        return np.concatenate(outputs, axis=-1), sample_rate
+
+    def flush(self):
+        if self.sample_rate is None:
+            return None, None
+
+        if self.pending.shape[-1]:
+            output = self._process_chunk(self.pending, last=True)
+        else:
+            output = self.tail
+
+        sample_rate, self.sample_rate = self.sample_rate, None
+        return output, sample_rate
+
+    def reset(self):
+        self.sample_rate = None
+
+
+def _denoise_stream(input_file, output_file, denoise_block, block_s=60., overlap_s=1.):
+    """
+    Потоковый денойзинг: читает файл блоками по block_s секунд и обрабатывает их стадией _DenoiseStage. 
+    Результат пишется в output_file по мере обработки, поэтому потребление памяти не зависит от длины записи.
+
+    denoise_block (callable): Функция (audio_data, sample_rate) -> обработанный массив той же формы.
+    """
+    stage = _DenoiseStage(denoise_block, block_s=block_s, overlap_s=overlap_s)
+
+    with AudioFile(input_file) as audio:
+        block = int(block_s * audio.samplerate)
+
+        with AudioFile(output_file, 'w', audio.samplerate, audio.num_channels) as o:
+            while audio.tell() < audio.frames:
+                with phase("decode"):
+                    new_data = audio.read(block)
+                if new_data.shape[-1] == 0:
+                    break
+                with phase("process"):
+                    output = stage.process(new_data, audio.samplerate)[0]
+                with phase("encode"):
+                    o.write(output)
+                count("blocks")
+
+            with phase("process"):
+                tail, _ = stage.flush()
+            if tail is not None:
+                with phase("encode"):
+                    o.write(tail)
+
+        gauge(audio_s=audio.frames / audio.samplerate)
+
+
+@instrumented
+def compute_noise_profile(noise_file,
+                          sample_rate=None,
+                          n_fft=1024,
+                          win_length=None,
+                          hop_length=None,
+                          ):
+    """
+    Вычисляет спектральный профиль шума по эталонной записи (например, audio/noise_sample.wav): 
+    среднее и стандартное отклонение уровня (dB) по каждой частоте, как в стационарном режиме noisereduce.
+
+    Args:
+    - noise_file (str): Путь к записи, содержащей только шум.
+    - sample_rate (int, опционально): Частота дискретизации, под которую строится профиль. По умолчанию — частота noise_file.
+    - n_fft (int): Размер FFT.
+    - win_length (int, опционально): Длина окна STFT. По умолчанию равна n_fft.
+    - hop_length (int, опционально): Шаг STFT. По умолчанию win_length // 4.
+
+    Return:
+    - dict: Профиль шума с ключами "sample_rate", "n_fft", "win_length", "hop_length", "mean_freq_noise", "std_freq_noise".
+    """
+    win_length = win_length or n_fft
+    hop_length = hop_length or win_length // 4
+
+    with AudioFile(noise_file) as audio:
+        
+        # Приводим шум к частоте дискретизации обрабатываемых записей
+        if sample_rate is not None and sample_rate != audio.samplerate:
+            with audio.resampled_to(sample_rate) as resampled:
+                noise = resampled.read(resampled.frames)
+        else:
+            sample_rate = audio.samplerate
+            noise = audio.read(audio.frames)
+
+    # Сводим шум в один канал и считаем статистики спектра
+    _, _, noise_stft = stft(np.mean(noise, axis=0), nfft=n_fft, noverlap=win_length - hop_length, 
+                            nperseg=win_length, padded=False)
+    noise_stft_db = _amp_to_db(noise_stft)
+
+    return {
+        "sample_rate": int(sample_rate),
+        "n_fft": n_fft,
+        "win_length": win_length,
+        "hop_length": hop_length,
+        "mean_freq_noise": np.mean(noise_stft_db, axis=1),
+        "std_freq_noise": np.std(noise_stft_db, axis=1),
+    }
+
+
+def save_noise_profile(profile, file_path):
+    """
+    Сохраняет профиль шума в файл .npz.
+
+    Args:
+    - profile (dict): Профиль шума (см. compute_noise_profile).
+    - file_path (str): Путь к файлу .npz.
+    """
+    # Пишем во временный файл и переименовываем, чтобы параллельные процессы не прочитали недописанный профиль
+    temp_path = unique_temp_path(file_path, suffix=".tmp.npz")
+    np.savez(temp_path, **profile)
+    os.replace(temp_path, file_path)
+
+
+def load_noise_profile(file_path):
+    """
+    Загружает профиль шума из файла .npz.
+
+    Args:
+    - file_path (str): Путь к файлу .npz.
+
+    Return:
+    - dict: Профиль шума.
+    """
+    with np.load(file_path) as data:
+        profile = {key: data[key] for key in data.files}
+
+    for key in ("sample_rate", "n_fft", "win_length", "hop_length"):
+        profile[key] = int(profile[key])
+
+    return profile
+
+
+@lru_cache(maxsize=16)
+def _cached_noise_profile(noise_file, mtime, sample_rate, n_fft, win_length, hop_length, cache_folder):
+    """
+    Профиль шума из кэша в памяти, затем с диска; вычисляется только при отсутствии в обоих.
+    mtime входит в ключ, чтобы изменённая эталонная запись не давала устаревший профиль.
+    """
+    if cache_folder is None:
+        cache_folder = os.path.join(os.path.dirname(noise_file), '.noise_profiles')
+
+    cache_file = change_folder_name(
+        change_name(noise_file, suffix=f'_{sample_rate}_{n_fft}_{win_length}_{hop_length}', extension='.npz'), 
+        cache_folder
+    )
+
+    if os.path.exists(cache_file) and os.path.getmtime(cache_file) >= mtime:
+        return load_noise_profile(cache_file)
+
+    profile = compute_noise_profile(noise_file, sample_rate=sample_rate, n_fft=n_fft, 
+                                    win_length=win_length, hop_length=hop_length)
+    os.makedirs(cache_folder, exist_ok=True)
+    save_noise_profile(profile, cache_file)
+
+    return profile
+
+
+def get_noise_profile(noise_file,
+                      sample_rate,
+                      n_fft=1024,
+                      win_length=None,
+                      hop_length=None,
+                      cache_folder=None,
+                      ):
+    """
+    Возвращает профиль шума для эталонной записи с кэшированием по частоте дискретизации и параметрам STFT.
+    Профиль вычисляется один раз и сохраняется в cache_folder, повторные вызовы (в том числе 
+    из других процессов process_folder) читают его с диска или из памяти.
+
+    Args:
+    - noise_file (str): Путь к записи, содержащей только шум.
+    - sample_rate (int): Частота дискретизации обрабатываемых записей.
+    - n_fft, win_length, hop_length: Параметры STFT (см. compute_noise_profile).
+    - cache_folder (str, опционально): Папка кэша профилей. По умолчанию — ".noise_profiles" рядом с noise_file.
+
+    Return:
+    - dict: Профиль шума.
+    """
+    win_length = win_length or n_fft
+    hop_length = hop_length or win_length // 4
+
+    return _cached_noise_profile(os.path.abspath(noise_file), os.path.getmtime(noise_file), int(sample_rate), 
+                                 n_fft, win_length, hop_length, cache_folder)
+
+
+def _resolve_noise_profile(noise_profile, sample_rate):
+    """
+    Приводит noise_profile (словарь, путь к .npz профилю или путь к записи шума) к профилю для sample_rate.
+    """
+    if isinstance(noise_profile, str):
+        if os.path.splitext(noise_profile)[1].lower() == '.npz':
+            noise_profile = load_noise_profile(noise_profile)
+        else:
+            noise_profile = get_noise_profile(noise_profile, sample_rate)
+
+    if noise_profile["sample_rate"] != sample_rate:
+        raise ValueError(f"Профиль шума построен для {noise_profile['sample_rate']} Гц, а запись — {sample_rate} Гц.")
+
+    return noise_profile
+
+
+def _reduce_noise_with_profile(audio_data, sample_rate, profile, prop_decrease=0.5, n_std_thresh=1.5):
+    """
+    Стационарный денойзинг noisereduce с готовым профилем шума вместо оценки статистик по сигналу.
+    profile — словарь профиля или путь (см. _resolve_noise_profile).
+    """
+    profile = _resolve_noise_profile(profile, sample_rate)
+
+    # Пустой y_noise: статистики шума подставляем из профиля
+    gate = SpectralGateStationary(
+        y=audio_data, sr=sample_rate, y_noise=np.zeros(profile["win_length"]),
+        n_std_thresh_stationary=n_std_thresh, chunk_size=600000, clip_noise_stationary=True, padding=30000,
+        n_fft=profile["n_fft"], win_length=profile["win_length"], hop_length=profile["hop_length"],
+        time_constant_s=2.0, freq_mask_smooth_hz=500, time_mask_smooth_ms=50, tmp_folder=None,
+        prop_decrease=prop_decrease, use_tqdm=False, n_jobs=1,
+    )
+    gate.mean_freq_noise = profile["mean_freq_noise"]
+    gate.std_freq_noise = profile["std_freq_noise"]
+    gate.noise_thresh = gate.mean_freq_noise + gate.std_freq_noise * n_std_thresh
+
+    return gate.get_traces()
+
+
+@instrumented
+def denoise_audio(input_file, 
+                output_file, 
+                device="cuda",
+                prop_decrease=0.5,
+                streaming=False,
+                block_s=60.,
+                overlap_s=1.,
+                n_jobs=1,
+                chunk_s=30.,
+                noise_profile=None,
+                signal_index=None,
+                clean_snr_db=30.,
+                ):
+    """
+    Денойзинг аудиофайла MP3.
+
+    Аргументы:
+    input_file (str): Путь к входному аудиофайлу MP3.
+    output_file (str): Путь для сохранения улучшенного аудиофайла.
+    device (str): Устройство для обработки (по умолчанию "cuda"; если CUDA недоступна или torch не установлен — "cpu").
+    prop_decrease (float): Пропорция уменьшения шума. Разумны значения от 0 до 1. В случае 1 очень вероятны артефакты денойзинга, рекомендуются значения до 0.8.
+    streaming (bool): Потоковый режим для длинных записей: файл читается и записывается блоками, память не растёт с длиной записи.
+    block_s (float): Длина блока в секундах для потокового режима.
+    overlap_s (float): Перекрытие соседних блоков (фрагментов) в секундах (сводится кроссфейдом).
+    n_jobs (int): Количество процессов для параллельного денойзинга на CPU. При n_jobs > 1 сигнал делится 
+                  на перекрывающиеся фрагменты по chunk_s секунд, которые обрабатываются параллельно (device принудительно "cpu").
+    chunk_s (float): Длина фрагмента в секундах для параллельного режима.
+    noise_profile (str или dict, optional): Готовый профиль шума: словарь, путь к .npz профилю или путь к записи шума 
+                  (например, "audio/noise_sample.wav"; профиль будет вычислен один раз и закэширован, см. get_noise_profile). 
+                  С профилем используется стационарный денойзинг на CPU без оценки шума по самой записи.
+    signal_index (SignalIndex или str, optional): Индекс анализа сигнала (см. analyze_signal). Запись с SNR не ниже clean_snr_db 
+                  сохраняется без денойзинга, для остальных prop_decrease подбирается по SNR (см. recommend_processing). 
+                  Непроанализированные файлы анализируются и добавляются в индекс.
+    clean_snr_db (float): SNR, начиная с которого запись считается чистой (при signal_index).
+
+    Возвращает:
+    None
+    """
+    # Параметры по индексу анализа сигнала: чистые записи не обрабатываем, для шумных подбираем силу денойзинга
+    if signal_index is not None:
+        with phase("analyze"):
+            recommendation = recommend_processing(analyze_signal(input_file, signal_index=signal_index), 
+                                                  clean_snr_db=clean_snr_db)
+        if not recommendation["denoise"]:
+            with phase("encode"):
+                _copy_audio(input_file, output_file)
+            gauge(skipped=True)
+            return
+        prop_decrease = recommendation["prop_decrease"]
+
+    # CUDA проверяем только там, где она используется: параллельный режим и денойзинг с профилем работают на CPU без torch
+    if n_jobs > 1:
+        device = "cpu"
+    elif noise_profile is None:
+        device = _resolve_device(device)
+
+    if noise_profile is not None: # Стационарный денойзинг с готовым профилем шума
+        with phase("noise_profile"), AudioFile(input_file) as audio:
+            profile = _resolve_noise_profile(noise_profile, audio.samplerate)
+        denoise_block = partial(_reduce_noise_with_profile, profile=profile, prop_decrease=prop_decrease)
+    else:
+        denoise_block = partial(_reduce_noise, prop_decrease=prop_decrease, device=device)
+
+    with ProcessPoolExecutor(max_workers=n_jobs) if n_jobs > 1 else nullcontext() as executor:
+
+        # Параллельная обработка фрагментов в пуле процессов
+        if executor is not None:
+            denoise_block = partial(_denoise_parallel, denoise_block=denoise_block, executor=executor, 
+                                    chunk_s=chunk_s, overlap_s=overlap_s)
+
+        if streaming:
+            _denoise_stream(input_file, output_file, denoise_block, block_s=block_s, overlap_s=overlap_s)
+            return
+    
+        try: # Пробуем загрузить аудио с torchaudio (удобно дружелюбностью к разным форматам)
+            with phase("decode"):
+                sound, sample_rate = torchaudio.load(input_file, normalize=False)
+        except Exception as e:
+            print(f"Произошла ошибка при загрузке файла: {e}")
+            return
+        
+        # Преобразование аудио в numpy array (требует денойзер)
+        sound_np = sound.squeeze().numpy()
+        gauge(audio_s=sound_np.shape[-1] / sample_rate)
+
+        # Проведение денойзинга
+        with phase("process"):
+            reduced_noise = denoise_block(sound_np, sample_rate)
+    
+    # Сохранение очищенного аудиофайла
+    with phase("encode"):
+        sf.write(output_file, reduced_noise, sample_rate)
+    
+    
+# Форматы для convert_audio: формат ffmpeg (-f), кодек для перекодирования и кодеки, которые можно скопировать без перекодирования
+_AUDIO_FORMATS = {
+    "mp3": ("mp3", "libmp3lame", {"mp3"}),
+    "m4a": ("ipod", "aac", {"aac", "alac"}),
+    "aac": ("adts", "aac", {"aac"}),
+    "ogg": ("ogg", "libvorbis", {"vorbis", "opus"}),
+    "opus": ("opus", "libopus", {"opus"}),
+    "flac": ("flac", "flac", {"flac"}),
+    "wav": ("wav", "pcm_s16le", {"pcm_s16le", "pcm_s24le", "pcm_s32le", "pcm_f32le"}),
+}
+
+
+def _probe_audio(input_file):
+    """
+    Возвращает (кодек первой аудиодорожки, длительность в секундах или None). 
+    Использует ffprobe, а если его нет — разбирает вывод "ffmpeg -i".
+    """
+    try:
+        probe = ffmpeg.probe(input_file)
+        stream = next(stream for stream in probe["streams"] if stream["codec_type"] == "audio")
+        duration = stream.get("duration") or probe.get("format", {}).get("duration")
+        return stream["codec_name"], float(duration) if duration else None
+    except Exception:
+        pass
+
+    output = subprocess.run(["ffmpeg", "-hide_banner", "-nostdin", "-i", input_file], 
+                            capture_output=True, text=True, errors="replace").stderr
+    codec = re.search(r'Stream #\S+.*?: Audio: (\w+)', output)
+    duration = re.search(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)', output)
+    if codec is None:
+        raise ValueError(f"В файле {input_file} не найдена аудиодорожка.")
+    
+    duration_s = int(duration[1]) * 3600 + int(duration[2]) * 60 + float(duration[3]) if duration else None
+    return codec[1], duration_s
+
+
+@instrumented
+def convert_audio(input_file, 
+                  output_file=None, 
+                  format="mp3", 
+                  bitrate=None,
+                  threads=None,
+                  stream_copy=True,
+                  overwrite=True,
+                  progress_callback=None,
+                  ):
+    """
+    Конвертирует аудиофайл через ffmpeg. Если кодек исходника подходит для целевого контейнера 
+    (например, AAC из .mp4 в .m4a или MP3 в .mp3), дорожка копируется без перекодирования (remux) — в десятки раз быстрее.
+
+    Прогресс ffmpeg (-progress) разбирается в отчёт; результат пишется во временный файл и переименовывается, 
+    поэтому прерванная конвертация не оставляет недописанный файл.
+
+    Args:
+    - input_file (str): Путь к исходному файлу (любой формат, который читает ffmpeg, в том числе видео).
+    - output_file (str, опционально): Путь к результату. По умолчанию — рядом с исходником с расширением format.
+    - format (str): Целевой формат: "mp3", "m4a", "aac", "ogg", "opus", "flac" или "wav".
+    - bitrate (str, опционально): Битрейт при перекодировании (например, "192k"). По умолчанию — VBR по умолчанию кодека.
+    - threads (int, опционально): Количество потоков ffmpeg (-threads). По умолчанию — на усмотрение ffmpeg.
+    - stream_copy (bool): Копировать дорожку без перекодирования, когда это возможно.
+    - overwrite (bool): Перезаписывать существующий output_file. Если False и файл есть — конвертация пропускается.
+    - progress_callback (callable, опционально): Функция (input_file, progress) для промежуточного прогресса: 
+      словарь с "media_s" (обработано секунд аудио), "duration_s" и "speed".
+
+    Return:
+    - dict: Отчёт: "input_file", "output_file", "status" ("ok", "skipped" или "failed"), "mode" ("copy", "remux" или "encode"), 
+      "codec" (кодек исходника), "duration_s" (длительность исходника), "media_s", "wall_s", "speed" (во сколько раз быстрее 
+      реального времени), "size_bytes" и "error".
+    """
+    if format not in _AUDIO_FORMATS:
+        raise ValueError(f"Недопустимый format. Используйте одно из: {', '.join(_AUDIO_FORMATS)}.")
+    muxer, encoder, copyable = _AUDIO_FORMATS[format]
+
+    if output_file is None:
+        output_file = change_name(input_file, extension=f'.{format}')
+    report = {"input_file": input_file, "output_file": output_file, "status": None, "mode": None, "codec": None,
+              "duration_s": None, "media_s": None, "wall_s": 0., "speed": None, "size_bytes": None, "error": None}
+
+    if not overwrite and os.path.exists(output_file):
+        report["status"] = "skipped"
+        return report
+
+    started = time.perf_counter()
+    try:
+        report["codec"], report["duration_s"] = _probe_audio(input_file)
+    except Exception as e:
+        report["status"], report["error"] = "failed", f"{type(e).__name__}: {e}"
+        return report
+
+    # Быстрый путь: копирование дорожки в тот же или другой контейнер
+    if stream_copy and report["codec"] in copyable:
+        same_extension = os.path.splitext(input_file)[1].lower() == os.path.splitext(output_file)[1].lower()
+        report["mode"] = "copy" if same_extension else "remux"
+        codec_args = ["-c:a", "copy"]
+    else:
+        report["mode"] = "encode"
+        codec_args = ["-c:a", encoder] + (["-b:a", bitrate] if bitrate else [])
+
+    # Уникальное временное имя в папке результата: в пакетной конвертации потоки одного процесса пишут параллельно
+    temp_file = unique_temp_path(output_file)
+    command = ["ffmpeg", "-hide_banner", "-nostdin", "-loglevel", "error", "-nostats", "-progress", "pipe:1", "-y"]
+    command += ["-threads", str(threads)] if threads else []
+    command += ["-i", input_file, "-map", "0:a:0", "-vn", "-map_metadata", "0"] + codec_args
+    command += ["-threads", str(threads)] if threads else []
+    command += ["-f", muxer, temp_file]
+
+    with phase("transcode"), tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr, text=True)
+        
+        # Прогресс ffmpeg: блоки строк key=value, каждый заканчивается строкой progress=continue/end
+        progress = {}
+        for line in process.stdout:
+            key, _, value = line.strip().partition('=')
+            progress[key] = value
+            if key == "progress":
+                if progress.get("out_time_us", "N/A").lstrip('-').isdigit():
+                    report["media_s"] = max(int(progress["out_time_us"]), 0) / 1e6
+                if progress_callback is not None:
+                    try:
+                        speed = float(progress.get("speed", "").rstrip('x'))
+                    except ValueError: # "N/A" в начале работы
+                        speed = None
+                    progress_callback(input_file, {"media_s": report["media_s"], "duration_s": report["duration_s"],
+                                                   "speed": speed})
+        process.wait()
+
+        if process.returncode != 0:
+            stderr.seek(0)
+            report["status"] = "failed"
+            report["error"] = stderr.read().decode(errors="replace").strip()[-2000:] or f"ffmpeg завершился с кодом {process.returncode}"
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+        else:
+            os.replace(temp_file, output_file)
+            report["status"] = "ok"
+            report["size_bytes"] = os.path.getsize(output_file)
+
+    report["wall_s"] = time.perf_counter() - started
+    media_s = report["media_s"] or report["duration_s"]
+    if report["status"] == "ok" and media_s:
+        report["speed"] = media_s / report["wall_s"]
+        gauge(audio_s=media_s)
+    
+    return report
+
+
+def convert_audio_batch(input_files,
+                        output_folder=None,
+                        format="mp3",
+                        n_jobs=None,
+                        threads_per_job=None,
+                        bitrate=None,
+                        stream_copy=True,
+                        overwrite=False,
+                        extensions=None,
+                        verbose=True,
+                        progress_callback=None,
+                        ):
+    """
+    Пакетная конвертация: пул из n_jobs одновременных процессов ffmpeg, у каждого ограничено число потоков, 
+    чтобы процессы не конкурировали за ядра. Дорожки, которые можно скопировать без перекодирования, копируются (см. convert_audio).
+
+    Args:
+    - input_files (list или str): Список файлов или папка (берутся файлы из неё с расширениями extensions).
+    - output_folder (str, опционально): Папка для результатов. По умолчанию — рядом с исходниками.
+    - format (str): Целевой формат (см. convert_audio).
+    - n_jobs (int, опционально): Количество одновременных процессов ffmpeg. По умолчанию — по числу ядер (но не больше числа файлов).
+    - threads_per_job (int, опционально): Потоков на процесс ffmpeg. По умолчанию — ядра поровну между процессами.
+    - bitrate (str, опционально): Битрейт при перекодировании (например, "192k").
+    - stream_copy (bool): Копировать дорожки без перекодирования, когда это возможно.
+    - overwrite (bool): Перезаписывать существующие результаты (по умолчанию готовые файлы пропускаются).
+    - extensions (tuple, опционально): Расширения файлов при обработке папки. По умолчанию — аудио и видео (AUDIO_EXTENSIONS).
+    - verbose (bool): Выводить ли результат по каждому файлу и итог.
+    - progress_callback (callable, опционально): См. convert_audio. Вызывается из потоков пула.
+
+    Return:
+    - list: Отчёты convert_audio по каждому файлу (в порядке input_files).
+
+    Examples:
+    >>> reports = convert_audio_batch("audio (m4a)", output_folder="audio (mp3)", format="mp3")
+    """
+    if isinstance(input_files, str):
+        extensions = extensions or AUDIO_EXTENSIONS
+        input_files = sorted(os.path.join(input_files, name) for name in os.listdir(input_files) 
+                             if os.path.splitext(name)[1].lower() in extensions)
+    if not input_files:
+        return []
+
+    if output_folder is not None:
+        os.makedirs(output_folder, exist_ok=True)
+    output_files = [change_name(file, extension=f'.{format}') for file in input_files]
+    if output_folder is not None:
+        output_files = [change_folder_name(file, output_folder) for file in output_files]
+
+    # Делим ядра между процессами ffmpeg, чтобы не было переподписки
+    cpu_count = os.cpu_count() or 1
+    n_jobs = min(n_jobs or cpu_count, len(input_files))
+    threads_per_job = threads_per_job or max(cpu_count // n_jobs, 1)
+
+    # Разные исходники с одним результатом (lecture.m4a и lecture.mp4 -> lecture.mp3) перезаписали бы друг друга:
+    # конвертируется первый, остальные помечаются как ошибка
+    claimed = {}
+    collisions = {}
+    for i, output_file in enumerate(output_files):
+        key = os.path.normcase(os.path.abspath(output_file))
+        if key in claimed:
+            collisions[i] = input_files[claimed[key]]
+        else:
+            claimed[key] = i
+
+    # Каждый поток пула только ждёт свой процесс ffmpeg, вся работа — в процессах
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        futures = [None if i in collisions else
+                   executor.submit(convert_audio, input_file, output_file, format=format, bitrate=bitrate, 
+                                   threads=threads_per_job, stream_copy=stream_copy, overwrite=overwrite, 
+                                   progress_callback=progress_callback)
+                   for i, (input_file, output_file) in enumerate(zip(input_files, output_files))]
+        
+        reports = []
+        for i, (input_file, output_file, future) in enumerate(zip(input_files, output_files, futures)):
+            if future is None:
+                report = {"input_file": input_file, "output_file": output_file, "status": "failed", "mode": None, 
+                          "codec": None, "duration_s": None, "media_s": None, "wall_s": 0., "speed": None, 
+                          "size_bytes": None, "error": f"Результат {os.path.basename(output_file)} совпадает с результатом "
+                                                       f"файла {os.path.basename(collisions[i])}."}
+            else:
+                report = future.result()
+            reports.append(report)
+            if verbose:
+                name = os.path.basename(report["input_file"])
+                if report["status"] == "ok":
+                    print(f"Файл {name} сконвертирован ({report['mode']}, {report['speed']:.0f}x реального времени)." 
+                          if report["speed"] else f"Файл {name} сконвертирован ({report['mode']}).")
+                elif report["status"] == "skipped":
+                    print(f"Файл {name} уже сконвертирован, пропущен.")
+                else:
+                    print(f"Ошибка при конвертации файла {name}: {report['error']}")
+
+    if verbose:
+        failed = sum(report["status"] == "failed" for report in reports)
+        skipped = sum(report["status"] == "skipped" for report in reports)
+        print(f"Сконвертировано файлов: {len(reports) - failed - skipped}, пропущено: {skipped}, с ошибкой: {failed}.")
+
+    return reports
+
+
+def convert_m4a_to_mp3(input_file, output_file):
+    """
+    Конвертирует файл формата M4A в файл формата MP3 (см. convert_audio; для пакетной конвертации — convert_audio_batch).
+
+    Args:
+    input_file (str): Путь к исходному файлу M4A.
+    output_file (str): Путь для сохранения конвертированного файла MP3.
+
+    Return:
+    None
+    """
+    output_file = os.path.splitext(output_file)[0] + '.mp3'
+    report = convert_audio(input_file, output_file, format="mp3")
+    
+    if report["status"] != "ok":
+        print(f"Произошла ошибка при конвертации: {report['error']}")
+        raise ffmpeg.Error("ffmpeg", None, (report["error"] or "").encode())
+    print(f"Файл {input_file} успешно сконвертирован в {output_file}")
+    
+    
+def _k_weighting(sample_rate):
+    """
+    Коэффициенты K-фильтра ITU-R BS.1770 (полка +4 дБ на верхних частотах и ФВЧ ~38 Гц) в виде SOS для произвольной частоты дискретизации.
+    """
+    sections = []
+    
+    # Верхняя полка: G = 4 дБ, Q = 1/sqrt(2), fc = 1500 Гц
+    A, w0 = 10 ** (4. / 40), 2 * np.pi * 1500. / sample_rate
+    alpha, cos = np.sin(w0) / (2 * (1 / np.sqrt(2))), np.cos(w0)
+    sections.append([
+        A * ((A + 1) + (A - 1) * cos + 2 * np.sqrt(A) * alpha),
+        -2 * A * ((A - 1) + (A + 1) * cos),
+        A * ((A + 1) + (A - 1) * cos - 2 * np.sqrt(A) * alpha),
+        (A + 1) - (A - 1) * cos + 2 * np.sqrt(A) * alpha,
+        2 * ((A - 1) - (A + 1) * cos),
+        (A + 1) - (A - 1) * cos - 2 * np.sqrt(A) * alpha,
+    ])
+    
+    # ФВЧ: Q = 0.5, fc = 38 Гц
+    w0 = 2 * np.pi * 38. / sample_rate
+    alpha, cos = np.sin(w0) / (2 * 0.5), np.cos(w0)
+    sections.append([(1 + cos) / 2, -(1 + cos), (1 + cos) / 2, 1 + alpha, -2 * cos, 1 - alpha])
+
+    # Нормируем на a0
+    sos = np.array(sections)
+    return sos / sos[:, 3:4]
+
+
+def _power_db(power):
+    """
+    Переводит среднюю мощность в дБ (тишина — -inf без предупреждений numpy).
+    """
+    with np.errstate(divide='ignore'):
+        return 10 * np.log10(power)
+
+
+def _json_number(value):
+    """
+    Число для JSON: -inf (тишина) сохраняется как None.
+    """
+    return float(value) if np.isfinite(value) else None
+
+
+def _loudness_sidecar(input_file, cache_folder=None):
+    """
+    Путь к файлу-компаньону analyze_loudness: по умолчанию в скрытой папке ".loudness" рядом с аудио, 
+    чтобы process_folder и режим наблюдения не принимали результаты анализа за входные файлы.
+    """
+    if cache_folder is None:
+        cache_folder = os.path.join(os.path.dirname(os.path.abspath(input_file)), '.loudness')
+    return os.path.join(cache_folder, f"{os.path.basename(input_file)}.loudness.json")
+
+
+@instrumented
+def analyze_loudness(input_file,
+                     window_s=3.,
+                     block_s=10.,
+                     cache=True,
+                     decoded_cache=None,
+                     cache_folder=None,
+                     ):
+    """
+    Потоково анализирует громкость всего файла: интегральная громкость по ITU-R BS.1770 (LUFS, с гейтингом), 
+    пиковый уровень, RMS и RMS по окнам window_s секунд. Файл читается блоками, память не растёт с длиной записи.
+
+    Результат сохраняется в "<имя файла>.loudness.json" в скрытой папке ".loudness" рядом с файлом 
+    и при повторном вызове читается оттуда, если файл не менялся.
+
+    Args:
+    - input_file (str): Путь к аудиофайлу.
+    - window_s (float): Длина окна для оконного RMS в секундах.
+    - block_s (float): Длина блока чтения в секундах.
+    - cache (bool): Использовать ли файл-компаньон с результатами анализа.
+    - decoded_cache (DecodedAudioCache, опционально): Кэш декодированного аудио — читать файл из него, а не декодировать.
+    - cache_folder (str, опционально): Папка для файлов-компаньонов. По умолчанию — ".loudness" рядом с input_file.
+
+    Return:
+    - dict: "integrated_lufs" — интегральная громкость (LUFS), "peak_db" — пиковый уровень (dBFS), 
+      "rms_db" — RMS всего файла (dBFS), "gated_rms_db" — RMS без тишины (гейтинг как у LUFS, dBFS), 
+      "window_rms_db" — медиана, 95-й перцентиль и максимум RMS по окнам без полной тишины (dBFS), "duration_s" — длительность.
+      Для полной тишины уровни равны None.
+    """
+    sidecar = _loudness_sidecar(input_file, cache_folder)
+    stat = os.stat(input_file)
+    signature = {"size": stat.st_size, "mtime": stat.st_mtime, "window_s": window_s}
+
+    # Читаем результат прошлого анализа, если файл не изменился
+    if cache and os.path.exists(sidecar):
+        with open(sidecar, 'r', encoding='utf-8') as file:
+            stats = json.load(file)
+        if stats.get("signature") == signature:
+            gauge(cached=True)
+            return stats
+
+    with _open_audio(input_file, decoded_cache) as audio:
+        sample_rate = audio.samplerate
+        hop = int(round(0.1 * sample_rate)) # Шаг 100 мс: блоки по 400 мс с перекрытием 75%
+        
+        sos = _k_weighting(sample_rate)
+        zi = None
+        
+        weighted_left = raw_left = None # Остаток, не набравший целого шага
+        weighted_power, raw_power = [], [] # Средняя мощность по шагам 100 мс (каналы, шаги)
+        peak, frames = 0., 0
+
+        while True:
+            with phase("decode"):
+                audio_data = audio.read(int(block_s * sample_rate))
+            if audio_data.shape[-1] == 0:
+                break
+
+            with phase("process"):
+                frames += audio_data.shape[-1]
+                peak = max(peak, float(np.max(np.abs(audio_data))))
+
+                # K-фильтр с сохранением состояния между блоками
+                if zi is None:
+                    zi = np.zeros((sos.shape[0], audio_data.shape[0], 2))
+                weighted, zi = sosfilt(sos, audio_data, axis=-1, zi=zi)
+
+                if weighted_left is not None:
+                    weighted = np.concatenate([weighted_left, weighted], axis=-1)
+                    audio_data = np.concatenate([raw_left, audio_data], axis=-1)
+
+                # Средняя мощность по целым шагам 100 мс
+                steps = weighted.shape[-1] // hop
+                n = steps * hop
+                weighted_power.append(np.mean(weighted[:, :n].reshape(weighted.shape[0], steps, hop) ** 2, axis=-1))
+                raw_power.append(np.mean(audio_data[:, :n].reshape(audio_data.shape[0], steps, hop).astype(np.float64) ** 2, axis=-1))
+                weighted_left, raw_left = weighted[:, n:], audio_data[:, n:]
+
+    weighted_power = np.concatenate(weighted_power, axis=-1).sum(axis=0) if weighted_power else np.zeros(0)
+    raw_power = np.concatenate(raw_power, axis=-1).mean(axis=0) if raw_power else np.zeros(0)
+
+    # Блоки по 400 мс (4 шага) со сдвигом 100 мс
+    def _blocks(power, size):
+        if len(power) < size:
+            return power[:0]
+        cumsum = np.concatenate([[0.], np.cumsum(power)])
+        return (cumsum[size:] - cumsum[:-size]) / size
+
+    block_power = _blocks(weighted_power, 4)
+    block_raw = _blocks(raw_power, 4)
+    block_loudness = -0.691 + _power_db(block_power)
+
+    # Гейтинг: абсолютный порог -70 LUFS, затем относительный на 10 LU ниже громкости прошедших блоков
+    gate = block_loudness > -70.
+    if gate.any():
+        relative = -0.691 + _power_db(np.mean(block_power[gate])) - 10.
+        gate &= block_loudness > relative
+
+    window = max(int(round(window_s / 0.1)), 1)
+    windows = len(raw_power) // window
+    window_rms_db = _power_db(raw_power[:windows * window].reshape(windows, window).mean(axis=-1))
+    window_rms_db = window_rms_db[np.isfinite(window_rms_db)] # Окна полной тишины не учитываем
+    windows = len(window_rms_db)
+
+    stats = {
+        "integrated_lufs": _json_number(-0.691 + _power_db(np.mean(block_power[gate]))) if gate.any() else None,
+        "peak_db": _json_number(20 * np.log10(peak)) if peak > 0 else None,
+        "rms_db": _json_number(_power_db(np.mean(raw_power))) if len(raw_power) else None,
+        "gated_rms_db": _json_number(_power_db(np.mean(block_raw[gate]))) if gate.any() else None,
+        "window_rms_db": {
+            "median": _json_number(np.median(window_rms_db)) if windows else None,
+            "p95": _json_number(np.percentile(window_rms_db, 95)) if windows else None,
+            "max": _json_number(np.max(window_rms_db)) if windows else None,
+        },
+        "duration_s": frames / sample_rate,
+        "signature": signature,
+    }
+    gauge(audio_s=stats["duration_s"])
+
+    if cache:
+        os.makedirs(os.path.dirname(sidecar), exist_ok=True)
+        write_atomic(sidecar, json.dumps(stats, indent=2))
+
+    return stats
+
+
+# Метрики анализа сигнала (столбцы индекса SignalIndex)
+_SIGNAL_METRICS = ("duration_s", "samplerate", "channels", "peak_db", "clipping_ratio", "noise_floor_db", "signal_db", 
+                   "snr_db", "rolloff_hz", "low_freq_ratio")
+
+
+class SignalIndex:
+    """
+    Индекс анализа сигнала (SQLite): уровень шума, SNR, спектральный спад, клиппинг и др. по каждому файлу 
+    (см. analyze_signal). По индексу denoise_audio и pedalboard_processing подбирают параметры обработки 
+    и пропускают чистые записи, а сам индекс можно запрашивать (например, самые шумные лекции).
+
+    Запись устаревает, когда меняется файл (размер или время изменения). Индекс хранит только путь к базе, 
+    поэтому его можно передавать в воркеры process_folder: каждая операция открывает своё соединение.
+
+    Args:
+    - db_file (str): Путь к файлу SQLite. По умолчанию ".signal_index.sqlite".
+
+    Examples:
+    >>> index = SignalIndex()
+    >>> process_folder("lectures", denoise_audio, "denoised", extensions=AUDIO_EXTENSIONS, kwargs={"signal_index": index})
+    >>> index.query("snr_db < ? ORDER BY snr_db", (15,)) # Самые шумные записи
+    """
+    def __init__(self, db_file=".signal_index.sqlite"):
+        self.db_file = db_file
+
+    def _connect(self):
+        connection = sqlite3.connect(self.db_file, timeout=60.)
+        connection.row_factory = sqlite3.Row
+        columns = ", ".join(f"{metric} REAL" for metric in _SIGNAL_METRICS)
+        connection.execute(f"CREATE TABLE IF NOT EXISTS signal (file TEXT PRIMARY KEY, size INTEGER, mtime REAL, "
+                           f"analyzed_at REAL, {columns})")
+        return connection
+
+    def get(self, input_file):
+        """
+        Возвращает метрики файла из индекса или None, если файла нет в индексе или он изменился после анализа.
+        """
+        stat = os.stat(input_file)
+        with closing(self._connect()) as connection:
+            row = connection.execute("SELECT * FROM signal WHERE file = ?", (os.path.abspath(input_file),)).fetchone()
+        if row is None or (row["size"], row["mtime"]) != (stat.st_size, stat.st_mtime):
+            return None
+        return {metric: row[metric] for metric in _SIGNAL_METRICS}
+
+    def put(self, input_file, stats):
+        """
+        Сохраняет метрики файла (словарь из analyze_signal) в индекс.
+        """
+        stat = os.stat(input_file)
+        values = (os.path.abspath(input_file), stat.st_size, stat.st_mtime, time.time(), 
+                  *(stats[metric] for metric in _SIGNAL_METRICS))
+        with closing(self._connect()) as connection, connection:
+            connection.execute(f"INSERT OR REPLACE INTO signal VALUES ({', '.join('?' * len(values))})", values)
+
+    def query(self, where=None, params=()):
+        """
+        Возвращает записи индекса (словари с путём "file" и метриками), при необходимости — с условием SQL.
+
+        Args:
+        - where (str, опционально): Условие (и сортировка) SQL, например "snr_db < ? ORDER BY snr_db".
+        - params (tuple, опционально): Параметры условия.
+        """
+        sql = "SELECT * FROM signal" + (f" WHERE {where}" if where else "")
+        with closing(self._connect()) as connection:
+            return [dict(row) for row in connection.execute(sql, params)]
+
+
+def _signal_index(signal_index):
+    """
+    Индекс из пути к базе или готового SignalIndex.
+    """
+    return SignalIndex(signal_index) if isinstance(signal_index, str) else signal_index
+
+
+@instrumented
+def analyze_signal(input_file,
+                   signal_index=None,
+                   frame_size=2048,
+                   block_s=60.,
+                   clip_level=0.999,
+                   decoded_cache=None,
+                   ):
+    """
+    Потоково и векторно анализирует сигнал за один проход: уровень шума, уровень сигнала и SNR по энергии кадров, 
+    спектральный спад (85% энергии) и долю энергии ниже 80 Гц (гул, рокот) по среднему спектру, пик и клиппинг.
+
+    Args:
+    - input_file (str): Путь к аудиофайлу.
+    - signal_index (SignalIndex или str, опционально): Индекс (или путь к базе). Если файл уже проанализирован 
+      и не менялся — метрики берутся из индекса, иначе результат сохраняется в индекс.
+    - frame_size (int): Длина кадра в отсчётах (для энергии и спектра).
+    - block_s (float): Длина блока чтения в секундах.
+    - clip_level (float): Уровень (по модулю), начиная с которого отсчёт считается клиппингом.
+    - decoded_cache (DecodedAudioCache, опционально): Кэш декодированного аудио — читать файл из него, а не декодировать.
+
+    Return:
+    - dict: "duration_s", "samplerate", "channels", "peak_db" (dBFS), "clipping_ratio" — доля отсчётов с клиппингом, 
+      "noise_floor_db" и "signal_db" — 10-й и 95-й перцентили энергии кадров без цифровой тишины (dBFS), 
+      "snr_db" — их разность, "rolloff_hz" — частота спектрального спада, "low_freq_ratio" — доля энергии ниже 80 Гц.
+      Для полной тишины уровни равны None.
+    """
+    signal_index = _signal_index(signal_index)
+    if signal_index is not None:
+        stats = signal_index.get(input_file)
+        if stats is not None:
+            gauge(cached=True)
+            return stats
+
+    frame_db, spectrum = [], 0.
+    peak, clipped, frames = 0., 0, 0
+    with _open_audio(input_file, decoded_cache) as audio:
+        sample_rate, channels = audio.samplerate, audio.num_channels
+        block = frame_size * max(int(block_s * sample_rate) // frame_size, 1) # Блок кратен кадру
+        window = np.hanning(frame_size).astype(np.float32)
+
+        while True:
+            with phase("decode"):
+                audio_data = audio.read(block)
+            if audio_data.shape[-1] == 0:
+                break
+
+            with phase("process"):
+                frames += audio_data.shape[-1]
+                magnitude = np.abs(audio_data)
+                peak = max(peak, float(magnitude.max()))
+                clipped += int(np.count_nonzero(magnitude >= clip_level))
+
+                # Неполный кадр возможен только в конце файла — дополняем его нулями до целого
+                mono = audio_data.mean(axis=0)
+                if len(mono) % frame_size:
+                    mono = np.pad(mono, (0, frame_size - len(mono) % frame_size))
+                mono = mono.reshape(-1, frame_size)
+
+                frame_db.append(_power_db(np.mean(mono.astype(np.float64) ** 2, axis=1)))
+                spectrum = spectrum + (np.abs(np.fft.rfft(mono * window, axis=1)) ** 2).sum(axis=0)
+
+    # Цифровая тишина (паузы записи, склейки) — не шум, в перцентили её не включаем
+    frame_db = np.concatenate(frame_db) if frame_db else np.zeros(0)
+    active = frame_db[frame_db > -100.]
+    noise_floor = np.percentile(active, 10) if len(active) else None
+    signal_level = np.percentile(active, 95) if len(active) else None
+
+    # Спектральные метрики без постоянной составляющей
+    frequencies = np.fft.rfftfreq(frame_size, 1 / sample_rate)[1:]
+    spectrum = spectrum[1:] if np.ndim(spectrum) else np.zeros(0)
+    total = spectrum.sum()
+    if total > 0:
+        rolloff = frequencies[np.searchsorted(np.cumsum(spectrum), 0.85 * total)]
+        low_freq_ratio = spectrum[frequencies < 80.].sum() / total
+
+    stats = {
+        "duration_s": frames / sample_rate,
+        "samplerate": sample_rate,
+        "channels": channels,
+        "peak_db": _json_number(20 * np.log10(peak)) if peak > 0 else None,
+        "clipping_ratio": clipped / (frames * channels) if frames else 0.,
+        "noise_floor_db": _json_number(noise_floor) if noise_floor is not None else None,
+        "signal_db": _json_number(signal_level) if signal_level is not None else None,
+        "snr_db": _json_number(signal_level - noise_floor) if noise_floor is not None else None,
+        "rolloff_hz": float(rolloff) if total > 0 else None,
+        "low_freq_ratio": float(low_freq_ratio) if total > 0 else None,
+    }
+    gauge(audio_s=stats["duration_s"])
+
+    if signal_index is not None:
+        signal_index.put(input_file, stats)
+
+    return stats
+
+
+def recommend_processing(stats, clean_snr_db=30., noisy_snr_db=10., hum_ratio=0.1, hiss_rolloff_hz=8000.):
+    """
+    Подбирает параметры обработки по метрикам analyze_signal.
 
     Args:
-    - audio_file (строка): Путь к исходному аудиофайлу.
-    - start (строка): Начальное время для обрезки аудио. Например, "0m30s" обозначает 30 секунд.
-    - end (строка): Конечное время для обрезки аудио. Например, "1m0s" обозначает 1 минуту.        
-    - format (строка): Формат для сохранения результата. Поддерживаемые форматы — "mp3", "wav".            
-    - verbose (булево): Если True, выводит информацию о сохранении отрезка в файл.
+    - stats (dict): Метрики analyze_signal.
+    - clean_snr_db (float): SNR, начиная с которого запись считается чистой и денойзинг не нужен.
+    - noisy_snr_db (float): SNR, при котором и ниже денойзинг максимальный (prop_decrease 0.8); 
+      между noisy_snr_db и clean_snr_db сила денойзинга линейно убывает до 0.3.
+    - hum_ratio (float): Доля энергии ниже 80 Гц, начиная с которой добавляется ФВЧ 80 Гц.
+    - hiss_rolloff_hz (float): Спектральный спад, выше которого (шипение) добавляется ФНЧ на этой частоте.
 
-    Examples:
-    >>> make_sample("input_audio.mp3", start="0m30s", end="1m10s", format="wav", verbose=True)
-    # Отрезок сохранится в файл input_audio_0m30s_1m10s.wav
-    
-    >>> make_sample("music.wav", end="2m0s")
-    # Создастся файл "music_0m0s_2m0s.mp3" с началом аудио с 0 секунд и концом на 2 минуты.
+    Return:
+    - dict: "denoise" (bool), "prop_decrease", "highpass_cutoff" и "lowpass_cutoff" (None — фильтр не нужен).
+    """
+    snr = stats["snr_db"]
+    rolloff, low_freq_ratio = stats["rolloff_hz"], stats["low_freq_ratio"]
+    return {
+        "denoise": snr is not None and snr < clean_snr_db,
+        "prop_decrease": round(float(np.interp(snr, [noisy_snr_db, clean_snr_db], [0.8, 0.3])), 2) if snr is not None else 0.,
+        "highpass_cutoff": 80. if low_freq_ratio is not None and low_freq_ratio >= hum_ratio else None,
+        "lowpass_cutoff": hiss_rolloff_hz if rolloff is not None and rolloff > hiss_rolloff_hz else None,
+    }
 
-    Returns:
-        None
 
+def _copy_audio(input_file, output_file, block_s=60.):
+    """
+    Сохраняет аудио без обработки: копирует файл, а если формат выхода другой — перекодирует потоково.
     """
-    # Приводим время к миллисекундам
-    start_ms = parse_time(start)
-    end_ms = parse_time(end)
+    if os.path.splitext(input_file)[1].lower() == os.path.splitext(output_file)[1].lower():
+        shutil.copyfile(input_file, output_file)
+        return
 
-    # Загрузка аудиофайла
-    audio = AudioSegment.from_file(audio_file)
+    with _open_audio(input_file) as audio, AudioFile(output_file, 'w', audio.samplerate, audio.num_channels) as o:
+        while (audio_data := audio.read(int(block_s * audio.samplerate))).shape[-1]:
+            o.write(audio_data)
 
-    # Вырезаем отрезок из аудио
-    audio_segment = audio[start_ms:end_ms]
 
-    # Если имя выходного файла не указано, добавляем суффикс к названию исходного
-    if output_file == None:
-        output_file = change_name(audio_file, suffix=f'_{start}_{end}')
-    
-    # Сохранение результата (по умолчанию format="mp3")   
-    audio_segment.export(output_file, format=format)
-    
-    if verbose: # Выводим сообщение, если запрошен verbose
-        print(f"Отрезок сохранен в файл: {output_file}")
+def _runs(mask):
+    """
+    Возвращает начала и концы (не включая) серий True в булевом массиве.
+    """
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
 
 
-def denoise_audio(input_file, 
-                output_file, 
-                device="cuda",
-                prop_decrease=0.5,
-                ):
+def _frame_energy_db(input_file, frame_ms=30, block_s=60., decoded_cache=None):
     """
-    Денойзинг аудиофайла MP3.
+    Потоково считает энергию (dBFS, моно) по кадрам frame_ms миллисекунд. Память — O(число кадров), не O(длины записи).
+    """
+    energy = []
+    with _open_audio(input_file, decoded_cache) as audio:
+        sample_rate = audio.samplerate
+        frame = max(int(round(sample_rate * frame_ms / 1000)), 1)
+        block = frame * max(int(block_s * sample_rate) // frame, 1) # Блок кратен кадру: кадры не рвутся между блоками
 
-    Аргументы:
-    input_file (str): Путь к входному аудиофайлу MP3.
-    output_file (str): Путь для сохранения улучшенного аудиофайла.
-    device (str): Устройство для обработки (по умолчанию "cuda").
-    prop_decrease (float): Пропорция уменьшения шума. Разумны значения от 0 до 1. В случае 1 очень вероятны артефакты денойзинга, рекомендуются значения до 0.8.
+        while True:
+            with phase("decode"):
+                audio_data = audio.read(block)
+            if audio_data.shape[-1] == 0:
+                break
 
-    Возвращает:
-    None
+            with phase("process"):
+                mono = audio_data.mean(axis=0, dtype=np.float64)
+                
+                # Неполный кадр возможен только в конце файла — дополняем его нулями до целого
+                if len(mono) % frame:
+                    mono = np.pad(mono, (0, frame - len(mono) % frame))
+                energy.append(_power_db(np.mean(mono.reshape(-1, frame) ** 2, axis=1)))
+
+    return np.concatenate(energy) if energy else np.zeros(0), sample_rate
+
+
+@instrumented
+def detect_speech_segments(input_file,
+                           manifest_file=None,
+                           min_segment_s=5.,
+                           max_segment_s=30.,
+                           min_silence_s=0.3,
+                           max_gap_s=2.,
+                           min_speech_s=0.2,
+                           threshold_db=None,
+                           margin_db=12.,
+                           frame_ms=30,
+                           pad_s=0.2,
+                           block_s=60.,
+                           decoded_cache=None,
+                           ):
     """
-    # Проверка на наличие строки "cuda"
-    if device == "cuda" and "cuda" not in device.lower():
-        print("CUDA не обнаружен. Используется CPU.")
-    
-    try: # Пробуем загрузить аудио с torchaudio (удобно дружелюбностью к разным форматам)
-        sound, sample_rate = torchaudio.load(input_file, normalize=False)
-    except Exception as e:
-        print(f"Произошла ошибка при загрузке файла: {e}")
-        return
-    
-    # Преобразование аудио в numpy array (требует денойзер)
-    sound_np = sound.squeeze().numpy()
+    Находит участки речи в записи по энергии сигнала и делит их на отрезки заданной длины с разрезами в паузах.
 
-    # Проведение денойзинга
-    reduced_noise = nr.reduce_noise(y=sound_np, sr=sample_rate, prop_decrease=prop_decrease, use_torch=True, device=device)
-    
-    # Сохранение очищенного аудиофайла
-    sf.write(output_file, reduced_noise, sample_rate)
-    
-    
-def convert_m4a_to_mp3(input_file, output_file):
+    Файл читается потоково, энергия считается векторно по кадрам frame_ms. Порог речи по умолчанию — 
+    уровень шума (10-й перцентиль энергии кадров) плюс margin_db. Паузы короче min_silence_s не разрывают речь, 
+    соседние участки речи объединяются в один отрезок, пока он не длиннее max_segment_s и пауза между ними 
+    не длиннее max_gap_s (короткие, меньше min_segment_s, объединяются при любой паузе). Участки длиннее 
+    max_segment_s режутся в самом тихом месте. Длинные паузы в отрезки не попадают.
+
+    Args:
+    - input_file (str): Путь к аудиофайлу.
+    - manifest_file (str, опционально): Путь для сохранения списка отрезков в CSV "start,end" 
+      (читается functions.read_cue_list и make_samples).
+    - min_segment_s (float): Желательная минимальная длина отрезка в секундах.
+    - max_segment_s (float): Максимальная длина отрезка в секундах (30 — окно whisper).
+    - min_silence_s (float): Минимальная длина паузы, разрывающей речь.
+    - max_gap_s (float): Максимальная пауза внутри отрезка при объединении участков речи.
+    - min_speech_s (float): Участки «речи» короче этого (щелчки, стуки) отбрасываются.
+    - threshold_db (float, опционально): Абсолютный порог речи в dBFS. По умолчанию определяется по уровню шума.
+    - margin_db (float): Превышение над уровнем шума для автоматического порога.
+    - frame_ms (int): Длина кадра анализа в миллисекундах.
+    - pad_s (float): Запас по краям отрезка в секундах (не заходит за середину паузы до соседнего отрезка).
+    - block_s (float): Длина блока чтения в секундах.
+    - decoded_cache (DecodedAudioCache, опционально): Кэш декодированного аудио (удобно при подборе параметров).
+
+    Return:
+    - list: Отрезки [{"start": "1m2s30ms", "end": "1m31s500ms"}, ...] в формате parse_time — смещения в исходном файле.
+
+    Examples:
+    >>> segments = detect_speech_segments("lecture.mp3", "lecture_segments.csv")
+    >>> export_segments("lecture.mp3", segments, output_folder="segments", format="wav")
+    """
+    energy, sample_rate = _frame_energy_db(input_file, frame_ms=frame_ms, block_s=block_s, decoded_cache=decoded_cache)
+    frame_s = max(int(round(sample_rate * frame_ms / 1000)), 1) / sample_rate
+    frames = lambda seconds: max(int(round(seconds / frame_s)), 1)
+
+    segments = []
+    finite = energy[np.isfinite(energy)]
+    if len(finite):
+        if threshold_db is None:
+            threshold_db = np.percentile(finite, 10) + margin_db
+
+        # Участки речи, паузы короче min_silence_s не считаем разрывом
+        starts, ends = _runs(energy > threshold_db)
+        if len(starts):
+            keep = starts[1:] - ends[:-1] >= frames(min_silence_s)
+            starts, ends = starts[np.concatenate([[True], keep])], ends[np.concatenate([keep, [True]])]
+
+        # Отбрасываем слишком короткие всплески
+        long_enough = ends - starts >= frames(min_speech_s)
+        starts, ends = starts[long_enough], ends[long_enough]
+
+        # Объединяем соседние участки в отрезки не длиннее max_segment_s (с учётом запаса pad_s по краям)
+        max_frames = frames(max(max_segment_s - 2 * pad_s, frame_s))
+        min_frames, max_gap = frames(min_segment_s), frames(max_gap_s)
+        merged = []
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            if merged and end - merged[-1][0] <= max_frames and \
+                    (start - merged[-1][1] <= max_gap or merged[-1][1] - merged[-1][0] < min_frames):
+                merged[-1][1] = end
+            else:
+                merged.append([start, end])
+
+        # Слишком длинные участки режем в самом тихом кадре между min_segment_s и max_segment_s от начала
+        for start, end in merged:
+            while end - start > max_frames:
+                low = start + min(min_frames, max_frames - 1)
+                cut = low + int(np.argmin(energy[low:start + max_frames]))
+                segments.append([start, cut])
+                start = cut
+            segments.append([start, end])
+
+    # Переводим кадры в миллисекунды и добавляем запас по краям, не заходя за середину паузы до соседа
+    duration_ms = len(energy) * frame_s * 1000
+    bounds = np.array(segments, dtype=np.float64).reshape(-1, 2) * frame_s * 1000
+    if len(bounds):
+        pad_ms = pad_s * 1000
+        middles = (bounds[1:, 0] + bounds[:-1, 1]) / 2
+        lower = np.concatenate([[0.], middles])
+        upper = np.concatenate([middles, [duration_ms]])
+        bounds[:, 0] = np.maximum(bounds[:, 0] - pad_ms, lower)
+        bounds[:, 1] = np.minimum(bounds[:, 1] + pad_ms, upper)
+
+    segments = [{"start": format_time(start), "end": format_time(end)} for start, end in bounds.tolist()]
+    count("segments", len(segments))
+    gauge(audio_s=duration_ms / 1000)
+
+    if manifest_file is not None:
+        with open(manifest_file, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(["start", "end"])
+            writer.writerows((segment["start"], segment["end"]) for segment in segments)
+
+    return segments
+
+
+def export_segments(input_file, segments, output_folder=None, format="wav", verbose=False):
     """
-    Конвертирует файл формата M4A в файл формата MP3.
+    Сохраняет отрезки из detect_speech_segments отдельными аудиофайлами (за один проход по записи, см. make_samples).
+    Начало отрезка есть в имени файла (например, lecture_1m2s30ms_1m31s500ms.wav): по нему таймкоды 
+    транскрипции отрезка переводятся во время исходной записи.
 
     Args:
-    input_file (str): Путь к исходному файлу M4A.
-    output_file (str): Путь для сохранения конвертированного файла MP3.
+    - input_file (str): Путь к исходному аудиофайлу.
+    - segments (list или str): Отрезки (словари "start"/"end" или пары (start, end)) или путь к CSV манифесту.
+    - output_folder (str, опционально): Папка для сохранения. По умолчанию — папка исходного файла.
+    - format (str): Формат отрезков ("wav" или "mp3").
+    - verbose (bool): Выводить ли информацию о каждом сохранённом отрезке.
 
     Return:
-    None
+    - list: Пути к сохранённым отрезкам (в порядке segments).
+    """
+    if not isinstance(segments, str):
+        segments = [(segment["start"], segment["end"]) if isinstance(segment, dict) else tuple(segment) 
+                    for segment in segments]
+    return make_samples(input_file, segments, output_folder=output_folder, format=format, verbose=verbose)
+
+
+def _run_pipelined(blocks, process, write, queue_depth=4):
     """
+    Конвейер из трёх потоков: чтение (генератор blocks) и обработка (process) — в фоновых потоках, 
+    запись (write) — в текущем. Потоки связаны очередями по queue_depth блоков, поэтому в памяти одновременно 
+    не больше 2 * queue_depth + 3 блоков. Декодирование, эффекты pedalboard и кодирование отпускают GIL и 
+    выполняются одновременно. Ошибка в любом потоке останавливает конвейер и пробрасывается в текущий поток.
+    """
+    end = object()
+    stop = threading.Event()
+    errors = []
+    decoded, processed = queue.Queue(queue_depth), queue.Queue(queue_depth)
+
+    def _put(blocks_queue, block):
+        # Не блокируемся навсегда, если конвейер остановлен из-за ошибки
+        while not stop.is_set():
+            try:
+                blocks_queue.put(block, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _get(blocks_queue):
+        while not stop.is_set():
+            try:
+                return blocks_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return end
+
+    def _reader():
+        try:
+            for block in blocks:
+                if not _put(decoded, block):
+                    return
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        _put(decoded, end)
+
+    def _processor():
+        try:
+            while (block := _get(decoded)) is not end:
+                if not _put(processed, process(block)):
+                    return
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        _put(processed, end)
+
+    # Фазы decode и process из фоновых потоков попадают в событие текущего вызова
+    threads = [threading.Thread(target=propagate_instrumentation(target), daemon=True) for target in (_reader, _processor)]
+    for thread in threads:
+        thread.start()
+
     try:
-        output_file = os.path.splitext(output_file)[0] + '.mp3'
-        ffmpeg.input(input_file).output(output_file).run()
-        print(f"Файл {input_file} успешно сконвертирован в {output_file}")
-    except ffmpeg.Error as e:
-        print(f"Произошла ошибка при конвертации: {e.stderr}")
-        raise e
-    
-    
+        while (block := _get(processed)) is not end:
+            write(block)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+
+
+@instrumented
 def pedalboard_processing(input_file: str, 
                           output_file: str = None, 
                           chunk_s: float = 1.,
@@ -128,6 +1587,10 @@ def pedalboard_processing(input_file: str,
                           limiter_threshold_db: float = None,
                           highpass_cutoff: float = None,
                           lowpass_cutoff: float = None,
+                          loudness_metric: str = "gated_rms",
+                          pipelined: bool = False,
+                          queue_depth: int = 4,
+                          signal_index = None,
                           ):
     """
         Обрабатывает аудиофайл цепочкой эффектов.
@@ -141,16 +1604,40 @@ def pedalboard_processing(input_file: str,
         - limiter_threshold_db (float, опционально): Порог в децибелах (dB) для лимитера (ограничивает предельную громкость пиков).
         - highpass_cutoff (float, опционально): Частота среза низких частот.
         - lowpass_cutoff (float, опционально): Частота среза высоких частот.
+        - loudness_metric (str, опционально): Мера громкости для target_db, измеряемая по всему файлу (см. analyze_loudness): 
+          "gated_rms" (RMS без тишины, dBFS, по умолчанию), "rms" (RMS всего файла, dBFS) или "lufs" (интегральная громкость, LUFS).
+          Результат анализа кэшируется рядом с файлом, повторная обработка не анализирует файл заново.
+        - pipelined (bool, опционально): Декодировать, обрабатывать и кодировать фрагменты одновременно в трёх потоках 
+          (на многоядерных машинах может ускорить длинные лекции в сжатых форматах; выигрыш стоит замерить на своих файлах, 
+          см. benchmark.py). Результат совпадает с последовательной обработкой. По умолчанию False — последовательная обработка.
+        - queue_depth (int, опционально): Количество фрагментов в очереди между потоками; ограничивает память конвейера. По умолчанию 4.
+        - signal_index (SignalIndex или str, опционально): Индекс анализа сигнала (см. analyze_signal). Не заданные явно фильтры 
+          подбираются по записи (ФВЧ при гуле, ФНЧ при шипении, см. recommend_processing), а лимитер добавляется, если усиление 
+          подняло бы пики выше -1 dBFS. Если обрабатывать нечего, файл сохраняется без обработки и перекодирования.
 
         Return:
         - None: Функция сохранит результат в файл output_file. 
 
     """
     
+    # Если не указано иное, файл сохраняем результат с добавлением суффикса к имени
+    if output_file == None:
+        output_file = change_name(input_file, suffix='_processed')
+
+    # Метрики записи из индекса анализа сигнала: по ним подбираем не заданные явно фильтры
+    stats = None
+    if signal_index is not None:
+        with phase("analyze"):
+            stats = analyze_signal(input_file, signal_index=signal_index)
+        recommendation = recommend_processing(stats)
+        highpass_cutoff = highpass_cutoff or recommendation["highpass_cutoff"]
+        lowpass_cutoff = lowpass_cutoff or recommendation["lowpass_cutoff"]
+
     with AudioFile(input_file) as audio:
 
         # Создаём цепочку эффектов
         effects = []
+        total_gain_db = 0.
 
         # Обрезка нижних частот (и оставление верхних ~ HighPass) 
         if highpass_cutoff:
@@ -167,25 +1654,30 @@ def pedalboard_processing(input_file: str,
         # Усиление громкости (нормализация аудио)
         if target_db and not gain_db:
             
-            # Оцениваем громкость по первым 10 секундам
-            audio_data = audio.read(audio.samplerate * 10) 
-        
-            # Посчитаем амплитуду аудиосигнала
-            amplitude = np.sqrt(np.mean(audio_data**2))
-            
-            # Оценка громкости в дБ
-            volume_dB = 20 * np.log10(amplitude)
+            # Оцениваем громкость по всему файлу
+            metrics = {"gated_rms": "gated_rms_db", "rms": "rms_db", "lufs": "integrated_lufs"}
+            with phase("analyze"):
+                volume_dB = analyze_loudness(input_file)[metrics[loudness_metric]]
+            if volume_dB is None:
+                raise ValueError(f"Файл {input_file} не содержит сигнала, нормализация громкости невозможна.")
             
             # Добавляем в цепочку эффектов усиление громкости
             effects.append(
                 Gain(gain_db = target_db - volume_dB)
             )
+            total_gain_db += target_db - volume_dB
             
         if gain_db:
             # Добавляем в цепочку эффектов усиление громкости
             effects.append(
                 Gain(gain_db = gain_db)
             )
+            total_gain_db += gain_db
+
+        # Усиление подняло бы пики выше -1 dBFS — защищаем лимитером
+        if stats is not None and limiter_threshold_db is None and total_gain_db > 0 \
+                and stats["peak_db"] is not None and stats["peak_db"] + total_gain_db > -1.:
+            limiter_threshold_db = -1.
         
         if limiter_threshold_db:
             # Добавляем лимитер, чтобы запретить сигналу превышать порог громкости
@@ -193,47 +1685,710 @@ def pedalboard_processing(input_file: str,
                 Limiter(threshold_db=limiter_threshold_db)
             )
         
+        # Обрабатывать нечего — сохраняем запись как есть, без перекодирования
+        if not effects:
+            with phase("encode"):
+                _copy_audio(input_file, output_file)
+            gauge(skipped=True)
+            return
+
         # Создаём цепочку обработки звука:
         board = Pedalboard(effects)
 
-        # Если не указано иное, файл сохраняем результат с добавлением суффикса к имени
-        if output_file == None:
-            output_file = change_name(input_file, suffix='_processed')
-
         # Открываем аудиофайл для записи
         with AudioFile(output_file, 'w', audio.samplerate, audio.num_channels) as o:
 
+            # Размер фрагмента в отсчётах считаем один раз
+            chunk_frames = max(1, int(round(chunk_s * audio.samplerate)))
+
             # Читаем по chunk_s секунд за раз
-            while audio.tell() < audio.frames:
-                chunk = audio.read(chunk_s * audio.samplerate)
-                
-                # Пропускаем звук через цепочку обработки:
-                effected = board(chunk, audio.samplerate, reset=False)
-                
-                # Записываем вывод в output_file:
-                o.write(effected)
+            def read_chunks():
+                while audio.tell() < audio.frames:
+                    with phase("decode"):
+                        chunk = audio.read(chunk_frames)
+                    yield chunk
+
+            # Пропускаем звук через цепочку обработки:
+            def process(chunk):
+                with phase("process"):
+                    return board(chunk, audio.samplerate, reset=False)
+
+            # Записываем вывод в output_file:
+            def write(effected):
+                with phase("encode"):
+                    o.write(effected)
+                count("chunks")
+
+            if pipelined:
+                _run_pipelined(read_chunks(), process, write, queue_depth=queue_depth)
+            else:
+                for chunk in read_chunks():
+                    write(process(chunk))
+
+        gauge(audio_s=audio.frames / audio.samplerate)
+
+
+def _channel_selector(spec, num_channels):
+    """
+    Возвращает функцию блок (каналы, отсчёты) -> выход (каналы, отсчёты) для спецификации канала extract_channel.
+    Один канал и набор каналов с постоянным шагом берутся срезом — view без копирования данных.
+    """
+    if isinstance(spec, dict): # Сведение каналов с весами: строка весов на каждый выходной канал
+        weights = np.atleast_2d(np.asarray(spec["weights"], dtype=np.float32))
+        if weights.shape[1] != num_channels:
+            raise ValueError(f"Количество весов ({weights.shape[1]}) не совпадает с количеством каналов ({num_channels}).")
+        return lambda block: weights @ block
+
+    channels = [spec] if isinstance(spec, int) else list(spec)
+    if not channels or not all(-num_channels <= channel < num_channels for channel in channels):
+        raise ValueError(f"Каналы {spec} вне диапазона: в файле {num_channels} каналов.")
+    channels = [channel % num_channels for channel in channels]
+
+    # Каналы с постоянным положительным шагом (0; 1; 0, 2; ...) — срез
+    step = channels[1] - channels[0] if len(channels) > 1 else 1
+    if step > 0 and channels == list(range(channels[0], channels[-1] + 1, step)):
+        view = slice(channels[0], channels[-1] + 1, step)
+        return lambda block: block[view]
+    
+    return lambda block: block[channels]
 
 
-def extract_channel(input_file, output_file, channel = 0):
+@instrumented
+def extract_channel(input_file, output_file=None, channel = 0, outputs=None, block_s=10.):
     """
-    Извлекает аудиоканал из файла и сохраняет аудио в том же формате.
+    Извлекает аудиоканал (или несколько каналов, или их сведение) из файла.
+
+    Файл читается потоково блоками по block_s секунд, каналы берутся из блока без копирования (срезами numpy). 
+    Несколько выходов (например, петличка и микрофон зала) записываются за один проход — с постоянной памятью.
 
     Args:
     input_file (str): Путь к исходному аудиофайлу.
-    output_file (str): Путь для сохранения аудиоканала.
-    channel (int): Канал, который требуется извлечь (обычно 0 или 1 (стерео), при этом 0 — соответствует L-каналу)
+    output_file (str): Путь для сохранения аудиоканала. Обязателен, если не указан outputs. Формат — по расширению: 
+        wav, flac, mp3, ogg и др. пишет pedalboard, форматы, которых он не пишет (m4a, aac, opus), перекодируются через ffmpeg 
+        (см. convert_audio).
+    channel (int, list или dict): Канал, который требуется извлечь (обычно 0 или 1 (стерео), при этом 0 — соответствует L-каналу). 
+        Список каналов (например, [0, 2]) сохраняет несколько каналов в один файл; {"weights": [0.7, 0.3]} — сведение каналов 
+        в моно с весами (список списков весов — в несколько каналов).
+    outputs (dict, optional): Несколько выходов за один проход: {путь к файлу: channel}. Заменяет output_file и channel.
+    block_s (float): Длина блока чтения в секундах.
+
+    Examples:
+    >>> extract_channel("lecture.wav", "lecture_lav.wav", channel=0)
+    >>> extract_channel("lecture.wav", outputs={"lav.wav": 0, "room.wav": 1, "mix.wav": {"weights": [0.7, 0.3]}})
 
     Return:
-    None
+    list: Пути к сохранённым файлам.
     """
-    audio = AudioSegment.from_file(input_file)
-    
-    # Извлечение левого канала
-    left_channel = audio.split_to_mono()[channel]
-    
-    # Получение формата исходного файла
-    _, file_extension = os.path.splitext(input_file)
-    output_format = file_extension[1:]  # Избавляемся от точки в расширении
+    if outputs is None:
+        if output_file is None:
+            raise ValueError("Укажите output_file или outputs.")
+        outputs = {output_file: channel}
+
+    transcode = {} # Выходы в форматах, которых не пишет pedalboard: {путь: временный wav}
+    try:
+        frames, sample_rate = _extract_channels(input_file, outputs, transcode, block_s)
+
+        with phase("transcode"):
+            for file, temp_file in transcode.items():
+                report = convert_audio(temp_file, file, format=os.path.splitext(file)[1].lower().lstrip('.'))
+                if report["status"] == "failed":
+                    raise RuntimeError(f"Не удалось записать {file}: {report['error']}")
+    finally:
+        for temp_file in transcode.values():
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+
+    gauge(audio_s=frames / sample_rate)
+    return list(outputs)
+
+
+def _extract_channels(input_file, outputs, transcode, block_s):
+    """
+    Один проход extract_channel: читает input_file блоками и пишет каналы в outputs. 
+    Выходы, которых не пишет pedalboard, пишутся во временные wav и добавляются в transcode. Возвращает (frames, sample_rate).
+    """
+    with _open_audio(input_file) as audio:
+        sample_rate, num_channels = audio.samplerate, audio.num_channels
+        selectors = {file: _channel_selector(spec, num_channels) for file, spec in outputs.items()}
+
+        # Число каналов каждого выхода — по пробному пустому блоку
+        empty = np.zeros((num_channels, 0), dtype=np.float32)
+        writers = {}
+        try:
+            for file, select in selectors.items():
+                num_output_channels = select(empty).shape[0]
+                try:
+                    writers[file] = AudioFile(file, 'w', sample_rate, num_output_channels)
+                except ValueError: # Расширение, которого не пишет pedalboard (например, m4a)
+                    if os.path.splitext(file)[1].lower().lstrip('.') not in _AUDIO_FORMATS:
+                        raise
+                    descriptor, transcode[file] = tempfile.mkstemp(suffix=".wav", dir=os.path.dirname(file) or ".")
+                    os.close(descriptor)
+                    writers[file] = AudioFile(transcode[file], 'w', sample_rate, num_output_channels)
+
+            block = int(block_s * sample_rate)
+            frames = 0
+            while True:
+                with phase("decode"):
+                    audio_data = audio.read(block)
+                if audio_data.shape[-1] == 0:
+                    break
+                frames += audio_data.shape[-1]
+
+                with phase("encode"):
+                    for file, select in selectors.items():
+                        writers[file].write(select(audio_data))
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+    return frames, sample_rate
+
+
+class _FFmpegReader:
+    """
+    Декодирует аудиофайл через ffmpeg в поток float32 (каналы, отсчёты) — для форматов, 
+    которые не читает pedalboard (например, m4a на Linux). Повторяет нужную часть интерфейса AudioFile.
+
+    stderr ffmpeg пишется во временный файл (а не в непрочитанный pipe, переполнение которого останавливает ffmpeg). 
+    Если файл дочитан до конца, а ffmpeg завершился с ошибкой, close() выбрасывает RuntimeError — 
+    вместо молча обрезанного аудио.
+    """
+    def __init__(self, input_file):
+        stream = next(stream for stream in ffmpeg.probe(input_file)["streams"] if stream["codec_type"] == "audio")
+        self.input_file = input_file
+        self.samplerate = int(stream["sample_rate"])
+        self.num_channels = int(stream["channels"])
+        self._eof = False
+        self._stderr = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(
+            ["ffmpeg", "-hide_banner", "-nostdin", "-nostats", "-loglevel", "error", "-i", input_file, 
+             "-f", "f32le", "-acodec", "pcm_f32le", "pipe:"],
+            stdout=subprocess.PIPE, stderr=self._stderr,
+        )
+
+    def read(self, num_frames):
+        size = int(num_frames) * self.num_channels * 4
+        raw = self._process.stdout.read(size)
+        if len(raw) < size:
+            self._eof = True
+        raw = raw[:len(raw) - len(raw) % (self.num_channels * 4)] # Неполный кадр в конце потока отбрасываем
+        return np.frombuffer(raw, dtype=np.float32).reshape(-1, self.num_channels).T
+
+    def close(self, check=True):
+        if self._process is None:
+            return
+        
+        process, self._process = self._process, None
+        if not self._eof: # Чтение остановлено раньше конца файла — ffmpeg больше не нужен
+            process.terminate()
+        process.stdout.close()
+        returncode = process.wait()
+
+        self._stderr.seek(0)
+        error = self._stderr.read().decode(errors="replace").strip()
+        self._stderr.close()
+
+        if check and self._eof and returncode != 0:
+            raise RuntimeError(f"ffmpeg не смог декодировать {self.input_file} (код {returncode}): {error}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        # Ошибку ffmpeg не выбрасываем поверх уже возникшего исключения
+        self.close(check=exc_type is None)
+
+
+def _open_audio(input_file, decoded_cache=None):
+    """
+    Открывает аудиофайл для потокового чтения: через pedalboard, а если формат не поддерживается — через ffmpeg.
+    С decoded_cache (DecodedAudioCache) файл читается из кэша декодированного аудио.
+    """
+    if decoded_cache is not None:
+        return decoded_cache.open(input_file)
     
-    # Сохранение левого канала в файл в том же формате
-    left_channel.export(output_file, format=output_format)
\ No newline at end of file
+    try:
+        return AudioFile(input_file)
+    except Exception:
+        return _FFmpegReader(input_file)
+
+
+class _CachedAudioReader:
+    """
+    Чтение из кэша декодированного аудио с интерфейсом AudioFile (seek, tell, read). 
+    read возвращает view (каналы, отсчёты) на memory-mapped файл — без копирования и декодирования.
+    """
+    def __init__(self, samples, samplerate):
+        self.samples = samples
+        self.samplerate = samplerate
+        self.num_channels, self.frames = samples.shape
+        self._position = 0
+
+    def seek(self, frame):
+        self._position = min(max(int(frame), 0), self.frames)
+
+    def tell(self):
+        return self._position
+
+    def read(self, num_frames):
+        start = self._position
+        self._position = min(start + int(num_frames), self.frames)
+        return self.samples[:, start:self._position]
+
+    def close(self):
+        self.samples = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class DecodedAudioCache:
+    """
+    Кэш декодированного аудио: исходный файл (например, MP3 лекции) декодируется один раз в float32 
+    memory-mapped файл с небольшим заголовком метаданных. Последующие чтения и вырезание отрезков — 
+    view numpy на отображённый в память файл, без повторного декодирования и копирования.
+
+    Запись устаревает, когда меняется исходный файл (размер или время изменения), и декодируется заново. 
+    При превышении max_size_mb удаляются давно не использованные записи.
+
+    Args:
+    - cache_folder (str): Папка кэша. По умолчанию ".decoded_cache".
+    - max_size_mb (float, опционально): Предельный суммарный размер кэша на диске в МБ.
+    - block_s (float): Длина блока декодирования в секундах.
+
+    Examples:
+    >>> cache = DecodedAudioCache(max_size_mb=20000)
+    >>> make_samples("lecture.mp3", "cues.csv", decoded_cache=cache) # Декодирование — один раз
+    >>> analyze_loudness("lecture.mp3", decoded_cache=cache) # Чтение из кэша
+    >>> samples, sample_rate = cache.load("lecture.mp3") # (каналы, отсчёты), view без копирования
+    """
+    _HEADER_SIZE = 4096 # Данные начинаются с границы страницы
+    _FORMAT = "float32-interleaved-v1"
+
+    def __init__(self, cache_folder=".decoded_cache", max_size_mb=None, block_s=60.):
+        self.cache_folder = cache_folder
+        self.max_size_mb = max_size_mb
+        self.block_s = block_s
+
+    def path(self, input_file):
+        """
+        Путь к файлу кэша для input_file.
+        """
+        digest = hashlib.sha256(os.path.abspath(input_file).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_folder, f"{os.path.basename(input_file)}.{digest}.f32")
+
+    def _read_header(self, cache_file):
+        try:
+            with open(cache_file, 'rb') as file:
+                header = json.loads(file.read(self._HEADER_SIZE).rstrip(b' \0'))
+        except (OSError, ValueError):
+            return None
+        return header if header.get("format") == self._FORMAT else None
+
+    def _decode(self, input_file, cache_file, source):
+        """
+        Декодирует input_file потоково во временный файл и атомарно переименовывает его в cache_file.
+        """
+        os.makedirs(self.cache_folder, exist_ok=True)
+        temp_file = unique_temp_path(cache_file)
+        try:
+            with _open_audio(input_file) as audio, open(temp_file, 'wb') as file:
+                file.write(b' ' * self._HEADER_SIZE)
+                frames = 0
+                while True:
+                    with phase("decode"):
+                        audio_data = audio.read(int(self.block_s * audio.samplerate))
+                    if audio_data.shape[-1] == 0:
+                        break
+                    # На диске отсчёты чередуются по каналам: отрезок по времени — непрерывный участок файла
+                    np.ascontiguousarray(audio_data.T, dtype=np.float32).tofile(file)
+                    frames += audio_data.shape[-1]
+
+                header = dict(source, format=self._FORMAT, samplerate=audio.samplerate, 
+                              channels=audio.num_channels, frames=frames)
+                encoded = json.dumps(header).encode('utf-8')
+                if len(encoded) > self._HEADER_SIZE:
+                    raise ValueError("Метаданные не помещаются в заголовок кэша.")
+                file.seek(0)
+                file.write(encoded)
+
+            os.replace(temp_file, cache_file)
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+
+        return header
+
+    def open(self, input_file):
+        """
+        Открывает input_file через кэш (декодирует, если записи нет или она устарела).
+
+        Return:
+        - Объект с интерфейсом AudioFile для чтения (samplerate, num_channels, frames, seek, tell, read).
+        """
+        samples, samplerate = self.load(input_file)
+        return _CachedAudioReader(samples, samplerate)
+
+    def load(self, input_file):
+        """
+        Возвращает всё аудио input_file из кэша.
+
+        Return:
+        - tuple: (массив (каналы, отсчёты) float32 — view на memory-mapped файл только для чтения, частота дискретизации).
+        """
+        cache_file = self.path(input_file)
+        stat = os.stat(input_file)
+        source = {"source": os.path.abspath(input_file), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+        header = self._read_header(cache_file)
+        if header is None or any(header.get(key) != value for key, value in source.items()):
+            header = self._decode(input_file, cache_file, source)
+            count("decoded")
+            self.evict(keep=cache_file)
+        else:
+            count("cache_hits")
+            os.utime(cache_file) # Отмечаем использование записи (для вытеснения давно не использованных)
+
+        if header["frames"] == 0:
+            return np.zeros((header["channels"], 0), dtype=np.float32), header["samplerate"]
+
+        data = np.memmap(cache_file, dtype=np.float32, mode='r', offset=self._HEADER_SIZE, 
+                         shape=(header["frames"], header["channels"]))
+        return data.T, header["samplerate"]
+
+    def evict(self, keep=None):
+        """
+        Удаляет давно не использованные записи, пока кэш больше max_size_mb (запись keep не удаляется).
+        """
+        if self.max_size_mb is None or not os.path.isdir(self.cache_folder):
+            return
+
+        entries = []
+        for entry in os.scandir(self.cache_folder):
+            if entry.name.endswith(".f32") and entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        entries.sort(reverse=True) # Сначала недавно использованные
+        total = 0
+        for used, size, path in entries:
+            total += size
+            if total > self.max_size_mb * 1024 * 1024 and path != keep:
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError: # Файл открыт другим процессом (Windows) или уже удалён
+                    pass
+
+    def clear(self):
+        """
+        Удаляет все записи кэша.
+        """
+        if os.path.isdir(self.cache_folder):
+            for entry in os.scandir(self.cache_folder):
+                if entry.name.endswith(".f32"):
+                    os.remove(entry.path)
+
+
+class _EffectsStage:
+    """
+    Стадия с эффектами pedalboard (фильтры, усиление, лимитер). Соседние эффекты объединяются в одну цепочку.
+    """
+    def __init__(self, *plugins):
+        self.board = Pedalboard(list(plugins))
+
+    def process(self, audio_data, sample_rate):
+        return self.board(audio_data, sample_rate, reset=False), sample_rate
+
+    def flush(self):
+        self.board.reset()
+        return None, None
+
+    def reset(self):
+        self.board.reset()
+
+
+class _ChannelStage:
+    """
+    Стадия выбора канала или сведения каналов с весами weights (по умолчанию — среднее, т.е. моно).
+    """
+    def __init__(self, channel=None, weights=None):
+        self.channel = channel
+        self.weights = weights
+
+    def process(self, audio_data, sample_rate):
+        if self.channel is not None:
+            return audio_data[self.channel:self.channel + 1], sample_rate
+        
+        weights = self.weights if self.weights is not None else np.full(audio_data.shape[0], 1. / audio_data.shape[0])
+        return np.asarray(weights, dtype=np.float32)[None, :] @ audio_data, sample_rate
+
+    def flush(self):
+        return None, None
+
+    def reset(self):
+        pass
+
+
+class _ResampleStage:
+    """
+    Стадия потокового ресэмплинга до sample_rate (pedalboard StreamResampler, память не растёт с длиной записи).
+    """
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.resampler = None
+
+    def process(self, audio_data, sample_rate):
+        if sample_rate == self.sample_rate:
+            return audio_data, sample_rate
+        
+        if self.resampler is None:
+            self.resampler = StreamResampler(sample_rate, self.sample_rate, audio_data.shape[0])
+        
+        return self.resampler.process(np.ascontiguousarray(audio_data, dtype=np.float32)), self.sample_rate
+
+    def flush(self):
+        if self.resampler is None:
+            return None, None
+        
+        output, self.resampler = self.resampler.process(), None
+        return output, self.sample_rate
+
+    def reset(self):
+        self.resampler = None
+
+
+class AudioPipeline:
+    """
+    Потоковая цепочка обработки аудио: файл декодируется один раз, блоки проходят через все стадии 
+    и кодируются один раз в итоговый файл, без промежуточных файлов между шагами.
+
+    Заменяет цепочку convert_m4a_to_mp3 → extract_channel → denoise_audio → pedalboard_processing.
+    Стадии добавляются методами и выполняются в порядке добавления.
+
+    Args:
+    - block_s (float): Длина блока чтения в секундах.
+
+    Examples:
+    >>> pipeline = (AudioPipeline()
+    ...             .channel(0)
+    ...             .highpass(80)
+    ...             .denoise(prop_decrease=0.6, noise_profile="audio/noise_sample.wav")
+    ...             .gain(6)
+    ...             .limiter(-1)
+    ...             .for_whisper())
+    >>> pipeline.run("lecture.m4a", "lecture_16k.wav")
+    # Моно, 16 кГц, float32 — готово для whisper
+
+    >>> audio = pipeline.run("lecture.m4a")
+    # Без output_file после for_whisper() возвращается одномерный массив float32 (для model.transcribe)
+    """
+    def __init__(self, block_s=10.):
+        self.block_s = block_s
+        self.stages = []
+        self.float_output = False
+
+    def _add_effect(self, plugin):
+        # Соседние эффекты объединяем в одну цепочку pedalboard
+        if self.stages and isinstance(self.stages[-1], _EffectsStage):
+            self.stages[-1].board.append(plugin)
+        else:
+            self.stages.append(_EffectsStage(plugin))
+        return self
+
+    def effects(self, *plugins):
+        """
+        Добавляет произвольные эффекты pedalboard (в том числе VST3-плагины).
+        """
+        for plugin in plugins:
+            self._add_effect(plugin)
+        return self
+
+    def highpass(self, cutoff_hz):
+        """
+        Обрезка нижних частот (и оставление верхних ~ HighPass).
+        """
+        return self._add_effect(HighpassFilter(cutoff_frequency_hz=cutoff_hz))
+
+    def lowpass(self, cutoff_hz):
+        """
+        Обрезка верхних частот (и оставление нижних ~ LowPass).
+        """
+        return self._add_effect(LowpassFilter(cutoff_frequency_hz=cutoff_hz))
+
+    def gain(self, gain_db):
+        """
+        Усиление громкости в децибелах (dB).
+        """
+        return self._add_effect(Gain(gain_db=gain_db))
+
+    def limiter(self, threshold_db):
+        """
+        Лимитер: ограничивает громкость пиков порогом threshold_db.
+        """
+        return self._add_effect(Limiter(threshold_db=threshold_db))
+
+    def channel(self, channel=None, weights=None):
+        """
+        Оставляет один канал channel (0 — левый) или сводит каналы с весами weights. 
+        Без аргументов сводит все каналы в моно.
+        """
+        self.stages.append(_ChannelStage(channel=channel, weights=weights))
+        return self
+
+    def denoise(self, prop_decrease=0.5, noise_profile=None, device="cpu", block_s=60., overlap_s=1.):
+        """
+        Денойзинг блоками с перекрытием (см. denoise_audio). С noise_profile — стационарный денойзинг с готовым профилем шума.
+        """
+        if noise_profile is not None:
+            denoise_block = partial(_reduce_noise_with_profile, profile=noise_profile, prop_decrease=prop_decrease)
+        else:
+            denoise_block = partial(_reduce_noise, prop_decrease=prop_decrease, device=_resolve_device(device))
+        
+        self.stages.append(_DenoiseStage(denoise_block, block_s=block_s, overlap_s=overlap_s))
+        return self
+
+    def resample(self, sample_rate):
+        """
+        Потоковый ресэмплинг до sample_rate.
+        """
+        self.stages.append(_ResampleStage(sample_rate))
+        return self
+
+    def for_whisper(self):
+        """
+        Финальная стадия для whisper: моно, 16 кГц, float32. run() без output_file возвращает одномерный массив.
+        """
+        self.float_output = True
+        return self.channel().resample(16000)
+
+    def _stream(self, input_file):
+        """
+        Генератор обработанных блоков (audio_data, sample_rate): декодирует input_file и прогоняет блоки через стадии.
+        """
+        def _through(stages, audio_data, sample_rate):
+            for stage in stages:
+                audio_data, sample_rate = stage.process(audio_data, sample_rate)
+            return audio_data, sample_rate
+
+        # Состояние стадий после прерванного прогона (исключение, незавершённый перебор) не переносим в новый файл
+        for stage in self.stages:
+            stage.reset()
+
+        with _open_audio(input_file) as audio:
+            block = int(self.block_s * audio.samplerate)
+            
+            frames = 0
+            while True:
+                with phase("decode"):
+                    audio_data = audio.read(block)
+                if audio_data.shape[-1] == 0:
+                    break
+                frames += audio_data.shape[-1]
+                with phase("process"):
+                    output = _through(self.stages, audio_data, audio.samplerate)
+                yield output
+
+            gauge(audio_s=frames / audio.samplerate)
+
+        # Досбрасываем буферы стадий (денойзинг, ресэмплинг) через оставшиеся стадии
+        for i, stage in enumerate(self.stages):
+            with phase("process"):
+                audio_data, sample_rate = stage.flush()
+                if audio_data is not None and audio_data.shape[-1]:
+                    audio_data, sample_rate = _through(self.stages[i + 1:], audio_data, sample_rate)
+            if audio_data is not None and audio_data.shape[-1]:
+                yield audio_data, sample_rate
+
+    @instrumented
+    def run(self, input_file, output_file=None, bit_depth=None):
+        """
+        Обрабатывает файл цепочкой стадий.
+
+        Args:
+        - input_file (str): Путь к входному аудио (любой формат, который читает pedalboard или ffmpeg).
+        - output_file (str, опционально): Путь для сохранения результата. Если None, результат возвращается массивом.
+        - bit_depth (int, опционально): Разрядность результата. По умолчанию 32 (float) после for_whisper, иначе 16.
+
+        Return:
+        - np.ndarray или None: Массив (каналы, отсчёты) float32, если output_file не указан. 
+          После for_whisper() — одномерный массив отсчётов, который принимает model.transcribe.
+        """
+        if bit_depth is None:
+            bit_depth = 32 if self.float_output else 16
+        
+        outputs = []
+        writer = None
+        try:
+            for audio_data, sample_rate in self._stream(input_file):
+                if output_file is None:
+                    outputs.append(audio_data)
+                    continue
+
+                # Открываем файл для записи, когда станут известны итоговые частота и число каналов
+                with phase("encode"):
+                    if writer is None:
+                        writer = AudioFile(output_file, 'w', sample_rate, audio_data.shape[0], bit_depth=bit_depth)
+                    writer.write(audio_data)
+        finally:
+            if writer is not None:
+                writer.close()
+
+        if output_file is None:
+            if not outputs:
+                return None
+            audio_data = np.concatenate(outputs, axis=-1)
+            return audio_data[0] if self.float_output else audio_data
+
+
+def iter_segments(input_file, ranges, pipeline=None):
+    """
+    Потоково вырезает отрезки из записи, прошедшей через цепочку pipeline: файл декодируется и обрабатывается один раз, 
+    а в памяти держится только хвост, перекрывающий ещё не выданные отрезки (а не вся лекция).
+
+    Args:
+    - input_file (str): Путь к аудиофайлу.
+    - ranges (list): Отрезки — пары (начало, конец) в миллисекундах (см. parse_time). Могут перекрываться и идти не по порядку.
+    - pipeline (AudioPipeline, опционально): Цепочка обработки. По умолчанию AudioPipeline().for_whisper() — моно, 16 кГц, float32.
+
+    Yields:
+    - tuple: (номер отрезка в ranges, массив (каналы, отсчёты) float32, частота дискретизации) — в порядке начала отрезков.
+      Отрезки за концом записи обрезаются по её концу.
+    """
+    if pipeline is None:
+        pipeline = AudioPipeline().for_whisper()
+
+    order = sorted(range(len(ranges)), key=lambda i: ranges[i][0])
+    k = 0 # Следующий невыданный отрезок (в порядке начала)
+    buffer, buffer_start, position = None, 0, 0 # Хвост обработанного сигнала и его начало (в отсчётах)
+    sample_rate = None
+
+    def _bounds(i):
+        start_ms, end_ms = ranges[i]
+        return int(round(start_ms * sample_rate / 1000)), int(round(end_ms * sample_rate / 1000))
+
+    for audio_data, sample_rate in pipeline._stream(input_file):
+        buffer = audio_data if buffer is None else np.concatenate([buffer, audio_data], axis=-1)
+        position += audio_data.shape[-1]
+
+        # Выдаём отрезки, которые целиком уже обработаны
+        while k < len(order) and _bounds(order[k])[1] <= position:
+            start, end = _bounds(order[k])
+            yield order[k], buffer[:, max(start - buffer_start, 0):end - buffer_start].copy(), sample_rate
+            k += 1
+
+        # Отбрасываем сигнал до начала следующего отрезка
+        keep_from = min(_bounds(order[k])[0], position) if k < len(order) else position
+        if keep_from > buffer_start:
+            buffer, buffer_start = buffer[:, keep_from - buffer_start:], keep_from
+
+    # Отрезки, выходящие за конец записи
+    for i in order[k:]:
+        start, end = _bounds(i) if sample_rate is not None else (0, 0)
+        if buffer is None or start >= position:
+            continue
+        yield i, buffer[:, max(start - buffer_start, 0):end - buffer_start].copy(), sample_rate
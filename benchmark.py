@@ -0,0 +1,617 @@
+import os
+import re
+import sys
+import json
+import glob
+import time
+import argparse
+import platform
+import resource
+import statistics
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def make_synthetic_audio(output_file,
+                         duration_s=3600.,
+                         sample_rate=44100,
+                         channels=2,
+                         frequency=440.,
+                         noise_db=-30.,
+                         seed=0,
+                         block_s=60.,
+                         ):
+    """
+    Генерирует воспроизводимое синтетическое аудио (синус + белый шум) и записывает его в файл блоками,
+    не держа всю запись в памяти. Одинаковые параметры дают побайтно одинаковый файл.
+
+    Args:
+    - output_file (str): Путь к создаваемому файлу (формат — по расширению, например .wav или .flac).
+    - duration_s (float, опционально): Длительность в секундах. По умолчанию 3600 (длина лекции).
+    - sample_rate (int, опционально): Частота дискретизации. По умолчанию 44100.
+    - channels (int, опционально): Количество каналов. По умолчанию 2.
+    - frequency (float, опционально): Частота синуса в Гц. По умолчанию 440.
+    - noise_db (float, опционально): Уровень шума в dBFS. По умолчанию -30.
+    - seed (int, опционально): Зерно генератора шума.
+    - block_s (float, опционально): Длительность блока записи в секундах.
+
+    Return:
+    - str: Путь к файлу.
+    """
+    import numpy as np
+    import soundfile as sf
+
+    rng = np.random.default_rng(seed)
+    noise_amplitude = 10 ** (noise_db / 20)
+    total_frames = int(round(duration_s * sample_rate))
+    block_frames = int(round(block_s * sample_rate))
+
+    # Каналы чуть расходятся по фазе, чтобы выбор канала и даунмикс давали разные сигналы
+    phases = np.linspace(0, np.pi / 2, channels, dtype=np.float64)
+
+    temp_file = f"{output_file}.{os.getpid()}.tmp{os.path.splitext(output_file)[1]}"
+    with sf.SoundFile(temp_file, 'w', samplerate=sample_rate, channels=channels, subtype='PCM_16') as file:
+        for start in range(0, total_frames, block_frames):
+            t = np.arange(start, min(start + block_frames, total_frames)) / sample_rate
+            tone = 0.3 * np.sin(2 * np.pi * frequency * t[:, None] + phases)
+            noise = noise_amplitude * rng.standard_normal((len(t), channels))
+            file.write((tone + noise).astype(np.float32))
+    os.replace(temp_file, output_file)
+
+    return output_file
+
+
+def _audio_duration(input_file):
+    import soundfile as sf
+    return sf.info(input_file).duration
+
+
+def _bench_pedalboard_processing(input_file, output_file, **kwargs):
+    from audio_processing import pedalboard_processing, _loudness_sidecar
+
+    # Убираем кэш анализа громкости, чтобы каждый прогон измерял полную работу
+    if os.path.exists(_loudness_sidecar(input_file)):
+        os.remove(_loudness_sidecar(input_file))
+    pedalboard_processing(input_file, output_file, **kwargs)
+    return {"audio_s": _audio_duration(input_file)}
+
+
+def _bench_make_sample(input_file, output_file, start, end, **kwargs):
+    from audio_processing import make_sample
+    from functions import parse_time
+
+    make_sample(input_file, output_file, start=start, end=end, **kwargs)
+    return {"audio_s": (parse_time(end) - parse_time(start)) / 1000}
+
+
+def _bench_denoise_audio(input_file, output_file, **kwargs):
+    from audio_processing import denoise_audio
+
+    denoise_audio(input_file, output_file, **kwargs)
+    return {"audio_s": _audio_duration(input_file)}
+
+
+def _bench_clean_text(input_file, output_file, **kwargs):
+    from text_processing import import_text, clean_text
+
+    text = import_text(input_file)
+    clean_text(text, **kwargs)
+    return {"chars": len(text)}
+
+
+def _bench_text_preprocess_stream(input_file, output_file, **kwargs):
+    from text_processing import text_preprocess
+
+    text_preprocess(input_file, output_file=output_file, **kwargs)
+    return {"bytes": os.path.getsize(input_file)}
+
+
+def default_cases(duration_s=3600., text_files=None):
+    """
+    Возвращает стандартный набор замеров: горячие пути аудио (pedalboard_processing с разными chunk_s,
+    последовательно и конвейером, make_sample, denoise_audio) и текста (clean_text во всех режимах, потоковый text_preprocess).
+
+    Args:
+    - duration_s (float, опционально): Длительность синтетического аудио в секундах.
+    - text_files (list, опционально): Тексты для замеров. По умолчанию — prompts/*.txt.
+
+    Return:
+    - list: Описания замеров — словари с ключами "name", "runner", "input", "output_ext" и "kwargs".
+    """
+    if text_files is None:
+        text_files = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prompts', '*.txt')))
+
+    # Отрезок для make_sample: 10 минут из середины (или вся запись, если она короче)
+    sample_s = min(600, int(duration_s))
+    sample_start = int((duration_s - sample_s) / 2)
+
+    cases = []
+    for chunk_s in (1., 10., 60.):
+        cases.append({
+            "name": f"pedalboard_processing[chunk_s={chunk_s:g}]",
+            "runner": "_bench_pedalboard_processing", "input": "audio", "output_ext": ".wav",
+            "kwargs": {"chunk_s": chunk_s, "gain_db": 3., "highpass_cutoff": 80., "limiter_threshold_db": -1.},
+        })
+    for pipelined in (False, True):
+        cases.append({
+            "name": f"pedalboard_processing[mp3,{'pipelined' if pipelined else 'sequential'}]",
+            "runner": "_bench_pedalboard_processing", "input": "audio", "output_ext": ".mp3",
+            "kwargs": {"chunk_s": 1., "gain_db": 3., "highpass_cutoff": 80., "pipelined": pipelined},
+        })
+    cases.append({
+        "name": "pedalboard_processing[target_db=-20]",
+        "runner": "_bench_pedalboard_processing", "input": "audio", "output_ext": ".wav",
+        "kwargs": {"chunk_s": 10., "target_db": -20.},
+    })
+    for format in ("wav", "mp3"):
+        cases.append({
+            "name": f"make_sample[{format},{sample_s}s]",
+            "runner": "_bench_make_sample", "input": "audio", "output_ext": f".{format}",
+            "kwargs": {"start": f"{sample_start}s", "end": f"{sample_start + sample_s}s", "format": format},
+        })
+    for name, kwargs in (("batch", {}), ("streaming", {"streaming": True}), ("parallel", {"n_jobs": os.cpu_count()})):
+        cases.append({
+            "name": f"denoise_audio[cpu,{name}]",
+            "runner": "_bench_denoise_audio", "input": "audio", "output_ext": ".wav",
+            "kwargs": {"device": "cpu", **kwargs},
+        })
+
+    for text_file in text_files:
+        text_name = os.path.basename(text_file)
+        for mode in ('soft', 'normal', 'aggressive'):
+            cases.append({
+                "name": f"clean_text[{mode},{text_name}]",
+                "runner": "_bench_clean_text", "input": text_file, "output_ext": None,
+                "kwargs": {"mode": mode},
+            })
+        cases.append({
+            "name": f"text_preprocess_stream[normal,{text_name}]",
+            "runner": "_bench_text_preprocess_stream", "input": text_file, "output_ext": ".txt",
+            "kwargs": {"clean_mode": "normal"},
+        })
+
+    return cases
+
+
+def _max_rss_mb(who=resource.RUSAGE_SELF):
+    # ru_maxrss на Linux в килобайтах, на macOS — в байтах
+    max_rss = resource.getrusage(who).ru_maxrss
+    return max_rss / (1 << 20) if sys.platform == 'darwin' else max_rss / 1024
+
+
+def _run_case(case, input_file, output_file, repeat):
+    """
+    Выполняет один замер в отдельном процессе: время каждого повтора и пиковое потребление памяти процесса 
+    вместе с дочерними (ffmpeg, воркеры пулов процессов).
+    """
+    # Рабочая папка — корень репозитория, чтобы дочерний процесс нашёл модули проекта
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    runner = globals()[case["runner"]]
+
+    baseline_rss_mb = _max_rss_mb()
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        info = runner(input_file, output_file, **case["kwargs"])
+        times.append(time.perf_counter() - started)
+
+    result = {
+        "wall_s": min(times),
+        "wall_median_s": statistics.median(times),
+        "repeat": repeat,
+        # Для дочерних процессов ru_maxrss — пик самого большого из завершённых, а не сумма одновременно работавших,
+        # поэтому сумма с пиком самого процесса — оценка общего пика снизу
+        "peak_rss_mb": _max_rss_mb() + _max_rss_mb(resource.RUSAGE_CHILDREN),
+        "peak_children_rss_mb": _max_rss_mb(resource.RUSAGE_CHILDREN),
+        "baseline_rss_mb": baseline_rss_mb,
+    }
+    if "audio_s" in info:
+        result["audio_s"] = info["audio_s"]
+        result["realtime_factor"] = info["audio_s"] / result["wall_s"]
+    if "chars" in info:
+        result["chars"] = info["chars"]
+        result["chars_per_s"] = info["chars"] / result["wall_s"]
+    if "bytes" in info:
+        result["bytes"] = info["bytes"]
+        result["mb_per_s"] = info["bytes"] / (1 << 20) / result["wall_s"]
+    return result
+
+
+def _environment():
+    import numpy as np
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare_with_baseline(report, baseline, tolerance=0.15, min_delta_s=0.05):
+    """
+    Сравнивает результаты замеров с сохранённым эталоном.
+
+    Замер считается регрессией, если время выросло больше чем на tolerance (и при этом больше чем на min_delta_s секунд,
+    чтобы не реагировать на шум в быстрых замерах) или пиковая память выросла больше чем на tolerance.
+
+    Args:
+    - report (dict): Результат run_benchmarks.
+    - baseline (dict или str): Эталонный результат run_benchmarks или путь к его JSON.
+    - tolerance (float, опционально): Допустимое относительное ухудшение. По умолчанию 0.15 (15%).
+    - min_delta_s (float, опционально): Минимальный абсолютный прирост времени для регрессии. По умолчанию 0.05 с.
+
+    Return:
+    - dict: Для каждого замера — "status" ("ok", "regression", "improvement", "new" или "changed" при других параметрах),
+      "wall_ratio" и "rss_ratio" (текущее / эталон).
+    """
+    if isinstance(baseline, str):
+        with open(baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+
+    comparison = {}
+    for name, result in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            comparison[name] = {"status": "new"}
+            continue
+        if base.get("kwargs") != result.get("kwargs") or base.get("audio_s") != result.get("audio_s") \
+                or base.get("chars") != result.get("chars") or base.get("bytes") != result.get("bytes"):
+            comparison[name] = {"status": "changed"}
+            continue
+
+        wall_ratio = result["wall_s"] / base["wall_s"] if base["wall_s"] else float("inf")
+        rss_ratio = result["peak_rss_mb"] / base["peak_rss_mb"] if base["peak_rss_mb"] else float("inf")
+
+        slower = wall_ratio > 1 + tolerance and result["wall_s"] - base["wall_s"] > min_delta_s
+        if slower or rss_ratio > 1 + tolerance:
+            status = "regression"
+        elif wall_ratio < 1 - tolerance and base["wall_s"] - result["wall_s"] > min_delta_s:
+            status = "improvement"
+        else:
+            status = "ok"
+        comparison[name] = {"status": status, "wall_ratio": wall_ratio, "rss_ratio": rss_ratio}
+
+    return comparison
+
+
+def run_benchmarks(cases=None,
+                   output_file=None,
+                   baseline=None,
+                   work_folder=".benchmark",
+                   duration_s=3600.,
+                   repeat=3,
+                   only=None,
+                   tolerance=0.15,
+                   verbose=True,
+                   ):
+    """
+    Запускает набор замеров и сохраняет результаты в JSON.
+
+    Каждый замер выполняется в отдельном (spawn) процессе, чтобы пиковая память и время не зависели
+    от предыдущих замеров. Синтетическое аудио генерируется один раз и переиспользуется между запусками.
+
+    Args:
+    - cases (list, опционально): Описания замеров (см. default_cases). По умолчанию — default_cases(duration_s).
+    - output_file (str, опционально): Путь для сохранения JSON с результатами.
+    - baseline (str или dict, опционально): Эталон для сравнения (см. compare_with_baseline).
+    - work_folder (str, опционально): Папка для синтетического аудио и выходных файлов. По умолчанию ".benchmark".
+    - duration_s (float, опционально): Длительность синтетического аудио в секундах. По умолчанию 3600.
+    - repeat (int, опционально): Количество повторов каждого замера; в "wall_s" берётся лучшее время.
+    - only (str, опционально): Запускать только замеры, в имени которых есть эта подстрока.
+    - tolerance (float, опционально): Допустимое относительное ухудшение относительно эталона.
+    - verbose (bool, опционально): Выводить ли прогресс и результаты.
+
+    Return:
+    - dict: {"environment": ..., "config": ..., "results": {имя замера: {...}}, "comparison": ... (если задан baseline)}.
+    """
+    if cases is None:
+        cases = default_cases(duration_s)
+    if only:
+        cases = [case for case in cases if only in case["name"]]
+
+    os.makedirs(work_folder, exist_ok=True)
+    audio_file = os.path.join(work_folder, f"synthetic_{duration_s:g}s.wav")
+    if any(case["input"] == "audio" for case in cases) and not os.path.exists(audio_file):
+        if verbose:
+            print(f"Генерация синтетического аудио {duration_s:g} с: {audio_file}")
+        make_synthetic_audio(audio_file, duration_s=duration_s)
+
+    report = {
+        "environment": _environment(),
+        "config": {"duration_s": duration_s, "repeat": repeat},
+        "results": {},
+    }
+
+    context = multiprocessing.get_context("spawn")
+    for number, case in enumerate(cases):
+        input_file = audio_file if case["input"] == "audio" else case["input"]
+        output_file_case = os.path.join(work_folder, f"output_{number}{case['output_ext']}") if case["output_ext"] else None
+
+        try:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                result = executor.submit(_run_case, case, input_file, output_file_case, repeat).result()
+        except Exception as e:
+            result = {"error": f"{type(e).__name__}: {e}"}
+        finally:
+            if output_file_case and os.path.exists(output_file_case):
+                os.remove(output_file_case)
+
+        result["kwargs"] = case["kwargs"]
+        report["results"][case["name"]] = result
+
+        if verbose:
+            if "error" in result:
+                print(f"{case['name']}: ошибка {result['error']}")
+            else:
+                speed = f", {result['realtime_factor']:.1f}x realtime" if "realtime_factor" in result \
+                    else f", {result['chars_per_s'] / 1e6:.1f} млн симв./с" if "chars_per_s" in result \
+                    else f", {result['mb_per_s']:.1f} МБ/с" if "mb_per_s" in result else ""
+                print(f"{case['name']}: {result['wall_s']:.3f} с{speed}, пик памяти {result['peak_rss_mb']:.0f} МБ")
+
+    if baseline is not None:
+        report["comparison"] = compare_with_baseline(
+            {"results": {name: result for name, result in report["results"].items() if "error" not in result}},
+            baseline, tolerance=tolerance
+        )
+        if verbose:
+            for name, comparison in report["comparison"].items():
+                if comparison["status"] != "ok":
+                    ratio = f" (время x{comparison['wall_ratio']:.2f}, память x{comparison['rss_ratio']:.2f})" \
+                        if "wall_ratio" in comparison else ""
+                    print(f"{comparison['status'].upper()}: {name}{ratio}")
+
+    if output_file:
+        with open(output_file, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+    return report
+
+
+# Исходная реализация очистки текста — эталон для проверки clean_text
+def _remove_links_reference(text):
+    """
+    Исходная реализация remove_links: urlextract по всему тексту и замена каждой найденной ссылки.
+    """
+    import urlextract
+
+    cleaned_text = text
+    for url in urlextract.URLExtract().find_urls(text):
+        cleaned_text = cleaned_text.replace(url, "")
+    return cleaned_text
+
+
+def _clean_text_reference(text, mode='normal', preserve_symbols=None, remove_symbols=None, remove_caps=False):
+    """
+    Исходная (последовательная) реализация clean_text — эталон для benchmark_clean_text и tests/test_clean_text.py.
+    """
+    # Удаляем капс в начале, т.к. может привести к лишним пробелам
+    if remove_caps:
+        text = re.sub(r'\b[A-ZА-ЯЁ0-9]+\b', '', text)
+
+    if mode == 'soft':
+        # Удаление переносов слов и замена переносов строк на пробелы
+        text = re.sub(r"\s-\n", "", text)  # Удаляем переносы слов
+        text = re.sub("\n", " ", text)    # Заменяем переносы строк на пробелы
+
+    elif mode == 'normal':
+        # Выполнение очистки для режима 'normal'
+        text = re.sub(r"\s-\n", "", text)        # Удаляем переносы слов
+        text = re.sub("\n", " ", text)          # Заменяем переносы строк на пробелы
+        text = re.sub(r'\s+', ' ', text)        # Заменяем последовательности пробелов на один
+        text = re.sub(r'\.{3,}', '.', text)     # Заменяем три и более точки на одну
+        text = re.sub(r'[^ «»;:—!.,()\-А-Яа-яЁёA-Za-z0-9]', '', text)  # Удаляем все символы, кроме букв, цифр и пробелов
+
+    elif mode == 'aggressive':
+                    
+        text = _remove_links_reference(text)  # Удаляем ссылки из текста
+
+        # Удаляем переносы слов и заменяем переносы строк на пробелы
+        text = re.sub(r"\s?-\n", "", text)
+        text = re.sub("\n", " ", text)
+        
+        text = re.sub(r'[^ «»;:—!.,()\-А-Яа-яЁёA-Za-z]', '', text) # Удаляем все символы, кроме букв, пробелов и пунктуации
+        text = re.sub(r'(\w):(\w)', r'\1: \2', text) # Добавляем пробел после двоеточия
+        text = re.sub(r'(\s):', ':', text) # Удаляем пробелы перед двоеточием
+        text = re.sub(r'\s\;', ';', text)# Удаляем пробелы перед точкой с запятой
+        text = re.sub(r'\s\,', ',', text) # Удаляем пробелы перед запятой
+        
+        text = re.sub(r'\,\s+', ', ', text) # Удаляем лишние пробелы после запятой
+        text = re.sub(r'\s*\.\s*', '. ', text) # Удаляем лишний пробел рядом с точкой
+        text = re.sub(r'(\.\s+)+', '. ', text)# Удаляем лишние пробелы после точки
+        text = re.sub(r'\s?«\s+', ' «', text) # Удаляем лишние пробелы рядом с открывающей кавычкой
+        text = re.sub(r'\s+»\s?', '» ', text) # Удаляем лишние пробелы рядом с закрывающей кавычкой
+        text = re.sub(r'\(\s', '(', text) # Удаляем лишние пробелы после открывающей скобки
+        text = re.sub(r'\s\)', ')', text) # Удаляем лишние пробелы перед открывающей скобкой
+
+        text = re.sub(r'[,.—\-:;]{3,}', ' ', text) # Удаляем много подряд идущих символов пунктуации
+        
+        text = re.sub(r'\s+', ' ', text) # Удаляем лишние пробелы
+        
+        text = re.sub(r'\.{2,}', '.', text) # Заменяем n подряд идущих точек на одну
+        
+    elif mode == 'bypass':
+        return text
+
+    if preserve_symbols:
+        # Оставляем указанные символы
+        preserved_pattern = f"[^{re.escape(''.join(preserve_symbols))}]"
+        text = re.sub(preserved_pattern, '', text)
+
+    if remove_symbols:
+        # Удаляем указанные символы
+        remove_pattern = f"[{''.join(remove_symbols)}]"
+        text = re.sub(remove_pattern, '', text)
+
+    return text
+
+
+def benchmark_clean_text(file_path='prompts/VeryBigPrompt.txt', modes=('soft', 'normal', 'aggressive'), repeat=3, verbose=True):
+    """
+    Сравнивает скорость clean_text с исходной последовательной реализацией (_clean_text_reference) 
+    и сообщает, совпали ли результаты на этом тексте. Совпадение во всех режимах и с параметрами проверяет tests/test_clean_text.py.
+
+    Args:
+        file_path (str, optional): Путь к тексту для замера. По умолчанию 'prompts/VeryBigPrompt.txt'.
+        modes (tuple, optional): Режимы clean_text для замера.
+        repeat (int, optional): Количество повторов; берётся лучшее время.
+        verbose (bool, optional): Выводить ли результаты.
+
+    Returns:
+        dict: Для каждого режима — "reference_s", "compiled_s" (время в секундах), "speedup" и "identical".
+    """
+    from text_processing import import_text, clean_text
+
+    text = import_text(file_path)
+
+    def _best_time(function, mode):
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = function(text, mode=mode)
+            times.append(time.perf_counter() - started)
+        return min(times), result
+
+    report = {}
+    for mode in modes:
+        reference_s, reference = _best_time(_clean_text_reference, mode)
+        compiled_s, compiled = _best_time(clean_text, mode)
+        report[mode] = {
+            "reference_s": reference_s,
+            "compiled_s": compiled_s,
+            "speedup": reference_s / compiled_s,
+            "identical": reference.encode('utf-8') == compiled.encode('utf-8'),
+        }
+
+        if verbose:
+            print(f"{mode}: {reference_s * 1000:.0f} мс → {compiled_s * 1000:.0f} мс "
+                  f"(ускорение {report[mode]['speedup']:.1f}x), результат совпадает: {report[mode]['identical']}")
+
+    return report
+
+
+# Тяжёлые зависимости, которые не должны загружаться при импорте модулей проекта
+HEAVY_MODULES = ("torch", "torchaudio", "noisereduce", "scipy", "soundfile", "pydub", "ffmpeg", "pedalboard", "PyPDF2")
+
+# Модули проекта и разрешённые для них тяжёлые зависимости при импорте
+IMPORT_CHECKS = {
+    "functions": (),
+    "text_processing": ("PyPDF2",),
+    "audio_processing": (),
+    "dataset": ("PyPDF2",),
+}
+
+_IMPORT_PROBE = """
+import sys, time, json, resource
+for name in {blocked!r}:
+    sys.modules[name] = None
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "import_s": elapsed,
+    "loaded": sorted(name for name in {heavy!r} if sys.modules.get(name) is not None),
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}}))
+"""
+
+
+def measure_import(module, repeat=3, blocked=()):
+    """
+    Измеряет время импорта модуля в чистом процессе интерпретатора (лучшее из repeat запусков).
+
+    Args:
+    - module (str): Имя модуля проекта (например, "audio_processing").
+    - repeat (int, опционально): Количество запусков.
+    - blocked (tuple, опционально): Модули, которые в дочернем процессе считаются неустановленными — 
+      так проверяется, что модуль импортируется без них.
+
+    Return:
+    - dict: "import_s" — время импорта в секундах, "loaded" — какие из HEAVY_MODULES загрузились при импорте, 
+      "max_rss_kb" — пик памяти процесса, "error" — текст ошибки, если импорт не удался.
+    """
+    import subprocess
+
+    code = _IMPORT_PROBE.format(module=module, blocked=tuple(blocked), heavy=HEAVY_MODULES)
+    cwd = os.path.dirname(os.path.abspath(__file__))
+
+    best = None
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True)
+        if completed.returncode != 0:
+            return {"import_s": None, "loaded": [], "max_rss_kb": None, 
+                    "error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "ошибка импорта"}
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        if best is None or result["import_s"] < best["import_s"]:
+            best = result
+
+    return best
+
+
+def check_import_budget(budget_s=0.5, repeat=3, verbose=True):
+    """
+    Проверяет, что модули проекта импортируются быстро и без тяжёлых зависимостей: 
+    каждый модуль из IMPORT_CHECKS импортируется в чистом процессе, где тяжёлые зависимости 
+    (кроме разрешённых для модуля) недоступны, и укладывается в budget_s секунд.
+
+    Args:
+    - budget_s (float, опционально): Допустимое время импорта одного модуля в секундах. По умолчанию 0.5.
+    - repeat (int, опционально): Количество запусков на модуль (берётся лучшее время).
+    - verbose (bool, опционально): Выводить ли результаты.
+
+    Return:
+    - dict: Для каждого модуля — результат measure_import и "ok" (импорт удался и уложился в бюджет).
+    """
+    report = {}
+    for module, allowed in IMPORT_CHECKS.items():
+        blocked = [name for name in HEAVY_MODULES if name not in allowed]
+        result = measure_import(module, repeat=repeat, blocked=blocked)
+        result["ok"] = result.get("error") is None and result["import_s"] <= budget_s
+        report[module] = result
+
+        if verbose:
+            if result.get("error"):
+                print(f"{module}: не импортируется без тяжёлых зависимостей — {result['error']}")
+            else:
+                status = "ok" if result["ok"] else f"превышен бюджет {budget_s:g} с"
+                print(f"{module}: {result['import_s'] * 1000:.0f} мс, {result['max_rss_kb'] / 1024:.0f} МБ — {status}")
+
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры скорости и памяти горячих путей обработки аудио и текста.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Запустить замеры")
+    run_parser.add_argument("--output", help="Сохранить результаты в JSON")
+    run_parser.add_argument("--baseline", help="JSON эталона для сравнения; при регрессии код выхода 1")
+    run_parser.add_argument("--duration", type=float, default=3600., help="Длительность синтетического аудио, с")
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--only", help="Запускать только замеры с этой подстрокой в имени")
+    run_parser.add_argument("--tolerance", type=float, default=0.15)
+    run_parser.add_argument("--work-folder", default=".benchmark")
+
+    imports_parser = subparsers.add_parser("imports", help="Проверить время импорта модулей и отсутствие тяжёлых зависимостей")
+    imports_parser.add_argument("--budget", type=float, default=0.5, help="Допустимое время импорта модуля, с")
+    imports_parser.add_argument("--repeat", type=int, default=3)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "imports":
+        report = check_import_budget(budget_s=args.budget, repeat=args.repeat)
+        return 0 if all(result["ok"] for result in report.values()) else 1
+
+    if args.command == "run":
+        report = run_benchmarks(output_file=args.output, baseline=args.baseline, work_folder=args.work_folder,
+                                duration_s=args.duration, repeat=args.repeat, only=args.only, tolerance=args.tolerance)
+        regressions = [name for name, comparison in report.get("comparison", {}).items()
+                       if comparison["status"] == "regression"]
+        failed = [name for name, result in report["results"].items() if "error" in result]
+        return 1 if regressions or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
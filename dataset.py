@@ -0,0 +1,334 @@
+import os
+import csv
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+from functions import change_name, change_folder_name, parse_time, read_srt, write_atomic, instrumented, phase, count, gauge
+from text_processing import clean_text
+from audio_processing import AudioPipeline, iter_segments
+
+
+# Формат шардов: отсчёты float32 подряд, без заголовка — читаются через np.memmap
+_SHARD_FORMAT = "float32-raw-v1"
+
+
+def read_dataset_manifest(file_path):
+    """
+    Читает список лекций для набора данных: CSV со столбцами "audio" и "srt" (необязательный) с заголовком.
+    Относительные пути считаются от папки манифеста.
+
+    Args:
+    - file_path (str): Путь к .csv файлу.
+
+    Return:
+    - list: Пары (audio, srt); srt — None, если не указан.
+    """
+    folder = os.path.dirname(os.path.abspath(file_path))
+    resolve = lambda path: os.path.join(folder, path) if path and not os.path.isabs(path) else path or None
+
+    with open(file_path, 'r', encoding='utf-8', newline='') as file:
+        return [(resolve(row["audio"].strip()), resolve((row.get("srt") or "").strip()))
+                for row in csv.DictReader(file) if row.get("audio")]
+
+
+class _ShardWriter:
+    """
+    Дописывает отрезки в шарды по shard_size_mb. Имена шардов содержат номер сборки, так что файлы прошлой сборки 
+    не перезаписываются. До commit() шарды остаются временными файлами (".tmp"): прерванная сборка ничего не публикует.
+    """
+    def __init__(self, output_folder, shard_size_mb, build_id):
+        self.output_folder = output_folder
+        self.shard_bytes = int(shard_size_mb * 2 ** 20)
+        self.build_id = build_id
+        self.shards = []
+        self.file = None
+        self.offset = 0
+
+    def _temp_path(self, name):
+        return os.path.join(self.output_folder, f"{name}.tmp")
+
+    def _open(self):
+        self.shards.append(f"shard-{self.build_id}-{len(self.shards):05d}.f32")
+        self.file = open(self._temp_path(self.shards[-1]), 'wb')
+        self.offset = 0
+
+    def write(self, samples):
+        """
+        Дописывает отрезок и возвращает (имя шарда, смещение в отсчётах).
+        """
+        if self.file is not None and self.offset and (self.offset + len(samples)) * 4 > self.shard_bytes:
+            self.file.close()
+            self.file = None
+        if self.file is None:
+            self._open()
+
+        offset = self.offset
+        self.file.write(np.ascontiguousarray(samples, dtype=np.float32).tobytes())
+        self.offset += len(samples)
+        return self.shards[-1], offset
+
+    def mark(self):
+        """
+        Запоминает текущую позицию записи (для rollback).
+        """
+        return len(self.shards), self.offset if self.file is not None else None
+
+    def rollback(self, mark):
+        """
+        Отменяет всё, что записано после mark: удаляет новые шарды и обрезает текущий.
+        """
+        shards, offset = mark
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        for name in self.shards[shards:]:
+            os.remove(self._temp_path(name))
+        del self.shards[shards:]
+
+        # Шард, открытый на момент mark, дописываем дальше с отметки
+        if shards and offset is not None:
+            self.file = open(self._temp_path(self.shards[-1]), 'r+b')
+            self.file.truncate(offset * 4)
+            self.file.seek(offset * 4)
+            self.offset = offset
+
+    def commit(self):
+        """
+        Закрывает шарды и переименовывает их в итоговые имена.
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        for name in self.shards:
+            os.replace(self._temp_path(name), os.path.join(self.output_folder, name))
+
+    def abort(self):
+        """
+        Удаляет все временные шарды сборки.
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        for name in self.shards:
+            if os.path.exists(self._temp_path(name)):
+                os.remove(self._temp_path(name))
+
+
+@instrumented
+def _add_lecture(audio_file, srt_file, writer, clean_mode, min_duration_s, max_duration_s, pipeline):
+    """
+    Дописывает отрезки одной лекции в шарды. Возвращает записи индекса, число пропущенных отрезков и частоту дискретизации.
+    """
+    with phase("text"):
+        segments = read_srt(srt_file)
+        texts = [clean_text(segment["text"], mode=clean_mode).strip() for segment in segments]
+        ranges = [(parse_time(segment["start"]), parse_time(segment["end"])) for segment in segments]
+
+        # Отрезки без текста и вне диапазона длительности не вырезаем
+        selected = [i for i, (start, end) in enumerate(ranges) 
+                    if texts[i] and min_duration_s <= (end - start) / 1000 <= max_duration_s]
+
+    records, sample_rate = [], None
+    for k, audio_data, sample_rate in iter_segments(audio_file, [ranges[i] for i in selected], pipeline=pipeline):
+        i = selected[k]
+        samples = audio_data.mean(axis=0) if audio_data.shape[0] > 1 else audio_data[0]
+
+        # Отрезок обрезан концом записи — текст ему уже не соответствует
+        start, end = ranges[i]
+        if len(samples) < round((end - start) * sample_rate / 1000) - 1:
+            continue
+
+        with phase("encode"):
+            shard, offset = writer.write(samples)
+        count("segments")
+        records.append({"shard": shard, "offset": offset, "length": len(samples), "text": texts[i],
+                        "audio": audio_file, "start": segments[i]["start"], "end": segments[i]["end"]})
+
+    if sample_rate is not None:
+        gauge(audio_s=sum(record["length"] for record in records) / sample_rate)
+    return records, len(segments) - len(records), sample_rate
+
+
+def build_whisper_dataset(items,
+                          output_folder,
+                          shard_size_mb=512,
+                          clean_mode='soft',
+                          min_duration_s=0.5,
+                          max_duration_s=30.,
+                          srt_folder=None,
+                          pipeline=None,
+                          verbose=True,
+                          ):
+    """
+    Собирает набор данных для дообучения whisper из лекций и их субтитров SRT: отрезки аудио (моно, 16 кГц, float32)
+    по таймкодам субтитров и текст, очищенный clean_text. Отрезки дописываются подряд в несколько больших шардов,
+    а индекс хранит для каждого отрезка шард, смещение и длину — загрузчик обучения читает любой отрезок
+    через memory-mapping, не открывая тысячи мелких файлов (см. WhisperDataset).
+
+    Каждая лекция декодируется один раз и потоково: в памяти — только ещё не записанные отрезки.
+
+    Args:
+    - items (list или str): Лекции — пути к аудио, пары (audio, srt) или путь к CSV манифесту (см. read_dataset_manifest).
+      Если srt не указан, берётся "<имя аудио>.srt" рядом с аудио или в srt_folder (так их пишет transcribe.py).
+    - output_folder (str): Папка набора данных: шарды "shard-<сборка>-*.f32", индекс "index-<сборка>.jsonl" и описание 
+      "dataset.json", которое ссылается на них и публикует сборку. Лекция с ошибкой (например, без субтитров) 
+      пропускается целиком и попадает в "failed".
+    - shard_size_mb (float, опционально): Размер шарда в МБ. По умолчанию 512.
+    - clean_mode (str, опционально): Режим clean_text для текста. По умолчанию 'soft'.
+    - min_duration_s (float, опционально): Более короткие отрезки пропускаются.
+    - max_duration_s (float, опционально): Более длинные отрезки пропускаются (whisper принимает до 30 с).
+    - srt_folder (str, опционально): Папка с субтитрами для лекций без явного srt.
+    - pipeline (AudioPipeline, опционально): Цепочка обработки аудио. По умолчанию AudioPipeline().for_whisper().
+    - verbose (bool, опционально): Выводить ли сообщение о каждой лекции.
+
+    Return:
+    - dict: Описание набора данных (содержимое dataset.json): "format", "sample_rate", "index", "shards", "segments",
+      "duration_s", "skipped" (отрезки без текста, вне диапазона длительности или за концом записи) 
+      и "failed" (лекции с ошибкой: "audio", "srt", "error").
+    """
+    if isinstance(items, str):
+        items = read_dataset_manifest(items)
+    items = [(item, None) if isinstance(item, str) else tuple(item) for item in items]
+
+    if pipeline is None:
+        pipeline = AudioPipeline().for_whisper()
+
+    os.makedirs(output_folder, exist_ok=True)
+    build_id = f"{time.strftime('%Y%m%d%H%M%S')}-{os.urandom(3).hex()}"
+    writer = _ShardWriter(output_folder, shard_size_mb, build_id)
+    records, skipped, failed, sample_rate = [], 0, [], None
+    try:
+        for audio_file, srt_file in items:
+            if srt_file is None:
+                srt_file = change_name(audio_file, extension='.srt')
+                if srt_folder is not None:
+                    srt_file = change_folder_name(srt_file, srt_folder)
+
+            started = time.perf_counter()
+            mark = writer.mark()
+            try:
+                lecture_records, lecture_skipped, lecture_rate = _add_lecture(audio_file, srt_file, writer, clean_mode,
+                                                                              min_duration_s, max_duration_s, pipeline)
+                if lecture_records and sample_rate not in (None, lecture_rate):
+                    raise ValueError(f"частота дискретизации {lecture_rate} Гц не совпадает с остальными лекциями "
+                                     f"({sample_rate} Гц): добавьте в pipeline ресэмплинг.")
+            except Exception as e: # Ошибка в одной лекции (например, нет субтитров) не прерывает сборку
+                writer.rollback(mark)
+                failed.append({"audio": audio_file, "srt": srt_file, "error": f"{type(e).__name__}: {e}"})
+                if verbose:
+                    print(f"Ошибка в лекции {os.path.basename(audio_file)}: {failed[-1]['error']}")
+                continue
+
+            if lecture_records:
+                sample_rate = lecture_rate
+            records += lecture_records
+            skipped += lecture_skipped
+
+            if verbose:
+                print(f"Лекция {os.path.basename(audio_file)}: отрезков {len(lecture_records)}, "
+                      f"пропущено {lecture_skipped}, {time.perf_counter() - started:.0f} с.")
+
+        writer.commit()
+    except BaseException:
+        writer.abort()
+        raise
+
+    # Публикация: шарды и индекс этой сборки имеют свои имена, dataset.json ссылается на них и пишется последним 
+    # и атомарно — до его замены читатели видят прошлую сборку целиком, после — новую
+    index_name = f"index-{build_id}.jsonl"
+    write_atomic(os.path.join(output_folder, index_name),
+                 "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+    description = {
+        "format": _SHARD_FORMAT,
+        "sample_rate": sample_rate,
+        "index": index_name,
+        "shards": writer.shards,
+        "segments": len(records),
+        "duration_s": sum(record["length"] for record in records) / sample_rate if records else 0.,
+        "skipped": skipped,
+        "failed": failed,
+    }
+    write_atomic(os.path.join(output_folder, "dataset.json"), json.dumps(description, ensure_ascii=False, indent=2))
+
+    # Шарды и индексы прошлых сборок в той же папке удаляем
+    for name in os.listdir(output_folder):
+        previous = (name.startswith("shard-") and name.endswith(".f32")) or (name.startswith("index-") and name.endswith(".jsonl"))
+        if previous and name not in writer.shards and name != index_name:
+            os.remove(os.path.join(output_folder, name))
+
+    if verbose:
+        print(f"Набор данных: отрезков {len(records)} ({description['duration_s'] / 3600:.1f} ч) "
+              f"в {len(writer.shards)} шардах, пропущено {skipped}, лекций с ошибкой: {len(failed)}.")
+
+    return description
+
+
+class WhisperDataset:
+    """
+    Чтение набора данных build_whisper_dataset с произвольным доступом: шарды отображаются в память (np.memmap)
+    один раз, отрезок — view без копирования и без открытия отдельного файла. Подходит как map-style датасет
+    для загрузчика обучения (torch.utils.data.DataLoader).
+
+    Args:
+    - folder (str): Папка набора данных.
+
+    Examples:
+    >>> dataset = WhisperDataset("whisper_dataset")
+    >>> audio, text = dataset[0] # float32, 16 кГц
+    >>> len(dataset), dataset.sample_rate
+    """
+    def __init__(self, folder):
+        self.folder = folder
+        with open(os.path.join(folder, "dataset.json"), 'r', encoding='utf-8') as file:
+            self.description = json.load(file)
+        if self.description["format"] != _SHARD_FORMAT:
+            raise ValueError(f"Неизвестный формат набора данных: {self.description['format']}")
+        self.sample_rate = self.description["sample_rate"]
+
+        with open(os.path.join(folder, self.description["index"]), 'r', encoding='utf-8') as file:
+            self.records = [json.loads(line) for line in file if line.strip()]
+        self._shards = {}
+
+    def __getstate__(self):
+        # В воркеры загрузчика передаём только индекс: шарды каждый воркер отображает сам
+        return dict(self.__dict__, _shards={})
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, index):
+        record = self.records[index]
+        shard = self._shards.get(record["shard"])
+        if shard is None:
+            shard = self._shards[record["shard"]] = np.memmap(os.path.join(self.folder, record["shard"]),
+                                                              dtype=np.float32, mode='r')
+        return shard[record["offset"]:record["offset"] + record["length"]], record["text"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сборка набора данных для дообучения whisper из лекций и субтитров SRT.")
+    parser.add_argument("output_folder", help="Папка набора данных")
+    parser.add_argument("inputs", nargs="+", help="Аудиофайлы лекций (субтитры — <имя>.srt) или CSV манифест (audio,srt)")
+    parser.add_argument("--srt-folder", help="Папка с субтитрами (по умолчанию — рядом с аудио)")
+    parser.add_argument("--shard-size-mb", type=float, default=512, help="Размер шарда в МБ")
+    parser.add_argument("--clean-mode", default="soft", help="Режим clean_text")
+    parser.add_argument("--min-duration", type=float, default=0.5, help="Минимальная длительность отрезка в секундах")
+    parser.add_argument("--max-duration", type=float, default=30., help="Максимальная длительность отрезка в секундах")
+    args = parser.parse_args(argv)
+
+    items = []
+    for path in args.inputs:
+        items += read_dataset_manifest(path) if path.lower().endswith('.csv') else [(path, None)]
+
+    description = build_whisper_dataset(items, args.output_folder, shard_size_mb=args.shard_size_mb,
+                                        clean_mode=args.clean_mode, min_duration_s=args.min_duration,
+                                        max_duration_s=args.max_duration, srt_folder=args.srt_folder)
+    return 0 if description["segments"] and not description["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,19 @@
 import os
 import re
+import csv
+import json
+import time
 import shutil
+import signal
+import pickle
+import hashlib
 import inspect
+import functools
+import tempfile
+import warnings
+import threading
+from fnmatch import fnmatch
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
 def change_name(file_path: str,
                 name: str = None,
@@ -63,59 +75,879 @@ def change_folder_name(file_path, new_folder):
     return new_file_path
 
 
-def process_folder(input_folder, processing_function, output_folder = None, kwargs = {}, verbose = True):
+def file_fingerprint(file_path, mode="fast"):
+    """
+    Возвращает отпечаток файла для ключей кэша.
+
+    Аргументы:
+    file_path (str): Путь к файлу.
+    mode (str): "fast" — по пути, размеру и времени изменения (мгновенно), "content" — SHA-256 содержимого (надёжно, но читает файл целиком).
+
+    Возвращает:
+    str: Отпечаток файла.
+    """
+    if mode == "fast":
+        stat = os.stat(file_path)
+        return f"{os.path.abspath(file_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    
+    if mode == "content":
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    raise ValueError("Недопустимый mode. Используйте 'fast' или 'content'.")
+
+
+class OutputCache:
+    """
+    Кэш результатов обработки файлов, адресуемый по содержимому: ключ строится из отпечатка входного файла, 
+    имени функции и её аргументов. При совпадении ключа обработка пропускается, а сохранённый результат 
+    (выходной файл и/или возвращённое значение) восстанавливается из кэша.
+
+    Аргументы:
+    cache_folder (str): Папка кэша.
+    max_size_mb (float, optional): Предельный размер кэша в МБ. При превышении удаляются давно не использованные записи.
+    max_age_days (float, optional): Записи, не использовавшиеся дольше этого срока, удаляются.
+    hash_mode (str): Способ получения отпечатка входного файла: "fast" (путь, размер и время изменения) или "content" (SHA-256).
+
+    Пример:
+    >>> cache = OutputCache(".cache", max_size_mb=20000)
+    >>> process_folder("audio", denoise_audio, "audio (denoised)", extensions=AUDIO_EXTENSIONS, cache=cache)
+    >>> text = cached(text_preprocess, cache)("prompts/prompt.txt", clean_mode="aggressive")
+    """
+    def __init__(self, cache_folder=".cache", max_size_mb=None, max_age_days=None, hash_mode="fast"):
+        self.cache_folder = cache_folder
+        self.max_size_mb = max_size_mb
+        self.max_age_days = max_age_days
+        self.hash_mode = hash_mode
+
+    def key(self, function, input_file, kwargs, output_file=None):
+        """
+        Ключ кэша для вызова function(input_file, output_file=output_file, **kwargs).
+        Аргументы-пути к существующим файлам (например, профиль шума) учитываются по их отпечаткам.
+        """
+        arguments = {
+            name: {"file": file_fingerprint(value, self.hash_mode)} if isinstance(value, str) and os.path.isfile(value) else value
+            for name, value in kwargs.items()
+        }
+        description = json.dumps({
+            "function": f"{function.__module__}.{function.__qualname__}",
+            "input": file_fingerprint(input_file, self.hash_mode),
+            "kwargs": arguments,
+            "output_extension": os.path.splitext(output_file)[1] if output_file else None,
+        }, sort_keys=True, default=repr)
+
+        return hashlib.sha256(description.encode('utf-8')).hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self.cache_folder, key[:2], key)
+
+    def restore(self, key, output_file=None):
+        """
+        Восстанавливает результат из кэша: копирует сохранённый файл в output_file.
+
+        Возвращает:
+        tuple: (найден ли результат, возвращённое функцией значение).
+        """
+        entry = self._entry(key)
+        if not os.path.isdir(entry):
+            return False, None
+
+        with open(os.path.join(entry, "meta.json"), 'r', encoding='utf-8') as file:
+            meta = json.load(file)
+
+        # Запись без файла результата не подходит, если результат нужен в output_file
+        if output_file is not None:
+            if meta["output"] is None:
+                return False, None
+            os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+            shutil.copyfile(os.path.join(entry, meta["output"]), output_file)
+
+        result = None
+        if meta["result"]:
+            with open(os.path.join(entry, "result.pkl"), 'rb') as file:
+                result = pickle.load(file)
+
+        # Отмечаем использование записи (для вытеснения давно не использованных)
+        os.utime(os.path.join(entry, "meta.json"))
+        return True, result
+
+    def store(self, key, output_file=None, result=None):
+        """
+        Сохраняет результат в кэш: копию output_file (если он создан) и возвращённое значение (если оно не None).
+        """
+        has_output = output_file is not None and os.path.isfile(output_file)
+        if not has_output and result is None:
+            return
+
+        entry = self._entry(key)
+        if os.path.isdir(entry):
+            return
+
+        # Собираем запись во временной папке и переименовываем, чтобы параллельные процессы не увидели её недописанной
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        temp_entry = tempfile.mkdtemp(prefix=f"{os.path.basename(entry)}.", suffix=".tmp", dir=os.path.dirname(entry))
+        meta = {"output": None, "result": result is not None, "created": time.time()}
+
+        if has_output:
+            meta["output"] = "output" + os.path.splitext(output_file)[1]
+            shutil.copyfile(output_file, os.path.join(temp_entry, meta["output"]))
+
+        if result is not None:
+            with open(os.path.join(temp_entry, "result.pkl"), 'wb') as file:
+                pickle.dump(result, file)
+
+        with open(os.path.join(temp_entry, "meta.json"), 'w', encoding='utf-8') as file:
+            json.dump(meta, file)
+
+        try:
+            os.rename(temp_entry, entry)
+        except OSError: # Запись уже сохранил другой процесс
+            shutil.rmtree(temp_entry, ignore_errors=True)
+
+        self.evict()
+
+    def evict(self):
+        """
+        Удаляет записи старше max_age_days и давно не использованные записи сверх max_size_mb.
+        """
+        if self.max_size_mb is None and self.max_age_days is None:
+            return
+
+        entries = []
+        for shard in os.scandir(self.cache_folder):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".tmp") or not entry.is_dir():
+                    continue
+                try:
+                    used = os.path.getmtime(os.path.join(entry.path, "meta.json"))
+                    size = sum(item.stat().st_size for item in os.scandir(entry.path))
+                except FileNotFoundError: # Запись удаляет другой процесс
+                    continue
+                entries.append((used, size, entry.path))
+
+        entries.sort(reverse=True) # Сначала недавно использованные
+        now, total = time.time(), 0
+        for used, size, path in entries:
+            total += size
+            expired = self.max_age_days is not None and now - used > self.max_age_days * 24 * 3600
+            oversized = self.max_size_mb is not None and total > self.max_size_mb * 1024 * 1024
+            if expired or oversized:
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+
+
+class _CachedFunction:
+    """
+    Обёртка функции обработки файла, использующая OutputCache (см. cached).
+    """
+    def __init__(self, function, cache):
+        self.function = function
+        self.cache = cache
+        functools.update_wrapper(self, function)
+
+    def __call__(self, input_file, output_file=None, **kwargs):
+        key = self.cache.key(self.function, input_file, kwargs, output_file)
+        
+        hit, result = self.cache.restore(key, output_file)
+        if hit:
+            return result
+
+        if output_file is None:
+            result = self.function(input_file, **kwargs)
+        else:
+            result = self.function(input_file, output_file=output_file, **kwargs)
+        
+        self.cache.store(key, output_file, result)
+        return result
+
+
+def cached(function, cache):
+    """
+    Оборачивает функцию обработки файла кэшем OutputCache: повторный вызов с тем же входным файлом и 
+    аргументами не выполняет обработку, а восстанавливает результат из кэша.
+
+    Кэшируются файл output_file (если функция его создала) и возвращённое значение (если оно не None), 
+    поэтому подходят и аудиофункции (denoise_audio, pedalboard_processing), и текстовые (text_preprocess).
+
+    Аргументы:
+    function (callable): Функция вида function(input_file, output_file=None, **kwargs) или function(input_file, **kwargs).
+    cache (OutputCache): Кэш.
+
+    Возвращает:
+    callable: Функция с тем же интерфейсом.
+    """
+    return _CachedFunction(function, cache)
+
+
+# Настройки инструментирования: None — выключено (по умолчанию)
+_instrumentation = None
+
+# Стек активных таймеров вызовов в текущем потоке (вложенные вызовы инструментированных функций)
+_timers = threading.local()
+
+
+class _NullContext:
+    """
+    Пустой контекст для выключенного инструментирования: вход и выход ничего не делают.
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_CONTEXT = _NullContext()
+
+
+class _PhaseContext:
+    """
+    Замеряет время фазы и прибавляет его к сумме фазы в таймере вызова.
+    """
+    __slots__ = ("phases", "name", "started")
+
+    def __init__(self, phases, name):
+        self.phases = phases
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.phases[self.name] = self.phases.get(self.name, 0.) + time.perf_counter() - self.started
+        return False
+
+
+def enable_instrumentation(sink=None, callback=None):
+    """
+    Включает инструментирование: инструментированные функции (обработка аудио, файлы в process_folder) 
+    сообщают о каждом вызове событием со временем по фазам (decode/process/encode и др.), счётчиками 
+    и realtime factor.
+
+    Аргументы:
+    sink (str, optional): Путь к файлу, в который события дописываются в формате JSON Lines. 
+        Воркеры process_folder (в том числе процессы) пишут в тот же файл.
+    callback (callable, optional): Функция, получающая каждое событие (словарь). Вызывается только в текущем процессе.
+
+    Пример:
+    >>> enable_instrumentation("events.jsonl")
+    >>> process_folder("lectures", denoise_audio, "denoised", extensions=AUDIO_EXTENSIONS, n_workers=4)
+    """
+    global _instrumentation
+    if sink is None and callback is None:
+        raise ValueError("Укажите sink (путь к файлу JSON Lines) и/или callback.")
+    _instrumentation = {"sink": sink, "callback": callback}
+
+
+def disable_instrumentation():
+    """
+    Выключает инструментирование.
+    """
+    global _instrumentation
+    _instrumentation = None
+
+
+def emit_event(event):
+    """
+    Отправляет событие (словарь) в sink и callback, если инструментирование включено. 
+    К событию добавляются время ("timestamp") и номер процесса ("pid").
+    """
+    if _instrumentation is None:
+        return
+
+    event = dict(event, timestamp=time.time(), pid=os.getpid())
+    if _instrumentation["sink"] is not None:
+        # Одна короткая запись в режиме дозаписи: строки от разных процессов не перемешиваются
+        with open(_instrumentation["sink"], 'a', encoding='utf-8') as file:
+            file.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+    if _instrumentation["callback"] is not None:
+        _instrumentation["callback"](event)
+
+
+def _current_timer():
+    stack = getattr(_timers, "stack", None)
+    return stack[-1] if stack else None
+
+
+def phase(name):
+    """
+    Контекст для замера фазы внутри инструментированной функции (например, "decode", "process", "encode"). 
+    Время повторяющихся фаз (по блокам) суммируется. Без включённого инструментирования ничего не делает.
+
+    Пример:
+    >>> with phase("decode"):
+    ...     chunk = audio.read(block)
+    """
+    if _instrumentation is None:
+        return _NULL_CONTEXT
+    timer = _current_timer()
+    return _PhaseContext(timer["phases"], name) if timer is not None else _NULL_CONTEXT
+
+
+def count(name, value=1):
+    """
+    Увеличивает счётчик name (например, число блоков или отсчётов) в событии текущего вызова.
+    """
+    if _instrumentation is None:
+        return
+    timer = _current_timer()
+    if timer is not None:
+        timer["counters"][name] = timer["counters"].get(name, 0) + value
+
+
+def gauge(**fields):
+    """
+    Задаёт поля события текущего вызова. audio_s (длительность обработанного аудио в секундах) 
+    дополнительно даёт в событии realtime_factor = audio_s / время вызова.
+    """
+    if _instrumentation is None:
+        return
+    timer = _current_timer()
+    if timer is not None:
+        timer["fields"].update(fields)
+
+
+def propagate_instrumentation(function):
+    """
+    Оборачивает функцию для запуска в другом потоке так, чтобы её фазы и счётчики попадали в событие
+    текущего вызова (таймеры вызовов хранятся отдельно для каждого потока). Вызывать в потоке-владельце вызова.
+    Фазы из разных потоков перекрываются по времени, поэтому их сумма может превышать время вызова.
+    """
+    timer = _current_timer() if _instrumentation is not None else None
+    if timer is None:
+        return function
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        stack = getattr(_timers, "stack", None)
+        if stack is None:
+            stack = _timers.stack = []
+        stack.append(timer)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            stack.pop()
+
+    return wrapper
+
+
+def instrumented(function):
+    """
+    Декоратор: при включённом инструментировании каждый вызов функции порождает событие "call" 
+    с общим временем, временем по фазам (см. phase), счётчиками (см. count) и полями (см. gauge). 
+    При выключенном — одна проверка на вызов.
+    """
+    name = f"{function.__module__}.{function.__qualname__}"
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if _instrumentation is None:
+            return function(*args, **kwargs)
+
+        timer = {"phases": {}, "counters": {}, "fields": {}}
+        # Входной файл — первый строковый аргумент (у методов первым идёт self)
+        input_file = next((arg for arg in args[:2] if isinstance(arg, str)), None)
+        if input_file is not None:
+            timer["fields"]["input_file"] = input_file
+
+        stack = getattr(_timers, "stack", None)
+        if stack is None:
+            stack = _timers.stack = []
+        stack.append(timer)
+
+        status, error = "ok", None
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        except BaseException as e:
+            status, error = "failed", f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            stack.pop()
+
+            event = {"event": "call", "function": name, "status": status, "duration_s": duration, **timer["fields"],
+                     "phases": timer["phases"], "counters": timer["counters"]}
+            if timer["fields"].get("audio_s") and duration > 0:
+                event["realtime_factor"] = timer["fields"]["audio_s"] / duration
+            if error is not None:
+                event["error"] = error
+            emit_event(event)
+
+    return wrapper
+
+
+def _call_with_timeout(function, timeout, *args, **kwargs):
+    """
+    Вызывает функцию, прерывая её по истечении timeout секунд.
+
+    Таймаут реализован через SIGALRM, поэтому работает только в главном потоке процесса на POSIX-системах
+    (в том числе в воркерах ProcessPoolExecutor).
+
+    Аргументы:
+    function (callable): Вызываемая функция.
+    timeout (float): Ограничение времени в секундах. None — без ограничения.
+
+    Возвращает:
+    Результат function(*args, **kwargs).
+    """
+    if timeout is None:
+        return function(*args, **kwargs)
+
+    def _on_timeout(signum, frame):
+        raise TimeoutError(f"Превышено время обработки ({timeout} с)")
+
+    previous_handler = signal.signal(signal.SIGALRM, _on_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return function(*args, **kwargs)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+
+
+def _call_with_thread_timeout(function, timeout, *args, **kwargs):
+    """
+    Вызывает функцию во вспомогательном потоке и ждёт её не дольше timeout секунд.
+
+    Замена _call_with_timeout вне главного потока, где SIGALRM недоступен. Поток нельзя прервать: 
+    по истечении времени функция дорабатывает в фоне, а её результат отбрасывается.
+
+    Аргументы:
+    function (callable): Вызываемая функция.
+    timeout (float): Ограничение времени в секундах. None — без ограничения.
+
+    Возвращает:
+    Результат function(*args, **kwargs).
+    """
+    if timeout is None:
+        return function(*args, **kwargs)
+
+    outcome = {}
+
+    def _target():
+        try:
+            outcome["result"] = function(*args, **kwargs)
+        except BaseException as e:
+            outcome["error"] = e
+
+    worker = threading.Thread(target=_target, daemon=True)
+    worker.start()
+    worker.join(timeout)
+    if worker.is_alive():
+        raise TimeoutError(f"Превышено время обработки ({timeout} с)")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+def _process_file(processing_function, file_path, output_file, kwargs, timeout=None, retries=0, cache=None, 
+                  instrumentation=None, thread_timeout=False):
+    """
+    Обрабатывает один файл с повторными попытками и возвращает запись для отчёта process_folder.
+    Исключения не пробрасываются, а попадают в поле "error" отчёта.
+
+    instrumentation (dict, optional): Настройки инструментирования для воркера-процесса (события пишутся в тот же sink).
+    thread_timeout (bool): Отсчитывать timeout во вспомогательном потоке, а не через SIGALRM (вне главного потока).
+    """
+    global _instrumentation
+    if instrumentation is not None:
+        _instrumentation = instrumentation
+
+    report = {"file": file_path, "output_file": output_file, "status": None,
+              "attempts": 0, "duration": 0., "error": None}
+    started = time.perf_counter()
+
+    # Результат уже есть в кэше — обработку пропускаем
+    if cache is not None:
+        key = cache.key(processing_function, file_path, kwargs, output_file)
+        if cache.restore(key, output_file)[0]:
+            report["status"], report["duration"] = "cached", time.perf_counter() - started
+            return report
+
+    for attempt in range(retries + 1):
+        report["attempts"] = attempt + 1
+        try:
+            call = _call_with_thread_timeout if thread_timeout else _call_with_timeout
+            result = call(processing_function, timeout, file_path, output_file=output_file, **kwargs)
+            report["status"], report["error"] = "ok", None
+            if cache is not None:
+                cache.store(key, output_file, result)
+            break
+        except TimeoutError as e:
+            report["status"], report["error"] = "timeout", str(e)
+        except Exception as e:
+            report["status"], report["error"] = "failed", f"{type(e).__name__}: {e}"
+
+    report["duration"] = time.perf_counter() - started
+    return report
+
+
+def _file_signature(file_path):
+    """
+    Возвращает (размер, время изменения) файла — по ним манифест понимает, что файл не менялся.
+    """
+    stat = os.stat(file_path)
+    return stat.st_size, stat.st_mtime
+
+
+def _load_manifest(manifest):
+    """
+    Читает манифест process_folder (JSON Lines) и возвращает словарь {путь к файлу: последняя запись}.
+    """
+    done = {}
+    if manifest is None or not os.path.exists(manifest):
+        return done
+
+    with open(manifest, 'r', encoding='utf-8') as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError: # Оборванная запись от прерванного запуска
+                continue
+            done[record["file"]] = record
+
+    return done
+
+
+# Расширения аудио- и видеофайлов: фильтр по умолчанию для convert_audio_batch, для аудиофункций в process_folder передаётся явно
+AUDIO_EXTENSIONS = (".m4a", ".mp3", ".mp4", ".aac", ".wav", ".flac", ".ogg", ".opus", ".webm", ".mkv", ".mov")
+
+
+def iter_files(input_folder,
+               extensions = None,
+               patterns = None,
+               recursive = True,
+               exclude = (),
+               include_hidden = False,
+               ):
+    """
+    Обходит папку через os.scandir и возвращает подходящие под фильтры файлы (в порядке имён, папка за папкой).
+
+    Аргументы:
+    input_folder (str): Путь к папке.
+    extensions (iterable, optional): Допустимые расширения (".mp3" или "mp3", без учёта регистра). По умолчанию — любые.
+    patterns (str или iterable, optional): Glob-шаблоны (fnmatch) для пути относительно input_folder (через "/") или имени файла, 
+        например "2024-*/*.m4a". Файл подходит, если совпал хотя бы один шаблон.
+    recursive (bool): Заходить ли во вложенные папки.
+    exclude (iterable): Пути к файлам и папкам, которые нужно пропустить (например, выходная папка внутри входной).
+    include_hidden (bool): Возвращать ли скрытые файлы и заходить ли в скрытые папки (".cache", ".decoded_cache" и т. п.).
+
+    Возвращает:
+    generator: Пары (путь к файлу, путь относительно input_folder).
+    """
+    if isinstance(extensions, str):
+        extensions = (extensions,)
+    if extensions is not None:
+        extensions = tuple("." + extension.lower().lstrip(".") for extension in extensions)
+    if isinstance(patterns, str):
+        patterns = (patterns,)
+    exclude = {os.path.abspath(path) for path in exclude}
+
+    stack = [(input_folder, "")]
+    while stack:
+        folder, relative_folder = stack.pop()
+        try:
+            with os.scandir(folder) as entries:
+                entries = sorted(entries, key=lambda entry: entry.name)
+        except (FileNotFoundError, NotADirectoryError, PermissionError): # Папку удалили или она недоступна
+            continue
+
+        subfolders = []
+        for entry in entries:
+            if not include_hidden and entry.name.startswith("."):
+                continue
+            if exclude and os.path.abspath(entry.path) in exclude:
+                continue
+
+            relative_path = os.path.join(relative_folder, entry.name)
+            if entry.is_dir():
+                if recursive:
+                    subfolders.append((entry.path, relative_path))
+                continue
+            if not entry.is_file():
+                continue
+
+            if extensions is not None and not entry.name.lower().endswith(extensions):
+                continue
+            if patterns is not None:
+                posix_path = relative_path.replace(os.sep, "/")
+                if not any(fnmatch(posix_path, pattern) or fnmatch(entry.name, pattern) for pattern in patterns):
+                    continue
+
+            yield entry.path, relative_path
+
+        # Вложенные папки обходим в порядке имён
+        stack.extend(reversed(subfolders))
+
+
+def process_folder(input_folder, 
+                   processing_function, 
+                   output_folder = None, 
+                   kwargs = {}, 
+                   verbose = False,
+                   n_workers = 1,
+                   executor = "process",
+                   timeout = None,
+                   retries = 0,
+                   manifest = None,
+                   cache = None,
+                   recursive = False,
+                   extensions = None,
+                   patterns = None,
+                   watch = False,
+                   poll_s = 5.,
+                   settle_s = 10.,
+                   max_idle_s = None,
+                   ):
     """
     Обрабатывает все файлы в указанной папке с помощью переданной функции.
 
+    Ошибка в одном файле не прерывает обработку папки: она попадает в отчёт, а обработка продолжается.
+
     Аргументы:
     folder_path (str): Путь к папке, содержащей файлы для обработки.
     processing_function (callable): Функция для обработки каждого файла. Должна принимать один аргумент - путь к файлу.
     output_folder (str): Папка для сохранения результатов. Имя output_file передаётся в исполняющую функцию, (если функция не принимает такой аргумент, вылетит ошибка).
+        При recursive=True структура вложенных папок повторяется в output_folder.
     kwargs (dict): Словарь с аргументами для передачи их в processing_function.
+    verbose (bool): Выводить ли сообщение о каждом обработанном файле и итоговую сводку. По умолчанию выключено: 
+        результат обработки — возвращаемый отчёт.
+    n_workers (int): Количество параллельных воркеров. 1 — последовательная обработка в текущем процессе (по умолчанию).
+    executor (str): Тип пула воркеров: "process" (по умолчанию) или "thread". Для "process" функция и kwargs должны сериализоваться pickle.
+    timeout (float, optional): Ограничение времени обработки одного файла в секундах. Поддерживается для executor="process" 
+        и последовательного режима на POSIX-системах. Если process_folder вызван не из главного потока, в последовательном режиме 
+        время отсчитывается во вспомогательном потоке (на любой ОС): зависшая функция дорабатывает в фоне.
+    retries (int): Количество повторных попыток для файла, обработка которого завершилась ошибкой.
+    manifest (str, optional): Путь к манифесту (JSON Lines). Успешно обработанные и не изменившиеся с тех пор файлы при повторном запуске пропускаются.
+    cache (OutputCache, optional): Кэш результатов. Файлы, которые уже обрабатывались с теми же аргументами, не обрабатываются заново, а восстанавливаются из кэша.
+    recursive (bool): Обрабатывать ли файлы во вложенных папках (например, датированных папках с новыми записями).
+    extensions (iterable, optional): Допустимые расширения файлов, например (".mp3", ".m4a"). По умолчанию — любые файлы. 
+        Для аудиофункций передавайте AUDIO_EXTENSIONS, чтобы текстовые файлы и файлы-компаньоны не попадали в обработку. 
+        Если фильтр отсеял все файлы папки, выдаётся предупреждение.
+    patterns (str или iterable, optional): Glob-шаблоны для относительного пути или имени файла (см. iter_files).
+    watch (bool): Режим наблюдения: после обработки имеющихся файлов папка опрашивается каждые poll_s секунд, 
+        новые и изменившиеся файлы обрабатываются по мере появления. Остановка — Ctrl+C (KeyboardInterrupt) или max_idle_s.
+    poll_s (float): Интервал опроса папки в режиме наблюдения, в секундах.
+    settle_s (float): Файл считается дописанным, если его размер и время изменения не менялись settle_s секунд.
+    max_idle_s (float, optional): Завершить наблюдение, если новых файлов не было max_idle_s секунд. По умолчанию — наблюдать до прерывания.
+
+    Скрытые файлы и папки (".cache", ".decoded_cache" и т. п.), а также output_folder и manifest внутри input_folder не обрабатываются.
+
+    При включённом инструментировании (см. enable_instrumentation) по каждому файлу отправляется событие "file", 
+    а в конце — событие "folder" со сводкой.
 
     Возвращает:
-    None
+    list: Отчёт — список словарей по каждому файлу с ключами "file", "output_file", "status" ("ok", "cached", "failed", "timeout" или "skipped"), "attempts", "duration" и "error".
     """
     # Проверяем, существует ли указанная папка
     if not os.path.exists(input_folder):
         print(f"Папка {input_folder} не существует.")
-        return
+        return []
+
+    if executor not in ("process", "thread"):
+        raise ValueError("Недопустимый executor. Используйте 'process' или 'thread'.")
+
+    # Таймаут реализован через SIGALRM, который доступен только главному потоку процесса. 
+    # Вне главного потока (например, из потока веб-сервера) в последовательном режиме время отсчитывается во вспомогательном потоке
+    thread_timeout = timeout is not None and n_workers == 1 and threading.current_thread() is not threading.main_thread()
+    if timeout is not None and not thread_timeout and (
+            not hasattr(signal, "setitimer") or (executor == "thread" and n_workers > 1)):
+        raise ValueError("timeout поддерживается только на POSIX-системах для executor='process' или n_workers=1.")
     
     # Создаём папку output_path, если такая не существует
     if output_folder != None:
         if not os.path.exists(output_folder):
             os.makedirs(output_folder)
 
-    # Получаем список файлов в указанной папке
-    files = [file for file in os.listdir(input_folder) if os.path.isfile(os.path.join(input_folder, file))]
-    
     # Проверяем, что функция принимает аргумент "output_file", если указана output_folder
     if output_folder is not None:
         signature = inspect.signature(processing_function)
         if 'output_file' not in signature.parameters:
             raise TypeError(f"Функция {processing_function.__name__} не принимает аргумент output_file!")
 
-    # Применяем функцию к каждому файлу с передачей аргументов из словаря kwargs
-    for file_name in files:
-        
-        # Берём файл из папки
-        file_path = os.path.join(input_folder, file_name)
-        
-        # Меняем output_path, если указана output_folder
-        if output_folder != None:
-            output_file = change_folder_name(file_path, output_folder)
-            processing_function(file_path, output_file = output_file, **kwargs)
-        
-        else: # В противном случае, просто выполняем функцию, которую указали
-            processing_function(file_path, output_file = None, **kwargs)
-            
+    # Выходная папка и манифест могут лежать внутри входной — их не обрабатываем
+    exclude = [path for path in (output_folder, manifest) if path is not None]
+
+    def _scan():
+        return iter_files(input_folder, extensions=extensions, patterns=patterns, recursive=recursive, exclude=exclude)
+
+    # Читаем манифест прошлых запусков
+    done = _load_manifest(manifest)
+
+    reports = []
+
+    def _collect(files):
+        """
+        Превращает пары (путь, относительный путь) в задания, пропуская файлы, обработанные в прошлых запусках.
+        """
+        tasks = []
+        for file_path, relative_path in files:
+
+            # Сохраняем структуру вложенных папок в output_folder
+            output_file = None
+            if output_folder is not None:
+                output_file = os.path.join(output_folder, relative_path)
+                os.makedirs(os.path.dirname(output_file), exist_ok=True)
+
+            # Пропускаем файлы, которые уже успешно обработаны и с тех пор не менялись
+            record = done.get(file_path)
+            if record and record["status"] == "ok" and tuple(record["signature"] or ()) == _file_signature(file_path):
+                reports.append({"file": file_path, "output_file": output_file, "status": "skipped",
+                                "attempts": 0, "duration": 0., "error": None})
+                continue
+
+            tasks.append((file_path, output_file))
+        return tasks
+
+    folder_started = time.perf_counter()
+
+    def _finish(report):
+        emit_event({"event": "file", "function": getattr(processing_function, "__name__", str(processing_function)), **report})
+
+        # Дописываем результат в манифест сразу, чтобы прерванный запуск можно было продолжить
+        if manifest is not None:
+            # Файл могли удалить, пока он обрабатывался (в режиме наблюдения)
+            file_signature = _file_signature(report["file"]) if os.path.exists(report["file"]) else None
+            record = dict(report, signature=file_signature)
+            with open(manifest, 'a', encoding='utf-8') as file:
+                file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+        if verbose:
+            file_name = os.path.basename(report["file"])
+            if report["status"] == "ok":
+                print(f'Файл {file_name} успешно обработан!')
+            elif report["status"] == "cached":
+                print(f'Файл {file_name} взят из кэша.')
+            else:
+                print(f'Ошибка при обработке файла {file_name}: {report["error"]}')
+
+        reports.append(report)
+
+    # Пул создаётся один раз: в режиме наблюдения он переиспользуется для каждой новой порции файлов
+    pool = None
+    worker_instrumentation = None
+    if n_workers > 1:
+        pool_class = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+        pool = pool_class(max_workers=n_workers)
+
+        # Воркерам-процессам передаём только sink: callback вызывается в текущем процессе по событиям "file"
+        if executor == "process" and _instrumentation is not None and _instrumentation["sink"] is not None:
+            worker_instrumentation = {"sink": _instrumentation["sink"], "callback": None}
+
+    def _run(tasks):
+        # Применяем функцию к каждому файлу с передачей аргументов из словаря kwargs
+        if pool is None:
+            for file_path, output_file in tasks:
+                _finish(_process_file(processing_function, file_path, output_file, kwargs, timeout, retries, cache,
+                                      thread_timeout=thread_timeout))
+            return
+
+        # Распределяем файлы по пулу воркеров
+        futures = {
+            pool.submit(_process_file, processing_function, file_path, output_file, kwargs, timeout, retries, cache,
+                        worker_instrumentation): 
+                (file_path, output_file)
+            for file_path, output_file in tasks
+        }
+        for future in as_completed(futures):
+            try:
+                report = future.result()
+            except Exception as e: # Например, воркер упал или функцию не удалось передать в процесс
+                file_path, output_file = futures[future]
+                report = {"file": file_path, "output_file": output_file, "status": "failed",
+                          "attempts": 1, "duration": 0., "error": f"{type(e).__name__}: {e}"}
+            _finish(report)
+
+    try:
+        if not watch:
+            files = list(_scan())
+            # Фильтр по расширениям отсеял всё — скорее всего, он не подходит для этой функции (например, AUDIO_EXTENSIONS для .txt)
+            if not files and extensions is not None and next(iter_files(
+                    input_folder, patterns=patterns, recursive=recursive, exclude=exclude), None) is not None:
+                warnings.warn(f"В папке {input_folder} нет файлов с расширениями {extensions}: обрабатывать нечего. "
+                              "Передайте extensions=None, чтобы обработать файлы любых типов.", stacklevel=2)
+            _run(_collect(files))
+
+        else:
+            if verbose:
+                print(f"Наблюдение за папкой {input_folder} (Ctrl+C — остановить)...")
+
+            processed = {} # Путь -> подпись файла, с которой он уже обработан в этом запуске
+            observed = {} # Путь -> (подпись, момент, когда её впервые увидели) для файлов, которые ещё пишутся
+            last_activity = time.monotonic()
+
+            while True:
+                now, wall_now = time.monotonic(), time.time()
+                ready, writing = [], {}
+                for file_path, relative_path in _scan():
+                    try:
+                        file_signature = _file_signature(file_path)
+                    except FileNotFoundError: # Файл удалили между обходом и stat
+                        continue
+                    if processed.get(file_path) == file_signature:
+                        continue
+
+                    # Файл дописан, если не менялся settle_s секунд: по времени изменения 
+                    # или (при расхождении часов, например на сетевом диске) по наблюдению между опросами
+                    first_seen = observed.get(file_path, (None, now))
+                    first_seen = first_seen if first_seen[0] == file_signature else (file_signature, now)
+                    if wall_now - file_signature[1] < settle_s and now - first_seen[1] < settle_s:
+                        writing[file_path] = first_seen
+                        continue
+
+                    ready.append((file_path, relative_path))
+                    processed[file_path] = file_signature
+
+                # Удалённые недописанные файлы забываем
+                observed = writing
+
+                if ready:
+                    _run(_collect(ready))
+                    last_activity = time.monotonic()
+                elif observed: # Пока файлы дописываются, наблюдение не завершаем
+                    last_activity = now
+                elif max_idle_s is not None and now - last_activity >= max_idle_s:
+                    break
+
+                time.sleep(poll_s)
+
+    except KeyboardInterrupt:
+        if not watch:
+            raise
         if verbose:
-            print(f'Файл {file_name} успешно обработан!')
+            print("Наблюдение остановлено.")
+
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    emit_event({"event": "folder", "input_folder": input_folder, "files": len(reports), 
+                "statuses": {status: sum(report["status"] == status for report in reports) 
+                             for status in sorted({report["status"] for report in reports})},
+                "duration_s": time.perf_counter() - folder_started})
+
+    if verbose and reports:
+        failed = sum(report["status"] in ("failed", "timeout") for report in reports)
+        skipped = sum(report["status"] in ("skipped", "cached") for report in reports)
+        print(f"Обработано файлов: {len(reports) - failed - skipped}, пропущено: {skipped}, с ошибкой: {failed}.")
+
+    return reports
 
 
 def parse_time(time_str):
     """
     Парсит строку длительности в формате "1h10m1s10ms" и возвращает общее время в миллисекундах.
+    Также принимает таймкоды вида "01:10:01,010" (как в SRT-субтитрах) и "10:01.5".
 
     Аргументы:
     time_str (str): Строка с указанием времени в формате "1h10m1s10ms".
@@ -123,6 +955,12 @@ def parse_time(time_str):
     Возвращает:
     int: Общее время в миллисекундах, полученное из указанной строки времени.
     """
+    # Таймкод вида "ЧЧ:ММ:СС,мс" или "ММ:СС.мс"
+    if ':' in time_str:
+        parts = time_str.strip().replace(',', '.').split(':')
+        seconds = float(parts[-1]) + 60 * int(parts[-2]) + (3600 * int(parts[-3]) if len(parts) > 2 else 0)
+        return int(round(seconds * 1000))
+
     # Регулярное выражение для парсинга
     match = re.match(r'(?:(\d+h))?(?:(\d+m(?!s)))?(?:(\d+s))?(?:(\d+ms))?', time_str)
     
@@ -136,6 +974,157 @@ def parse_time(time_str):
     return hours * 60 * 60 * 1000 + minutes * 60 * 1000 + seconds * 1000 + milliseconds
 
 
+def format_time(time_ms):
+    """
+    Переводит время в миллисекундах в строку вида "1h10m1s10ms" (обратное к parse_time).
+
+    Аргументы:
+    time_ms (int): Время в миллисекундах.
+
+    Возвращает:
+    str: Строка времени, например "1m30s" для 90000.
+    """
+    time_ms = int(round(time_ms))
+    hours, time_ms = divmod(time_ms, 60 * 60 * 1000)
+    minutes, time_ms = divmod(time_ms, 60 * 1000)
+    seconds, milliseconds = divmod(time_ms, 1000)
+
+    time_str = ''.join(f"{value}{unit}" for value, unit in 
+                       [(hours, 'h'), (minutes, 'm'), (seconds, 's'), (milliseconds, 'ms')] if value)
+    
+    return time_str or "0s"
+
+
+def read_srt(file_path, encoding='utf-8'):
+    """
+    Читает файл субтитров SRT.
+
+    Аргументы:
+    file_path (str): Путь к .srt файлу.
+    encoding (str, optional): Кодировка файла. По умолчанию 'utf-8'.
+
+    Возвращает:
+    list: Список словарей с ключами "start", "end" (строки в формате parse_time, например "1m2s500ms") и "text".
+    """
+    with open(file_path, 'r', encoding=encoding) as file:
+        blocks = re.split(r'\n\s*\n', file.read().strip())
+
+    segments = []
+    for block in blocks:
+        lines = block.strip().splitlines()
+        
+        # Ищем строку с таймкодами: "00:00:01,000 --> 00:00:04,000"
+        for i, line in enumerate(lines):
+            if '-->' in line:
+                start, end = [part.strip() for part in line.split('-->')]
+                segments.append({
+                    "start": format_time(parse_time(start)),
+                    "end": format_time(parse_time(end.split()[0])),
+                    "text": ' '.join(lines[i + 1:]).strip(),
+                })
+                break
+
+    return segments
+
+
+# umask процесса: os.umask нельзя прочитать, не изменив, поэтому читаем один раз при импорте (а не из потоков)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def unique_temp_path(file_path, suffix='.tmp'):
+    """
+    Создаёт пустой временный файл рядом с file_path и возвращает его путь. Имя уникально между процессами и потоками 
+    (tempfile.mkstemp), права — как у обычного файла (по umask), чтобы после os.replace результат не стал доступен только владельцу.
+
+    Аргументы:
+    file_path (str): Путь к итоговому файлу.
+    suffix (str, optional): Окончание имени временного файла. По умолчанию '.tmp'.
+    """
+    descriptor, temp_path = tempfile.mkstemp(prefix=f"{os.path.basename(file_path)}.", suffix=suffix,
+                                             dir=os.path.dirname(file_path) or ".")
+    os.close(descriptor)
+    os.chmod(temp_path, 0o666 & ~_UMASK)
+    return temp_path
+
+
+def write_atomic(file_path, text, encoding='utf-8'):
+    """
+    Записывает текст в файл атомарно: сначала во временный файл рядом, затем переименованием. 
+    Прерванная запись не оставляет недописанный файл, который при повторном запуске сочли бы готовым.
+
+    Аргументы:
+    file_path (str): Путь к файлу.
+    text (str): Текст для записи.
+    encoding (str, optional): Кодировка файла. По умолчанию 'utf-8'.
+    """
+    temp_path = unique_temp_path(file_path)
+    try:
+        with open(temp_path, 'w', encoding=encoding) as file:
+            file.write(text)
+        os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _srt_timecode(time_ms):
+    hours, time_ms = divmod(int(round(time_ms)), 60 * 60 * 1000)
+    minutes, time_ms = divmod(time_ms, 60 * 1000)
+    seconds, milliseconds = divmod(time_ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{milliseconds:03d}"
+
+
+def write_srt(segments, file_path, offset=0, encoding='utf-8'):
+    """
+    Записывает субтитры SRT (атомарно, см. write_atomic).
+
+    Аргументы:
+    segments (list): Список словарей с ключами "start", "end" и "text". Время — число секунд (как в результате whisper) 
+        или строка в формате parse_time (как возвращает read_srt).
+    file_path (str): Путь к .srt файлу.
+    offset (int, optional): Сдвиг всех таймкодов в миллисекундах (например, начало отрезка в исходной записи).
+    encoding (str, optional): Кодировка файла. По умолчанию 'utf-8'.
+    """
+    to_ms = lambda value: parse_time(value) if isinstance(value, str) else value * 1000
+
+    blocks = []
+    for number, segment in enumerate(segments, start=1):
+        start, end = to_ms(segment["start"]) + offset, to_ms(segment["end"]) + offset
+        blocks.append(f"{number}\n{_srt_timecode(start)} --> {_srt_timecode(end)}\n{segment['text'].strip()}\n")
+
+    write_atomic(file_path, "\n".join(blocks), encoding=encoding)
+
+
+def read_cue_list(file_path, encoding='utf-8'):
+    """
+    Читает список отрезков (start, end) из CSV или SRT файла.
+
+    В CSV каждая строка — "start,end" (строки для parse_time или таймкоды "ЧЧ:ММ:СС"), строка-заголовок допускается.
+
+    Аргументы:
+    file_path (str): Путь к .csv или .srt файлу.
+    encoding (str, optional): Кодировка файла. По умолчанию 'utf-8'.
+
+    Возвращает:
+    list: Список кортежей (start, end).
+    """
+    if os.path.splitext(file_path)[1].lower() == '.srt':
+        return [(segment["start"], segment["end"]) for segment in read_srt(file_path, encoding=encoding)]
+
+    ranges = []
+    with open(file_path, 'r', encoding=encoding, newline='') as file:
+        for row in csv.reader(file):
+            if len(row) < 2 or not row[0].strip():
+                continue
+            start, end = row[0].strip(), row[1].strip()
+            if not re.match(r'\d', start): # Пропускаем заголовок
+                continue
+            ranges.append((start, end))
+
+    return ranges
+
+
 def move_files(from_folder, to_folder, verbose=0):
     """
     Перемещает все файлы и папки из указанной папки 'from_folder' в указанную папку 'to_folder'.
@@ -0,0 +1,62 @@
+import os
+import sys
+import random
+import itertools
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmark import _clean_text_reference, _remove_links_reference
+from text_processing import clean_text, clean_pages, remove_links_batch
+
+MODES = ('bypass', 'soft', 'normal', 'aggressive')
+OPTIONS = [
+    {"preserve_symbols": preserve_symbols, "remove_symbols": remove_symbols, "remove_caps": remove_caps}
+    for preserve_symbols, remove_symbols, remove_caps in itertools.product(
+        (None, list("абвгдежзийклмнопрстуфхцчшщъыьэюяё .,")), (None, ["«", "»", ";"]), (False, True))
+]
+
+# Фрагменты, на которых правила clean_text взаимодействуют: переносы, пробелы, точки, кавычки, двоеточия, капс, ссылки
+_TOKENS = [
+    "Кант", "апперцепция", "трансцендентальный", "Dasein", "is", "ФИЛОСОФИЯ", "МГУ", "XX", "2023", "3.14",
+    "пере-\nнос", "пере -\nнос", "-\n", "\n", "\n\n", " ", "  ", "\t", " ",
+    ".", "..", "...", "....", " . ", ",", " ,", ", ", ";", " ;", ":", " :", "a:b", "—", "-", "--", "!", "?",
+    "«", "»", "« ", " »", "(", ")", "( ", " )", "[1]", "§", "№", "*", "'", '"',
+    "https://ya.ru/path?x=1", "www.example.com", "example.org", "mail@site.ru", "192.168.0.1", "localhost:8000",
+    "т.е.", "и т.д.", "см.стр", "e.g.",
+]
+
+
+def _random_text(seed, length=400):
+    rng = random.Random(seed)
+    return "".join(rng.choice(_TOKENS) + rng.choice(("", " ", " ", "\n")) for _ in range(length))
+
+
+@pytest.mark.parametrize("options", OPTIONS, ids=lambda options: "-".join(
+    name for name, value in options.items() if value) or "default")
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("seed", range(10))
+def test_matches_reference_on_random_text(seed, mode, options):
+    text = _random_text(seed)
+    assert clean_text(text, mode=mode, **options) == _clean_text_reference(text, mode=mode, **options)
+
+
+@pytest.fixture(scope="module")
+def prompt_text():
+    with open(os.path.join(ROOT, "prompts", "prompt.txt"), 'r', encoding='utf-8') as file:
+        return file.read()
+
+
+@pytest.mark.parametrize("options", OPTIONS, ids=lambda options: "-".join(
+    name for name, value in options.items() if value) or "default")
+@pytest.mark.parametrize("mode", MODES)
+def test_matches_reference_on_prompt(prompt_text, mode, options):
+    assert clean_text(prompt_text, mode=mode, **options) == _clean_text_reference(prompt_text, mode=mode, **options)
+
+
+def test_clean_pages_matches_reference_per_page():
+    pages = [_random_text(seed, length=150) for seed in range(20)]
+    assert clean_pages(pages, mode='aggressive') == [_clean_text_reference(page, mode='aggressive') for page in pages]
+    assert remove_links_batch(pages) == [_remove_links_reference(page) for page in pages]
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import HEAVY_MODULES, IMPORT_CHECKS, measure_import
+
+# Бюджет времени импорта одного модуля; на медленных CI-машинах можно ослабить через переменную окружения
+BUDGET_S = float(os.environ.get("IMPORT_BUDGET_S", 0.5))
+
+
+@pytest.mark.parametrize("module", sorted(IMPORT_CHECKS))
+def test_import_budget(module):
+    """
+    Модуль импортируется без тяжёлых зависимостей (они недоступны в дочернем процессе) и укладывается в бюджет:
+    ловит регрессии ленивых импортов — например, import torch на верхнем уровне модуля.
+    """
+    blocked = [name for name in HEAVY_MODULES if name not in IMPORT_CHECKS[module]]
+    result = measure_import(module, repeat=3, blocked=blocked)
+
+    assert result.get("error") is None, f"{module} не импортируется без тяжёлых зависимостей: {result['error']}"
+    assert result["import_s"] <= BUDGET_S, f"{module} импортируется {result['import_s']:.3f} с (бюджет {BUDGET_S:g} с)"
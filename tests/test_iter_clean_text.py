@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import random
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from text_processing import clean_text, iter_clean_text, text_preprocess
+
+# Фрагменты, которые ломаются при неудачном разрезе: переносы слов, последовательности пробелов, многоточия, кавычки
+_TOKENS = [
+    "Кант", "апперцепция", "трансцендентальный", "Dasein", "is", "ФИЛОСОФИЯ", "XX", "2023",
+    "пере-\nнос", "пере -\nнос", "-\n", "\n", "\n\n", " ", "   ", "\t",
+    ".", "...", " . ", ",", " ,", ";", ":", "a:b", "—", "«", "»", "« ", " »", "(", ")", "( ", " )", "§",
+]
+
+
+def _random_text(seed, length=3000):
+    rng = random.Random(seed)
+    return "".join(rng.choice(_TOKENS) + rng.choice(("", " ", " ", "\n")) for _ in range(length))
+
+
+def _write(tmp_path, text, name="text.txt"):
+    file = tmp_path / name
+    file.write_text(text, encoding='utf-8')
+    return str(file)
+
+
+@pytest.mark.parametrize("chunk_size", [7, 50, 4096])
+@pytest.mark.parametrize("mode", ['bypass', 'soft', 'normal', 'aggressive'])
+@pytest.mark.parametrize("seed", range(3))
+def test_chunks_match_whole_text(tmp_path, seed, mode, chunk_size):
+    text = _random_text(seed)
+    file_path = _write(tmp_path, text)
+
+    chunks = list(iter_clean_text(file_path, clean_mode=mode, chunk_size=chunk_size, encoding='utf-8'))
+    assert "".join(chunks) == clean_text(text, mode=mode)
+
+
+@pytest.mark.parametrize("chunk_size", [7, 50])
+def test_text_preprocess_stream_matches_whole_text(tmp_path, chunk_size):
+    text = _random_text(seed=10)
+    file_path = _write(tmp_path, text)
+    output_file = str(tmp_path / "clean.txt")
+
+    assert text_preprocess(file_path, clean_mode='normal', output_file=output_file, chunk_size=chunk_size) == output_file
+    with open(output_file, 'r') as file:
+        assert file.read() == clean_text(text, mode='normal')
+
+
+@pytest.mark.parametrize("chunk_size", [7, 50])
+@pytest.mark.parametrize("mode", ['soft', 'normal'])
+def test_no_safe_split_point(tmp_path, mode, chunk_size):
+    """
+    Текст без безопасных мест разреза (слова капсом, затем одно длинное слово): буфер режется вынужденно по max_buffer.
+    На таком тексте вынужденный разрез после одиночного пробела не меняет результат.
+    """
+    text = " ".join(random.Random(0).choice(["АБВ", "ГДЕ", "XX", "2023"]) for _ in range(2000)) + " " + "Я" * 5000
+    file_path = _write(tmp_path, text)
+    max_buffer = 20 * chunk_size
+
+    chunks = list(iter_clean_text(file_path, clean_mode=mode, chunk_size=chunk_size, max_buffer=max_buffer, encoding='utf-8'))
+    assert "".join(chunks) == clean_text(text, mode=mode)
+    assert len(chunks) > len(text) // (max_buffer + chunk_size)
+    # Буфер не растёт сверх max_buffer (плюс один прочитанный фрагмент) — кроме хвоста без пробелов
+    assert max(len(chunk) for chunk in chunks[:-1]) <= max_buffer + chunk_size
+
+
+def test_no_safe_split_point_is_linear(tmp_path):
+    """
+    Раньше поиск места разреза заново просматривал весь буфер после каждого фрагмента: 2 млн символов — около минуты.
+    """
+    file_path = _write(tmp_path, "Я" * (2 << 20))
+
+    started = time.perf_counter()
+    length = sum(len(chunk) for chunk in iter_clean_text(file_path, chunk_size=1 << 12, encoding='utf-8'))
+    assert length == 2 << 20
+    assert time.perf_counter() - started < 5
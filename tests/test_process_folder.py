@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions import process_folder, AUDIO_EXTENSIONS
+
+
+def _sleepy(file_path, output_file=None):
+    if "slow" in os.path.basename(file_path):
+        time.sleep(2)
+    return file_path
+
+
+def _files(tmp_path, *names):
+    for name in names:
+        (tmp_path / name).touch()
+    return str(tmp_path)
+
+
+def _statuses(reports):
+    return {os.path.basename(report["file"]): report["status"] for report in reports}
+
+
+def test_timeout_off_main_thread(tmp_path):
+    """
+    SIGALRM недоступен вне главного потока: таймаут отсчитывается во вспомогательном потоке, а не валит каждый файл.
+    """
+    folder = _files(tmp_path, "fast.mp3", "slow.mp3")
+    reports = []
+    worker = threading.Thread(target=lambda: reports.extend(process_folder(folder, _sleepy, timeout=0.5)))
+    worker.start()
+    worker.join()
+
+    assert _statuses(reports) == {"fast.mp3": "ok", "slow.mp3": "timeout"}
+
+
+def test_timeout_on_main_thread(tmp_path):
+    folder = _files(tmp_path, "fast.mp3", "slow.mp3")
+    assert _statuses(process_folder(folder, _sleepy, timeout=0.5)) == {"fast.mp3": "ok", "slow.mp3": "timeout"}
+
+
+def test_quiet_by_default(tmp_path, capsys):
+    folder = _files(tmp_path, "fast.mp3")
+    assert _statuses(process_folder(folder, _sleepy)) == {"fast.mp3": "ok"}
+    assert capsys.readouterr().out == ""
+
+    process_folder(folder, _sleepy, verbose=True)
+    assert "fast.mp3" in capsys.readouterr().out
+
+
+def test_all_files_by_default(tmp_path):
+    folder = _files(tmp_path, "lecture.txt", "lecture.mp3")
+    assert _statuses(process_folder(folder, _sleepy)) == {"lecture.txt": "ok", "lecture.mp3": "ok"}
+
+
+def test_warns_when_extensions_drop_every_file(tmp_path):
+    folder = _files(tmp_path, "lecture.txt")
+    with pytest.warns(UserWarning, match="extensions=None"):
+        assert process_folder(folder, _sleepy, extensions=AUDIO_EXTENSIONS) == []
@@ -0,0 +1,123 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import transcribe
+from transcribe import FakeTranscriber, transcribe_batch
+
+
+def _audio(tmp_path, *names):
+    """
+    Пустые «аудиофайлы»: FakeTranscriber их не читает, важны только пути.
+    """
+    files = []
+    for name in names:
+        file = tmp_path / name
+        file.touch()
+        files.append(str(file))
+    return files
+
+
+def _statuses(reports):
+    return {os.path.basename(report["audio"]): report["status"] for report in reports}
+
+
+def test_skips_finished_items_and_resumes(tmp_path):
+    first, second = _audio(tmp_path, "a.mp3", "b.mp3")
+    output_folder = str(tmp_path / "out")
+
+    reports = transcribe_batch([(first, None)], backend=FakeTranscriber(), output_folder=output_folder, verbose=False)
+    assert _statuses(reports) == {"a.mp3": "ok"}
+
+    # Готовое задание (есть txt и srt) пропускается, недоделанное выполняется
+    reports = transcribe_batch([(first, None), (second, None)], backend=FakeTranscriber(),
+                               output_folder=output_folder, verbose=False)
+    assert _statuses(reports) == {"a.mp3": "skipped", "b.mp3": "ok"}
+
+    # Без srt задание не считается готовым
+    os.remove(os.path.join(output_folder, "b.srt"))
+    reports = transcribe_batch([(first, None), (second, None)], backend=FakeTranscriber(),
+                               output_folder=output_folder, verbose=False)
+    assert _statuses(reports) == {"a.mp3": "skipped", "b.mp3": "ok"}
+
+
+def test_overwrite(tmp_path):
+    audio_file, = _audio(tmp_path, "a.mp3")
+    transcribe_batch([(audio_file, None)], backend=FakeTranscriber(), verbose=False)
+
+    reports = transcribe_batch([(audio_file, None)], backend=FakeTranscriber(), overwrite=True, verbose=False)
+    assert _statuses(reports) == {"a.mp3": "ok"}
+
+
+def test_prompt_read_once(tmp_path, monkeypatch):
+    audio_files = _audio(tmp_path, "a.mp3", "b.mp3", "c.mp3")
+    prompt = tmp_path / "prompt.txt"
+    prompt.write_text("Трансцендентальное единство апперцепции")
+
+    calls = []
+    def import_text(file_path):
+        calls.append(file_path)
+        with open(file_path, 'r') as file:
+            return file.read()
+    monkeypatch.setattr(transcribe, "import_text", import_text)
+
+    reports = transcribe_batch([(audio_file, str(prompt)) for audio_file in audio_files],
+                               backend=FakeTranscriber(), verbose=False)
+    assert [report["status"] for report in reports] == ["ok"] * 3
+    assert calls == [str(prompt)]
+
+    # Подсказка дошла до каждого задания
+    for report in reports:
+        with open(report["output_txt"], encoding='utf-8') as file:
+            assert f"prompt {len(prompt.read_text())}," in file.read()
+
+
+def test_unreadable_prompt_fails_only_its_items(tmp_path):
+    first, second, third = _audio(tmp_path, "a.mp3", "b.mp3", "c.mp3")
+    missing = str(tmp_path / "missing.txt")
+
+    reports = transcribe_batch([(first, missing), (second, None), (third, missing)],
+                               backend=FakeTranscriber(), verbose=False)
+    assert _statuses(reports) == {"a.mp3": "failed", "b.mp3": "ok", "c.mp3": "failed"}
+    assert all("missing.txt" in report["error"] for report in reports if report["status"] == "failed")
+    assert not os.path.exists(tmp_path / "a.txt")
+
+
+def test_backend_failure_does_not_abort_batch(tmp_path):
+    audio_files = _audio(tmp_path, "a.mp3", "broken.mp3", "c.mp3")
+
+    reports = transcribe_batch([(audio_file, None) for audio_file in audio_files],
+                               backend=FakeTranscriber(fail_on=("broken",)), verbose=False)
+    assert _statuses(reports) == {"a.mp3": "ok", "broken.mp3": "failed", "c.mp3": "ok"}
+    assert "RuntimeError" in next(report["error"] for report in reports if report["status"] == "failed")
+    assert not os.path.exists(tmp_path / "broken.txt") and not os.path.exists(tmp_path / "broken.srt")
+
+
+def test_offset_shifts_srt(tmp_path):
+    audio_file, = _audio(tmp_path, "a.mp3")
+
+    reports = transcribe_batch([{"audio": audio_file, "prompt": None, "offset": "1m30s"}],
+                               backend=FakeTranscriber(), verbose=False)
+    with open(reports[0]["output_srt"], encoding='utf-8') as file:
+        srt = file.read()
+    assert "00:01:30,000 --> 00:01:31,500" in srt
+    assert "00:01:31,500 --> 00:01:33,000" in srt
+
+
+def test_model_loaded_once_per_worker(tmp_path):
+    audio_files = _audio(tmp_path, *[f"{number}.mp3" for number in range(6)])
+
+    reports = transcribe_batch([(audio_file, None) for audio_file in audio_files],
+                               backend=FakeTranscriber(delay_s=0.05), n_workers=2, verbose=False)
+    assert [report["status"] for report in reports] == ["ok"] * 6
+
+    # FakeTranscriber пишет в текст pid воркера и число загрузок модели в нём
+    workers = {}
+    for report in reports:
+        with open(report["output_txt"], encoding='utf-8') as file:
+            text = file.read()
+        pid = text.split("pid ")[1].split(",")[0]
+        workers.setdefault(pid, set()).add(text.split("load ")[1].strip())
+    assert 1 <= len(workers) <= 2
+    assert all(loads == {"1"} for loads in workers.values())
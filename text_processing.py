@@ -1,42 +1,358 @@
 import re
+import os
+import json
+import string
 import PyPDF2
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functions import file_fingerprint, unique_temp_path
  
-def import_pdf_text(file_path, start_page=None, end_page=None):
+def _extract_pdf_pages(file_path, page_numbers):
+    """
+    Извлекает текст указанных страниц (нумерация с 1). Выполняется в воркере пула: 
+    каждый воркер сам открывает PDF, чтобы не передавать между процессами объект PdfReader.
+    """
+    with open(file_path, 'rb') as pdf_file:
+        pdf_reader = PyPDF2.PdfReader(pdf_file)
+        return [(page_num, pdf_reader.pages[page_num - 1].extract_text()) for page_num in page_numbers]
+
+
+def _pdf_cache_folder(file_path, cache_folder):
+    # Кэш страниц адресуется хэшем содержимого PDF: переименование или копирование книги не сбрасывает кэш
+    if cache_folder is None:
+        cache_folder = os.path.join(os.path.dirname(os.path.abspath(file_path)), '.pdf_cache')
+    return os.path.join(cache_folder, file_fingerprint(file_path, mode="content"))
+
+
+def _write_cached_page(folder, page_num, text):
+    # Пишем во временный файл и переименовываем, чтобы параллельные процессы не прочитали недописанную страницу
+    page_path = os.path.join(folder, f"{page_num:05d}.txt")
+    temp_path = unique_temp_path(page_path)
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        file.write(text)
+    os.replace(temp_path, page_path)
+
+
+def _read_cached_page(folder, page_num):
+    try:
+        with open(os.path.join(folder, f"{page_num:05d}.txt"), 'r', encoding='utf-8') as file:
+            return file.read()
+    except FileNotFoundError:
+        return None
+
+
+def _pdf_page_count(file_path, folder):
+    count_path = os.path.join(folder, 'pages.json')
+    try:
+        with open(count_path, 'r') as file:
+            return json.load(file)['pages']
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+
+    with open(file_path, 'rb') as pdf_file:
+        count = len(PyPDF2.PdfReader(pdf_file).pages)
+
+    os.makedirs(folder, exist_ok=True)
+    temp_path = unique_temp_path(count_path)
+    with open(temp_path, 'w') as file:
+        json.dump({'pages': count}, file)
+    os.replace(temp_path, count_path)
+    return count
+
+
+def iter_pdf_pages(file_path, start_page=None, end_page=None, n_workers=None, batch_size=8, cache=True, 
+                   cache_folder=None, ordered=False):
+    """
+    Генератор: извлекает текст страниц PDF параллельно и отдаёт страницы по мере готовности, 
+    чтобы очистку можно было начинать, не дожидаясь всей книги.
+
+    Текст каждой страницы сохраняется в кэш на диске (ключ — хэш содержимого PDF и номер страницы), 
+    поэтому повторные и пересекающиеся запросы диапазонов берут уже извлечённые страницы из кэша мгновенно.
+
+    Args:
+        file_path (str): Путь к PDF-файлу.
+        start_page (int, optional): Начальная страница (с 1). None — с первой.
+        end_page (int, optional): Конечная страница (включительно). None — до последней.
+        n_workers (int, optional): Число процессов. None — по числу ядер, 1 — без пула.
+        batch_size (int, optional): Сколько страниц извлекает воркер за одну задачу. Меньше — раньше первые страницы, 
+            больше — меньше накладных расходов на разбор PDF в каждой задаче. None — поровну на каждый воркер. По умолчанию 8.
+        cache (bool, optional): Использовать ли кэш страниц. По умолчанию True.
+        cache_folder (str, optional): Папка кэша. По умолчанию ".pdf_cache" рядом с PDF.
+        ordered (bool, optional): Отдавать страницы строго по порядку (готовые раньше страницы ждут в буфере). По умолчанию False.
+
+    Returns:
+        generator: Пары (номер страницы, текст).
+    """
+    folder = _pdf_cache_folder(file_path, cache_folder) if cache else None
+    if folder is not None:
+        page_count = _pdf_page_count(file_path, folder)
+    else:
+        with open(file_path, 'rb') as pdf_file:
+            page_count = len(PyPDF2.PdfReader(pdf_file).pages)
+
+    page_numbers = list(range(start_page if start_page else 1, (end_page if end_page else page_count) + 1))
+    
+    # Страницы из кэша готовы сразу, недостающие отправляем воркерам пачками
+    ready = {}
+    for page_num in page_numbers:
+        text = _read_cached_page(folder, page_num) if folder is not None else None
+        if text is not None:
+            ready[page_num] = text
+    missing = [page_num for page_num in page_numbers if page_num not in ready]
+
+    n_workers = n_workers or os.cpu_count() or 1
+    if batch_size is None:
+        batch_size = max(1, -(-len(missing) // n_workers))
+    batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+
+    if folder is not None and missing:
+        os.makedirs(folder, exist_ok=True)
+
+    def _extracted():
+        if n_workers == 1 or len(batches) <= 1:
+            for batch in batches:
+                yield _extract_pdf_pages(file_path, batch)
+            return
+
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(batches))) as executor:
+            futures = [executor.submit(_extract_pdf_pages, file_path, batch) for batch in batches]
+            for future in as_completed(futures):
+                yield future.result()
+
+    if not ordered:
+        yield from sorted(ready.items())
+        for results in _extracted():
+            for page_num, text in results:
+                if folder is not None:
+                    _write_cached_page(folder, page_num, text)
+                yield page_num, text
+        return
+
+    # Упорядоченный режим: готовые раньше времени страницы ждут в буфере своей очереди
+    position = 0
+
+    def _drain():
+        nonlocal position
+        while position < len(page_numbers) and page_numbers[position] in ready:
+            yield page_numbers[position], ready.pop(page_numbers[position])
+            position += 1
+
+    yield from _drain()
+    for results in _extracted():
+        for page_num, text in results:
+            if folder is not None:
+                _write_cached_page(folder, page_num, text)
+            ready[page_num] = text
+        yield from _drain()
+
+
+def import_pdf_text(file_path, start_page=None, end_page=None, n_workers=None, cache=True, cache_folder=None):
     """
     Извлекает текст из PDF-файла для заданного диапазона страниц.
 
+    Страницы извлекаются параллельно и кэшируются на диске (см. iter_pdf_pages).
+
     Args:
         file_path (str): Путь к PDF-файлу.
         start_page (int, optional): Начальная страница для извлечения текста. None вернёт все страницы, начиная с первой.
         end_page (int, optional): Конечная страница для извлечения текста. None вернёт страницы до последней.
+        n_workers (int, optional): Число процессов. None — по числу ядер, 1 — последовательно в текущем процессе.
+        cache (bool, optional): Использовать ли кэш страниц. По умолчанию True.
+        cache_folder (str, optional): Папка кэша. По умолчанию ".pdf_cache" рядом с PDF.
 
     Returns:
         list: Массив с текстами (постранично) из указанного диапазона страниц.
     """
     try:
-        # Открываем PDF-файл для чтения в бинарном режиме
-        with open(file_path, 'rb') as pdf_file:
-            # Создаем объект для чтения PDF
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-
-            # Создаем список для хранения извлеченного текста
-            texts = []
-
-            # Извлекаем текст из указанного диапазона страниц PDF и добавляем его в список
-            for page_num in range(start_page - 1 if start_page else 0, end_page if end_page else len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                texts.append(page.extract_text())
-
-        return texts
+        # Собираем страницы в порядке номеров, извлекая их крупными пачками — по одной на воркер
+        pages = iter_pdf_pages(file_path, start_page, end_page, n_workers=n_workers, batch_size=None, 
+                               cache=cache, cache_folder=cache_folder, ordered=True)
+        return [text for _, text in pages]
 
     except Exception as e:
         print(f"Произошла ошибка при извлечении текста из PDF: {e}")
         return None
 
 
-def clean_text(text, mode='normal', preserve_symbols=None, remove_symbols=None, remove_caps=False):
+# Разрешённые символы для режимов 'normal' и 'aggressive'
+_NORMAL_FILTER = re.compile(r'[^ «»;:—!.,()\-А-Яа-яЁёA-Za-z0-9]')
+_AGGRESSIVE_FILTER = re.compile(r'[^ «»;:—!.,()\-А-Яа-яЁёA-Za-z]')
+_LETTERS = frozenset('АБВГДЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯабвгдежзийклмнопрстуфхцчшщъыьэюяЁё'
+                     'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz')
+
+_CAPS = re.compile(r'\b[A-ZА-ЯЁ0-9]+\b')
+_ELLIPSIS = re.compile(r'\.\.\.+')
+_DOTS = re.compile(r'\.\.+')
+_COMMA_SPACES = re.compile(r', {2,}')
+_PUNCTUATION_RUN = re.compile(r'[,.—\-:;]{3,}')
+
+
+def _collapse_whitespace(text):
+    r"""
+    Заменяет каждую последовательность пробельных символов одним пробелом (как re.sub(r'\s+', ' ', text)).
+    """
+    if not text:
+        return text
+    
+    collapsed = ' '.join(text.split())
+    if text[0].isspace():
+        collapsed = ' ' + collapsed
+    if text[-1].isspace() and collapsed != ' ':
+        collapsed = collapsed + ' '
+    
+    return collapsed
+
+
+def _remove_hyphenation(text, optional_space):
+    r"""
+    Удаляет переносы слов "-\n" вместе с пробельным символом перед ними за один проход по вхождениям "-\n".
+    Эквивалентно re.sub(r'\s?-\n', '', text) при optional_space=True и re.sub(r'\s-\n', '', text) иначе.
+    """
+    parts = text.split('-\n')
+    if len(parts) == 1:
+        return text
+
+    out = [parts[0]]
+    kept = False # Сохранён ли предыдущий "-\n" (его "\n" может стать пробельным символом следующего совпадения)
+    for right in parts[1:]:
+        previous = out[-1]
+        if previous and previous[-1].isspace():
+            out[-1] = previous[:-1]
+            kept = False
+        elif not previous and kept:
+            out[-2] = '-'
+            kept = False
+        elif optional_space:
+            kept = False
+        else:
+            out.append('-\n')
+            kept = True
+        out.append(right)
+
+    return ''.join(out)
+
+
+def _space_after_colon(text):
+    r"""
+    Добавляет пробел после двоеточия между буквами (как re.sub(r'(\w):(\w)', r'\1: \2', text) после фильтра символов).
+    """
+    parts = text.split(':')
+    out = [parts[0]]
+    consumed = False # Занята ли первая буква текущей части предыдущим совпадением
+    for left, right in zip(parts, parts[1:]):
+        match = (left and left[-1] in _LETTERS and not (consumed and len(left) == 1) 
+                 and right and right[0] in _LETTERS)
+        out.append(': ' if match else ':')
+        out.append(right)
+        consumed = match
+
+    return ''.join(out)
+
+
+def _normalize_dots(text):
+    r"""
+    Приводит точки с пробелами вокруг к ". ", сливая идущие подряд 
+    (как re.sub(r'\s*\.\s*', '. ', ...) и затем re.sub(r'(\.\s+)+', '. ', ...), когда пробельный символ только ' ').
+    """
+    parts = text.split('.')
+    if len(parts) == 1:
+        return text
+
+    middle = [part.strip(' ') for part in parts[1:-1]]
+    return '. '.join([parts[0].rstrip(' ')] + [part for part in middle if part] + [parts[-1].lstrip(' ')])
+
+
+def _space_quotes(text):
+    r"""
+    Пробелы вокруг кавычек «» (как re.sub(r'\s?«\s+', ' «', ...) и затем re.sub(r'\s+»\s?', '» ', ...), когда пробельный символ только ' ').
+    """
+    if '«' in text:
+        parts = text.split('«')
+        out = [parts[0]]
+        for right in parts[1:]:
+            if right.startswith(' '):
+                if out[-1].endswith(' '):
+                    out[-1] = out[-1][:-1]
+                out.append(' «')
+                out.append(right.lstrip(' '))
+            else:
+                out.append('«')
+                out.append(right)
+        text = ''.join(out)
+
+    if '»' in text:
+        parts = text.split('»')
+        out = [parts[0]]
+        for right in parts[1:]:
+            if out[-1].endswith(' '):
+                out[-1] = out[-1].rstrip(' ')
+                out.append('» ')
+                out.append(right[1:] if right.startswith(' ') else right)
+            else:
+                out.append('»')
+                out.append(right)
+        text = ''.join(out)
+
+    return text
+
+
+def _clean_soft(text):
+    text = _remove_hyphenation(text, optional_space=False) # Удаляем переносы слов
+    return text.replace('\n', ' ')                          # Заменяем переносы строк на пробелы
+
+
+def _clean_normal(text):
+    text = _remove_hyphenation(text, optional_space=False) # Удаляем переносы слов
+    text = _collapse_whitespace(text)                       # Заменяем переносы строк и последовательности пробелов на один пробел
+    if '...' in text:
+        text = _ELLIPSIS.sub('.', text)                     # Заменяем три и более точки на одну
+    return _NORMAL_FILTER.sub('', text)                     # Удаляем все символы, кроме букв, цифр и пробелов
+
+
+def _clean_aggressive(text, urls=None):
+    # Удаляем ссылки из текста (urls — заранее найденные ссылки, см. clean_pages)
+    text = remove_links(text) if urls is None else _remove_urls(text, urls)
+
+    # Удаляем переносы слов и заменяем переносы строк на пробелы
+    text = _remove_hyphenation(text, optional_space=True)
+    text = text.replace('\n', ' ')
+
+    # Удаляем все символы, кроме букв, пробелов и пунктуации. 
+    # Дальше единственный пробельный символ — ' ', поэтому правила ниже работают со строковыми литералами
+    text = _AGGRESSIVE_FILTER.sub('', text)
+
+    if ':' in text:
+        text = _space_after_colon(text)  # Добавляем пробел после двоеточия
+        text = text.replace(' :', ':')   # Удаляем пробелы перед двоеточием
+    text = text.replace(' ;', ';')       # Удаляем пробелы перед точкой с запятой
+    text = text.replace(' ,', ',')       # Удаляем пробелы перед запятой
+    text = _COMMA_SPACES.sub(', ', text) # Удаляем лишние пробелы после запятой
+    text = _normalize_dots(text)         # Удаляем лишние пробелы рядом с точкой и после неё
+    text = _space_quotes(text)           # Удаляем лишние пробелы рядом с кавычками
+    text = text.replace('( ', '(')       # Удаляем лишние пробелы после открывающей скобки
+    text = text.replace(' )', ')')       # Удаляем лишние пробелы перед закрывающей скобкой
+
+    text = _PUNCTUATION_RUN.sub(' ', text) # Удаляем много подряд идущих символов пунктуации
+    text = _collapse_whitespace(text)      # Удаляем лишние пробелы
+    if '..' in text:
+        text = _DOTS.sub('.', text)        # Заменяем n подряд идущих точек на одну
+
+    return text
+
+
+_CLEANERS = {
+    'soft': _clean_soft,
+    'normal': _clean_normal,
+    'aggressive': _clean_aggressive,
+}
+
+
+def clean_text(text, mode='normal', preserve_symbols=None, remove_symbols=None, remove_caps=False, _urls=None):
     """Очищает текст от лишних символов
 
+    Правила каждого режима собраны заранее: регулярные выражения скомпилированы, 
+    литеральные замены выполняются через str.replace, а цепочки зависимых замен 
+    объединены в один проход. Совпадение с исходной последовательной реализацией проверяет tests/test_clean_text.py.
+
     Args:
         text (str): Входной текст для очистки
         mode (str): Режим очистки: 'soft', 'normal', 'aggressive' или 'bypass'. Режим 'bypass' возвращает исходный текст без изменений.
@@ -50,52 +366,16 @@ def clean_text(text, mode='normal', preserve_symbols=None, remove_symbols=None,
     
     # Удаляем капс в начале, т.к. может привести к лишним пробелам
     if remove_caps:
-        text = re.sub(r'\b[A-ZА-ЯЁ0-9]+\b', '', text)
-
-    if mode == 'soft':
-        # Удаление переносов слов и замена переносов строк на пробелы
-        text = re.sub("\s-\n", "", text)  # Удаляем переносы слов
-        text = re.sub("\n", " ", text)    # Заменяем переносы строк на пробелы
-
-    elif mode == 'normal':
-        # Выполнение очистки для режима 'normal'
-        text = re.sub("\s-\n", "", text)        # Удаляем переносы слов
-        text = re.sub("\n", " ", text)          # Заменяем переносы строк на пробелы
-        text = re.sub(r'\s+', ' ', text)        # Заменяем последовательности пробелов на один
-        text = re.sub(r'\.{3,}', '.', text)     # Заменяем три и более точки на одну
-        text = re.sub(r'[^ «»;:—!.,()\-А-Яа-яЁёA-Za-z0-9]', '', text)  # Удаляем все символы, кроме букв, цифр и пробелов
-
-    elif mode == 'aggressive':
-                    
-        text = remove_links(text)  # Удаляем ссылки из текста
-
-        # Удаляем переносы слов и заменяем переносы строк на пробелы
-        text = re.sub("\s?-\n", "", text)
-        text = re.sub("\n", " ", text)
-        
-        text = re.sub('[^ «»;:—!.,()\-А-Яа-яЁёA-Za-z]', '', text) # Удаляем все символы, кроме букв, пробелов и пунктуации
-        text = re.sub(r'(\w):(\w)', r'\1: \2', text) # Добавляем пробел после двоеточия
-        text = re.sub(r'(\s):', ':', text) # Удаляем пробелы перед двоеточием
-        text = re.sub(r'\s\;', ';', text)# Удаляем пробелы перед точкой с запятой
-        text = re.sub(r'\s\,', ',', text) # Удаляем пробелы перед запятой
-        
-        text = re.sub(r'\,\s+', ', ', text) # Удаляем лишние пробелы после запятой
-        text = re.sub(r'\s*\.\s*', '. ', text) # Удаляем лишний пробел рядом с точкой
-        text = re.sub(r'(\.\s+)+', '. ', text)# Удаляем лишние пробелы после точки
-        text = re.sub(r'\s?«\s+', ' «', text) # Удаляем лишние пробелы рядом с открывающей кавычкой
-        text = re.sub(r'\s+»\s?', '» ', text) # Удаляем лишние пробелы рядом с закрывающей кавычкой
-        text = re.sub(r'\(\s', '(', text) # Удаляем лишние пробелы после открывающей скобки
-        text = re.sub(r'\s\)', ')', text) # Удаляем лишние пробелы перед открывающей скобкой
-
-        text = re.sub(r'[,.—\-:;]{3,}', ' ', text) # Удаляем много подряд идущих символов пунктуации
-        
-        text = re.sub('\s+', ' ', text) # Удаляем лишние пробелы
-        
-        text = re.sub(r'\.{2,}', '.', text) # Заменяем n подряд идущих точек на одну
-        
-    elif mode == 'bypass':
+        text = _CAPS.sub('', text)
+
+    if mode == 'bypass':
         return text
 
+    if mode == 'aggressive':
+        text = _clean_aggressive(text, urls=_urls)
+    elif mode in _CLEANERS:
+        text = _CLEANERS[mode](text)
+
     if preserve_symbols:
         # Оставляем указанные символы
         preserved_pattern = f"[^{re.escape(''.join(preserve_symbols))}]"
@@ -109,6 +389,101 @@ def clean_text(text, mode='normal', preserve_symbols=None, remove_symbols=None,
     return text
 
 
+def clean_pages(pages, mode='normal', preserve_symbols=None, remove_symbols=None, remove_caps=False):
+    """Очищает список текстов (например, страниц PDF из import_pdf_text) так же, как clean_text.
+
+    В режиме 'aggressive' ссылки ищутся один раз сразу для всех страниц (см. remove_links_batch).
+
+    Args:
+        pages (list): Список текстов для очистки
+        mode (str): Режим очистки (см. clean_text)
+        preserve_symbols (list): Список символов, которые нужно оставить
+        remove_symbols (list): Список символов, которые нужно удалить
+        remove_caps (bool): Нужно ли удалять слова, написанные ЦЕЛИКОМ КАПСОМ
+
+    Returns:
+        list: Очищенные тексты (в том же порядке)
+    """
+    if mode != 'aggressive':
+        return [clean_text(page, mode, preserve_symbols, remove_symbols, remove_caps) for page in pages]
+
+    # Капс удаляется до поиска ссылок, как в clean_text
+    if remove_caps:
+        pages = [_CAPS.sub('', page) for page in pages]
+
+    return [clean_text(page, mode, preserve_symbols, remove_symbols, _urls=urls) 
+            for page, urls in zip(pages, _find_urls(pages))]
+
+
+# Признаки ссылки: ".буква", "цифра.цифра" (IP-адреса), "://" или "localhost". 
+# urlextract ищет ссылки вокруг доменов верхнего уровня и не выходит за пробельные символы ASCII (string.whitespace; 
+# неразрывный пробел для него — часть слова), поэтому ссылки могут быть только в словах, содержащих эти признаки
+_URL_ANCHOR = re.compile(r'\.[^\W\d_]|\d\.\d|://|localhost')
+_WORD_END = re.compile(r'[^ \t\n\r\x0b\x0c]*')
+
+
+def _url_candidates(text):
+    """
+    Возвращает слова текста, в которых может быть ссылка (без повторов, в порядке появления).
+    """
+    candidates = {}
+    end = 0
+    for match in _URL_ANCHOR.finditer(text):
+        if match.start() < end: # Признак внутри уже найденного слова
+            continue
+
+        # Расширяем найденный признак до границ слова
+        start = match.start()
+        while start > 0 and text[start - 1] not in string.whitespace:
+            start -= 1
+        end = _WORD_END.match(text, match.start()).end()
+        candidates[text[start:end]] = None
+
+    return list(candidates)
+
+
+_url_extractor = None
+
+
+def _get_url_extractor():
+    """
+    Возвращает общий экземпляр urlextract.URLExtract (создаётся при первом вызове: загрузка списка доменов небыстрая).
+    """
+    global _url_extractor
+
+    if _url_extractor is None:
+        import urlextract
+        _url_extractor = urlextract.URLExtract()
+
+    return _url_extractor
+
+
+def _find_urls(texts):
+    """
+    Ищет ссылки сразу во всех текстах: urlextract запускается только на словах-кандидатах, каждое слово — один раз.
+    Возвращает для каждого текста список его ссылок в порядке появления (как urlextract на всём тексте).
+    """
+    candidates = [_url_candidates(text) for text in texts]
+
+    found = {}
+    for words in candidates:
+        for word in words:
+            if word not in found:
+                found[word] = _get_url_extractor().find_urls(word)
+
+    return [list(dict.fromkeys(url for word in words for url in found[word])) for words in candidates]
+
+
+def _remove_urls(text, urls):
+    """
+    Удаляет все вхождения ссылок urls из текста по очереди, в порядке urls — как исходная remove_links: 
+    после удаления ссылки содержащая её более длинная ссылка может уже не встретиться.
+    """
+    for url in urls:
+        text = text.replace(url, '')
+    return text
+
+
 def remove_links(text):
     """
     Удаляет ссылки из текста.
@@ -120,22 +495,21 @@ def remove_links(text):
     str: Текст без ссылок
     """
 
-    import urlextract
-
-    # Создание экземпляра urlextract для поиска URL-адресов
-    extractor = urlextract.URLExtract()
+    return _remove_urls(text, _find_urls([text])[0])
 
-    # Извлечение всех найденных URL-адресов в тексте
-    urls = extractor.find_urls(text)
 
-    # Создание копии входного текста для последующей очистки
-    cleaned_text = text
+def remove_links_batch(texts):
+    """
+    Удаляет ссылки из списка текстов (например, страниц PDF из import_pdf_text).
+    Ссылки ищутся один раз для всех текстов сразу, что быстрее, чем remove_links для каждой страницы.
 
-    # Замена всех найденных URL-адресов на пустую строку
-    for url in urls:
-        cleaned_text = cleaned_text.replace(url, "")
+    Args:
+    texts (list): Список текстов
 
-    return cleaned_text
+    Returns:
+    list: Тексты без ссылок (в том же порядке)
+    """
+    return [_remove_urls(text, urls) for text, urls in zip(texts, _find_urls(texts))]
 
 
 def import_text(file_path, encoding='utf-8'):
@@ -162,15 +536,113 @@ def export_text(text, file_path, encoding='utf-8'):
 
     Args:
     file_path (str): Путь к файлу, в который будет экспортирован текст.
-    text (str): Текст для экспорта.
+    text (str или iterable): Текст для экспорта. Может быть итератором фрагментов (например, iter_clean_text) — тогда они записываются по мере поступления.
     encoding (str, optional): Кодировка файла. По умолчанию 'utf-8'.
     """
 
     with open(file_path, 'w', encoding=encoding) as file:
-        file.write(text)
-        
+        if isinstance(text, str):
+            file.write(text)
+        else:
+            file.writelines(text)
+
+
+# Безопасное место разреза текста для потоковой очистки: между строчной буквой и пробелом, за которым идёт буква.
+# Ни одно правило clean_text (переносы, пробелы, точки, кавычки, двоеточия, капс) не захватывает такую границу
+_SAFE_SPLIT = re.compile(r'[а-яёa-z](?= [А-Яа-яЁёA-Za-z])')
+
+
+def _safe_split(text, start=0, window=4096):
+    """
+    Возвращает последнюю позицию, в которой текст можно разрезать так, что clean_text(начало) + clean_text(конец) 
+    совпадает с clean_text(текст). Слово перед разрезом не должно быть похоже на ссылку (его может удалить remove_links).
+    Ищет только разрезы не раньше start (начало уже просмотренной без результата части текста). None, если такой позиции нет.
+    """
+    stop = max(start, 0)
+    lo, hi = max(len(text) - window, stop), len(text)
+    while True:
+        for match in reversed(list(_SAFE_SPLIT.finditer(text, lo, hi))):
+            split = match.end()
+            word_start = max(text.rfind(' ', 0, split), text.rfind('\n', 0, split)) + 1
+            if not _URL_ANCHOR.search(text, word_start, split):
+                return split
         
-def text_preprocess(file_path, clean_mode='soft', preserve_symbols=None, remove_symbols=None):
+        if lo == stop:
+            return None
+        # Совпадения правее lo уже проверены; 2 символа — запас на просмотр вперёд шаблона
+        lo, hi = max(lo - window, stop), lo + 2
+
+
+def _force_split(text):
+    """
+    Место вынужденного разреза, когда безопасного нет: после последнего пробельного символа, иначе — конец текста.
+    """
+    return max(text.rfind(' '), text.rfind('\n')) + 1 or len(text)
+
+
+def _iter_clean_chunks(file_path, clean_mode, preserve_symbols, remove_symbols, remove_caps, chunk_size, max_buffer, encoding):
+    with open(file_path, 'r', encoding=encoding) as file:
+        buffer = ''
+        scanned = 0 # Часть буфера, в которой безопасного разреза уже не нашлось
+        for chunk in iter(lambda: file.read(chunk_size), ''):
+            buffer += chunk
+
+            # Очищаем всё до последнего безопасного места разреза, остаток переносим в следующий фрагмент.
+            # Шаблон разреза смотрит на 2 символа вперёд, поэтому конец просмотренной части проверяется заново
+            split = _safe_split(buffer, start=scanned - 2)
+            if split is None:
+                if len(buffer) < max_buffer:
+                    scanned = len(buffer)
+                    continue
+                split = _force_split(buffer)
+            
+            yield clean_text(buffer[:split], mode=clean_mode, preserve_symbols=preserve_symbols, 
+                             remove_symbols=remove_symbols, remove_caps=remove_caps)
+            buffer = buffer[split:]
+            scanned = 0
+
+        if buffer:
+            yield clean_text(buffer, mode=clean_mode, preserve_symbols=preserve_symbols, 
+                             remove_symbols=remove_symbols, remove_caps=remove_caps)
+
+
+def iter_clean_text(file_path, clean_mode='soft', preserve_symbols=None, remove_symbols=None, remove_caps=False, 
+                    chunk_size=1 << 20, max_buffer=None, encoding=None):
+    """
+    Потоково читает и очищает текст из файла фрагментами примерно по chunk_size символов.
+
+    Фрагменты режутся только в безопасных местах (между словами), поэтому переносы слов ("-\n") 
+    и последовательности пробелов на границах фрагментов обрабатываются так же, как при очистке всего текста: 
+    склейка результатов совпадает с clean_text(import_text(file_path)). Память не зависит от размера файла.
+    Исключение — режим 'aggressive': ссылки ищутся внутри каждого фрагмента, поэтому на границах и в редких 
+    контекстах результат удаления ссылок может отличаться от очистки всего текста целиком.
+
+    Args:
+        file_path (str): Путь к файлу с текстом.
+        clean_mode (str, optional): Режим очистки для clean_text. По умолчанию 'soft'.
+        preserve_symbols (list, optional): Список символов для сохранения. По умолчанию None.
+        remove_symbols (list, optional): Список символов для удаления из текста. По умолчанию None.
+        remove_caps (bool, optional): Нужно ли удалять слова, написанные ЦЕЛИКОМ КАПСОМ.
+        chunk_size (int, optional): Размер читаемого фрагмента в символах. По умолчанию 1 млн.
+        max_buffer (int, optional): Предельный размер буфера в символах. Если в нём так и не нашлось безопасного места разреза 
+            (например, текст без пробелов), он режется вынужденно по последнему пробелу — на этой границе результат может 
+            отличаться от очистки всего текста. По умолчанию 16 * chunk_size, но не меньше 1 млн.
+        encoding (str, optional): Кодировка файла. По умолчанию — системная (как в text_preprocess).
+
+    Returns:
+        generator: Очищенные фрагменты текста.
+
+    Raises:
+        ValueError: Если указан недопустимый режим clean_mode.
+    """
+    if clean_mode not in ['bypass', 'soft', 'normal', 'aggressive']:
+        raise ValueError("Недопустимый режим clean_mode. Используйте 'bypass', 'soft', 'normal' или 'aggressive'.")
+
+    return _iter_clean_chunks(file_path, clean_mode, preserve_symbols, remove_symbols, remove_caps, chunk_size, 
+                              max_buffer or max(16 * chunk_size, 1 << 20), encoding)
+
+
+def text_preprocess(file_path, clean_mode='soft', preserve_symbols=None, remove_symbols=None, output_file=None, chunk_size=None):
     """
     Загружает и предобрабатывает текст из файла.
 
@@ -179,17 +651,26 @@ def text_preprocess(file_path, clean_mode='soft', preserve_symbols=None, remove_
         clean_mode (str, optional): Режим предобработки текста для clean_text. По умолчанию 'soft'.
         preserve_symbols (list, optional): Список символов для сохранения. По умолчанию None.
         remove_symbols (list, optional): Список символов для удаления из текста. По умолчанию None.
+        output_file (str, optional): Если указан, текст очищается потоково (см. iter_clean_text) и сразу записывается в этот файл через export_text.
+        chunk_size (int, optional): Размер фрагмента в символах для потокового режима. По умолчанию 1 млн.
 
     Returns:
-        str: Предобработанный текст.
+        str: Предобработанный текст (или путь к output_file в потоковом режиме).
 
     Raises:
         ValueError: Если указан недопустимый режим clean_mode.
     """
 
+    # Потоковый режим: читаем, чистим и записываем фрагментами
+    if output_file is not None:
+        chunks = iter_clean_text(file_path, clean_mode=clean_mode, preserve_symbols=preserve_symbols, 
+                                 remove_symbols=remove_symbols, chunk_size=chunk_size or 1 << 20)
+        export_text(chunks, output_file)
+        return output_file
+
     # Загружаем файл с prompt'ом
-    file = open(file_path, 'r')
-    text = file.read()
+    with open(file_path, 'r') as file:
+        text = file.read()
 
     # Проверка режима clean_mode
     if clean_mode in ['bypass', 'soft', 'normal', 'aggressive']:
@@ -0,0 +1,302 @@
+import os
+import csv
+import sys
+import json
+import time
+import argparse
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from functions import change_name, change_folder_name, parse_time, write_atomic, write_srt, instrumented, phase, gauge
+from text_processing import import_text
+
+
+class Transcriber(ABC):
+    """
+    Интерфейс бэкенда транскрибации. Бэкенд создаётся в основном процессе (без загрузки модели),
+    передаётся в воркеры и загружает модель один раз на воркер в load().
+    """
+    def load(self):
+        """
+        Загружает модель. Вызывается один раз на процесс перед первой транскрибацией.
+        """
+
+    @abstractmethod
+    def transcribe(self, audio_file, initial_prompt=None):
+        """
+        Транскрибирует аудиофайл.
+
+        Args:
+        - audio_file (str): Путь к аудиофайлу.
+        - initial_prompt (str, опционально): Текст подсказки (словарь лекции).
+
+        Return:
+        - dict: Результат в формате whisper: "text" и "segments" — список словарей "start", "end" (секунды) и "text".
+        """
+
+
+class WhisperTranscriber(Transcriber):
+    """
+    Бэкенд openai-whisper с параметрами из cookbook_whisper.ipynb.
+
+    Args:
+    - model_name (str, опционально): Модель whisper. По умолчанию "large".
+    - device (str, опционально): Устройство ("cuda" или "cpu"). По умолчанию — cuda, если доступна.
+    - **options: Параметры model.transcribe (перекрывают значения по умолчанию).
+    """
+    def __init__(self, model_name="large", device=None, **options):
+        self.model_name = model_name
+        self.device = device
+        self.options = {
+            "language": "Russian",
+            "temperature": .1, # Температура — мера "креативности" модели
+            "condition_on_previous_text": False, # Распознаваемый текст НЕ воспринимаем как продолжение prompt
+            "verbose": False,
+            **options,
+        }
+        self.model = None
+
+    def __getstate__(self):
+        # В воркеры передаём только настройки: модель каждый воркер загружает сам
+        return dict(self.__dict__, model=None)
+
+    def load(self):
+        import whisper
+
+        if self.model is None:
+            self.model = whisper.load_model(self.model_name, device=self.device)
+
+    def transcribe(self, audio_file, initial_prompt=None):
+        return self.model.transcribe(audio_file, initial_prompt=initial_prompt, **self.options)
+
+
+class FakeTranscriber(Transcriber):
+    """
+    Бэкенд-заглушка для проверки планирования без GPU и загрузки модели:
+    возвращает детерминированный «текст» по имени файла, длине подсказки и длительности.
+
+    Args:
+    - delay_s (float, опционально): Искусственная задержка транскрибации в секундах.
+    - load_delay_s (float, опционально): Искусственная задержка загрузки «модели» в секундах.
+    - fail_on (tuple, опционально): Подстроки путей, на которых транскрибация падает с ошибкой.
+    """
+    def __init__(self, delay_s=0., load_delay_s=0., fail_on=()):
+        self.delay_s = delay_s
+        self.load_delay_s = load_delay_s
+        self.fail_on = tuple(fail_on)
+        self.loads = 0
+
+    def load(self):
+        time.sleep(self.load_delay_s)
+        self.loads += 1
+
+    def transcribe(self, audio_file, initial_prompt=None):
+        if any(pattern in audio_file for pattern in self.fail_on):
+            raise RuntimeError(f"Сбой транскрибации {audio_file}")
+        time.sleep(self.delay_s)
+
+        name = os.path.basename(audio_file)
+        prompt_length = len(initial_prompt) if initial_prompt else 0
+        segments = [
+            {"start": 0., "end": 1.5, "text": f" {name}"},
+            {"start": 1.5, "end": 3., "text": f" prompt {prompt_length}, pid {os.getpid()}, load {self.loads}"},
+        ]
+        return {"text": "".join(segment["text"] for segment in segments), "segments": segments}
+
+
+def read_transcription_manifest(file_path):
+    """
+    Читает список заданий транскрибации.
+
+    CSV: столбцы "audio", "prompt" (необязательный) и "offset" (необязательный, в формате parse_time) с заголовком.
+    JSON Lines (.jsonl): по объекту {"audio": ..., "prompt": ..., "offset": ...} на строку.
+    Относительные пути считаются от папки манифеста.
+
+    Args:
+    - file_path (str): Путь к .csv или .jsonl файлу.
+
+    Return:
+    - list: Словари с ключами "audio", "prompt" и "offset".
+    """
+    folder = os.path.dirname(os.path.abspath(file_path))
+    resolve = lambda path: os.path.join(folder, path) if path and not os.path.isabs(path) else path or None
+
+    with open(file_path, 'r', encoding='utf-8', newline='') as file:
+        if os.path.splitext(file_path)[1].lower() in ('.jsonl', '.json'):
+            rows = [json.loads(line) for line in file if line.strip()]
+        else:
+            rows = [row for row in csv.DictReader(file) if row.get("audio")]
+
+    return [{"audio": resolve(row["audio"].strip()),
+             "prompt": resolve((row.get("prompt") or "").strip()),
+             "offset": (row.get("offset") or "").strip() or None} for row in rows]
+
+
+def _output_files(audio_file, output_folder):
+    """
+    Имена выходных файлов txt и srt, как в cookbook_whisper.ipynb (рядом с аудио или в output_folder).
+    """
+    output_txt = change_name(audio_file, extension='.txt')
+    output_srt = change_name(audio_file, extension='.srt')
+    if output_folder is not None:
+        output_txt, output_srt = change_folder_name(output_txt, output_folder), change_folder_name(output_srt, output_folder)
+    return output_txt, output_srt
+
+
+# Бэкенд, загруженный в текущем процессе (воркере)
+_worker_backend = None
+
+
+def _init_worker(backend):
+    """
+    Инициализатор воркера: модель загружается один раз на процесс.
+    """
+    global _worker_backend
+    backend.load()
+    _worker_backend = backend
+
+
+@instrumented
+def _transcribe_item(audio_file, prompt_text, offset, output_txt, output_srt, backend=None):
+    """
+    Транскрибирует одно задание и атомарно записывает txt и srt. Возвращает запись для отчёта.
+    """
+    backend = backend or _worker_backend
+    report = {"audio": audio_file, "output_txt": output_txt, "output_srt": output_srt, "status": None,
+              "duration": 0., "error": None}
+    started = time.perf_counter()
+
+    try:
+        with phase("transcribe"):
+            result = backend.transcribe(audio_file, initial_prompt=prompt_text)
+        if result.get("segments"):
+            gauge(audio_s=result["segments"][-1]["end"])
+
+        # srt пишем первым: txt — признак завершённого задания при проверке готовности
+        with phase("encode"):
+            write_srt(result.get("segments", []), output_srt, offset=parse_time(offset) if offset else 0)
+            write_atomic(output_txt, result["text"])
+        report["status"] = "ok"
+    except Exception as e:
+        report["status"], report["error"] = "failed", f"{type(e).__name__}: {e}"
+
+    report["duration"] = time.perf_counter() - started
+    return report
+
+
+def transcribe_batch(items,
+                     backend=None,
+                     output_folder=None,
+                     n_workers=1,
+                     overwrite=False,
+                     verbose=True,
+                     ):
+    """
+    Пакетная транскрибация с возможностью продолжить прерванный запуск.
+
+    Задания, для которых уже есть оба выходных файла (txt и srt), пропускаются; выходные файлы пишутся атомарно,
+    поэтому сбой посреди пакета теряет только текущие задания. Подсказки читаются один раз и переиспользуются
+    всеми заданиями с тем же файлом подсказки. Модель загружается один раз на воркер.
+
+    Args:
+    - items (list или str): Задания — пары (audio, prompt), словари с ключами "audio", "prompt", "offset"
+      или путь к манифесту (см. read_transcription_manifest). "offset" (в формате parse_time) сдвигает таймкоды srt —
+      например, начало отрезка из detect_speech_segments в исходной лекции.
+    - backend (Transcriber, опционально): Бэкенд транскрибации. По умолчанию WhisperTranscriber().
+    - output_folder (str, опционально): Папка для txt и srt. По умолчанию — рядом с аудио.
+    - n_workers (int, опционально): Количество процессов; каждый загружает свою копию модели. По умолчанию 1 (в текущем процессе).
+    - overwrite (bool, опционально): Транскрибировать заново, даже если результаты уже есть.
+    - verbose (bool, опционально): Выводить ли сообщение о каждом задании.
+
+    Return:
+    - list: Отчёт — словари с ключами "audio", "output_txt", "output_srt", "status" ("ok", "skipped" или "failed"),
+      "duration" и "error".
+    """
+    if isinstance(items, str):
+        items = read_transcription_manifest(items)
+    items = [item if isinstance(item, dict) else {"audio": item[0], "prompt": item[1] if len(item) > 1 else None}
+             for item in items]
+
+    if backend is None:
+        backend = WhisperTranscriber()
+    if output_folder is not None:
+        os.makedirs(output_folder, exist_ok=True)
+
+    reports, tasks = [], []
+
+    def _finish(report):
+        if verbose:
+            name = os.path.basename(report["audio"])
+            if report["status"] == "ok":
+                print(f"Файл {name} транскрибирован за {report['duration']:.0f} с.")
+            else:
+                print(f"Ошибка при транскрибации файла {name}: {report['error']}")
+        reports.append(report)
+
+    prompts = {} # Кэш подсказок: каждый файл подсказки читается один раз
+    prompt_errors = {} # Подсказки, которые не удалось прочитать: задания с ними завершаются с ошибкой
+    for item in items:
+        output_txt, output_srt = _output_files(item["audio"], output_folder)
+        if not overwrite and os.path.exists(output_txt) and os.path.exists(output_srt):
+            reports.append({"audio": item["audio"], "output_txt": output_txt, "output_srt": output_srt,
+                            "status": "skipped", "duration": 0., "error": None})
+            continue
+
+        prompt = item.get("prompt")
+        if prompt and prompt not in prompts and prompt not in prompt_errors:
+            try:
+                prompts[prompt] = import_text(prompt)
+            except Exception as e:
+                prompt_errors[prompt] = f"Не удалось прочитать подсказку {prompt}: {type(e).__name__}: {e}"
+        if prompt in prompt_errors:
+            _finish({"audio": item["audio"], "output_txt": output_txt, "output_srt": output_srt,
+                     "status": "failed", "duration": 0., "error": prompt_errors[prompt]})
+            continue
+        tasks.append((item["audio"], prompts.get(prompt), item.get("offset"), output_txt, output_srt))
+
+    if tasks and n_workers <= 1:
+        backend.load()
+        for task in tasks:
+            _finish(_transcribe_item(*task, backend=backend))
+
+    elif tasks:
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(tasks)), initializer=_init_worker,
+                                 initargs=(backend,)) as executor:
+            futures = {executor.submit(_transcribe_item, *task): task for task in tasks}
+            for future in as_completed(futures):
+                try:
+                    report = future.result()
+                except Exception as e: # Например, воркер упал при загрузке модели
+                    audio_file, _, _, output_txt, output_srt = futures[future]
+                    report = {"audio": audio_file, "output_txt": output_txt, "output_srt": output_srt,
+                              "status": "failed", "duration": 0., "error": f"{type(e).__name__}: {e}"}
+                _finish(report)
+
+    if verbose and reports:
+        failed = sum(report["status"] == "failed" for report in reports)
+        skipped = sum(report["status"] == "skipped" for report in reports)
+        print(f"Транскрибировано: {len(reports) - failed - skipped}, пропущено: {skipped}, с ошибкой: {failed}.")
+
+    return reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетная транскрибация лекций whisper по манифесту (audio, prompt).")
+    parser.add_argument("manifest", help="CSV (audio,prompt[,offset]) или JSON Lines с заданиями")
+    parser.add_argument("--output-folder", help="Папка для txt и srt (по умолчанию — рядом с аудио)")
+    parser.add_argument("--model", default="large", help="Модель whisper")
+    parser.add_argument("--device", help="cuda или cpu")
+    parser.add_argument("--language", default="Russian")
+    parser.add_argument("--workers", type=int, default=1, help="Количество процессов (каждый со своей моделью)")
+    parser.add_argument("--overwrite", action="store_true", help="Транскрибировать заново уже готовые файлы")
+    parser.add_argument("--fake", action="store_true", help="Бэкенд-заглушка вместо whisper (проверка планирования)")
+    args = parser.parse_args(argv)
+
+    backend = FakeTranscriber() if args.fake else WhisperTranscriber(args.model, device=args.device, language=args.language)
+    reports = transcribe_batch(args.manifest, backend=backend, output_folder=args.output_folder,
+                               n_workers=args.workers, overwrite=args.overwrite)
+    return 1 if any(report["status"] == "failed" for report in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())